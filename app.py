@@ -1,8 +1,18 @@
 import streamlit as st
-import geopandas as gpd
 import leafmap.foliumap as leafmap
 import plotly.express as px
 import pandas as pd
+from rasterio.transform import from_bounds
+
+from area_metrics import hazard_metrics
+from cog_export import export_change_products
+from geodata_loader import HAZARD_FILES, preload_hazards
+from hazard_store import load_hazard_view
+from mvt_server import add_vector_tile_layer
+from raster_tile_server import add_raster_tile_layer, hazard_rasters
+from polygon_overlay import overlay_change, change_summary
+from scenario_generator import get_scenario
+from zonal_stats import zonal_statistics
 
 st.set_page_config(
     page_title="SAR Disaster Lens", 
@@ -85,6 +95,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Parse every hazard's GeoJSON once in the background; later reruns hit the cache
+preload_hazards()
+
 # Header
 st.markdown("""
 <div class="main-header">
@@ -121,6 +134,15 @@ analysis_mode = st.sidebar.radio(
     help="Select how you want to view the data"
 )
 
+# Map zoom sets the initial view of the analysis map
+map_zoom = st.sidebar.slider(
+    "🔍 Map Zoom",
+    min_value=2,
+    max_value=16,
+    value=4,
+    help="Initial zoom level of the analysis map"
+)
+
 # Information panel
 st.sidebar.markdown("---")
 st.sidebar.markdown("### ℹ️ About SAR Data")
@@ -131,15 +153,22 @@ st.sidebar.info(
 
 # Statistics panel
 st.sidebar.markdown("### 📈 Quick Stats")
-if hazard == "Flood":
-    st.sidebar.metric("Areas Monitored", "2,847 km²", "12%")
-    st.sidebar.metric("Affected Regions", "23", "5")
-elif hazard == "Fire":
-    st.sidebar.metric("Burn Area", "1,234 km²", "8%")
-    st.sidebar.metric("Active Hotspots", "67", "12")
-else:
-    st.sidebar.metric("Forest Coverage", "5,678 km²", "-15%")
-    st.sidebar.metric("Deforestation Rate", "23 km²/month", "3%")
+try:
+    _, _, hazard_change = hazard_metrics(hazard)
+    post_stats = hazard_change['post']
+    area_delta = f"{hazard_change['area_km2_pct']:+.0f}%"
+    if hazard == "Flood":
+        st.sidebar.metric("Flooded Area", f"{post_stats['area_km2']:,.0f} km²", area_delta)
+        st.sidebar.metric("Affected Regions", f"{post_stats['features']:,}", f"{hazard_change['features_delta']:+,}")
+    elif hazard == "Fire":
+        st.sidebar.metric("Burn Area", f"{post_stats['area_km2']:,.0f} km²", area_delta)
+        st.sidebar.metric("Active Hotspots", f"{post_stats['features']:,}", f"{hazard_change['features_delta']:+,}")
+    else:
+        st.sidebar.metric("Forest Coverage", f"{post_stats['area_km2']:,.0f} km²", area_delta)
+        st.sidebar.metric("Forest Edge", f"{post_stats['perimeter_km']:,.0f} km",
+                          f"{hazard_change['perimeter_km_delta']:+,.0f} km")
+except Exception as e:
+    st.sidebar.caption(f"Stats unavailable: {e}")
 
 # Main content area
 col1, col2 = st.columns([3, 1])
@@ -189,20 +218,15 @@ with col2:
     """, unsafe_allow_html=True)
 
 with col1:
-    # File paths
-    data_map = {
-        "Flood": ("data/flood_pre.geojson", "data/flood_post.geojson"),
-        "Forest Loss": ("data/forest_pre.geojson", "data/forest_post.geojson"),
-        "Fire": ("data/fire_pre.geojson", "data/fire_post.geojson"),
-    }
-
-    pre_file, post_file = data_map[hazard]
+    # File paths and initial map view
+    pre_file, post_file = HAZARD_FILES[hazard]
+    map_center = [20, 80]
 
     # Load GeoJSONs with error handling
     with st.spinner(f"🔄 Loading {hazard} data..."):
         try:
-            gdf_pre = gpd.read_file(pre_file)
-            gdf_post = gpd.read_file(post_file)
+            # Full layers: the tile server only sends what each requested tile needs
+            gdf_pre, gdf_post, load_seconds, load_source = load_hazard_view(hazard)
             
             st.success(f"✅ Successfully loaded {hazard} data!")
             
@@ -213,6 +237,7 @@ with col1:
                 <p><strong>Pre-disaster features:</strong> {len(gdf_pre)}</p>
                 <p><strong>Post-disaster features:</strong> {len(gdf_post)}</p>
                 <p><strong>Coordinate System:</strong> {gdf_pre.crs if gdf_pre.crs else 'WGS84'}</p>
+                <p><strong>Load Time:</strong> {load_seconds * 1000:.1f} ms ({load_source})</p>
             </div>
             """, unsafe_allow_html=True)
             
@@ -236,37 +261,81 @@ with col1:
     
     # Create the map
     m = leafmap.Map(
-        center=[20, 80], 
-        zoom=4,
+        center=map_center, 
+        zoom=map_zoom,
         style="OpenStreetMap",
         height=600
     )
     
+    # Layers are served as vector tiles, so the page only carries the tiles in view
+    layer_slug = hazard.lower().replace(" ", "_")
+
+    # Exported SAR rasters of this hazard are drawn as XYZ tiles beneath the polygons
+    for raster_name, raster_path, raster_style in hazard_rasters(layer_slug):
+        add_raster_tile_layer(
+            m,
+            raster_name,
+            raster_path,
+            layer_name=f"🛰️ {hazard} - {raster_name[len(layer_slug) + 1:].replace('_', ' ').title()}",
+            **raster_style
+        )
+
     # Add layers based on analysis mode
     if analysis_mode == "Comparison View":
-        m.add_gdf(
-            gdf_pre, 
+        add_vector_tile_layer(
+            m,
+            f"{layer_slug}_pre",
+            gdf_pre,
             layer_name=f"🟢 {hazard} - Pre-Disaster", 
             style={"color": colors["pre"], "weight": 3, "fillOpacity": 0.7}
         )
-        m.add_gdf(
-            gdf_post, 
+        add_vector_tile_layer(
+            m,
+            f"{layer_slug}_post",
+            gdf_post,
             layer_name=f"🔴 {hazard} - Post-Disaster", 
             style={"color": colors["post"], "weight": 3, "fillOpacity": 0.7}
         )
-        legend_text = f"🟢 Pre-Disaster | 🔴 Post-Disaster"
+        # Computed change polygons: area only in the post layer (gained) or only in the pre layer (lost)
+        change_polygons = overlay_change(gdf_pre, gdf_post, include_unchanged=False)
+        change_areas = change_summary(change_polygons)
+        gained = change_polygons[change_polygons["change"] == "gained"]
+        lost = change_polygons[change_polygons["change"] == "lost"]
+        if len(gained):
+            add_vector_tile_layer(
+                m,
+                f"{layer_slug}_gained",
+                gained,
+                layer_name=f"➕ {hazard} - Gained ({change_areas['gained_km2']:,.0f} km²)",
+                style={"color": "#E91E63", "weight": 1, "fillOpacity": 0.5}
+            )
+        if len(lost):
+            add_vector_tile_layer(
+                m,
+                f"{layer_slug}_lost",
+                lost,
+                layer_name=f"➖ {hazard} - Lost ({change_areas['lost_km2']:,.0f} km²)",
+                style={"color": "#FFC107", "weight": 1, "fillOpacity": 0.5}
+            )
+        legend_text = (f"🟢 Pre-Disaster | 🔴 Post-Disaster | "
+                       f"➕ Gained {change_areas['gained_km2']:,.0f} km² | "
+                       f"➖ Lost {change_areas['lost_km2']:,.0f} km²")
         
     elif analysis_mode == "Pre-Disaster Only":
-        m.add_gdf(
-            gdf_pre, 
+        add_vector_tile_layer(
+            m,
+            f"{layer_slug}_pre",
+            gdf_pre,
             layer_name=f"🟢 {hazard} - Pre-Disaster", 
             style={"color": colors["pre"], "weight": 3, "fillOpacity": 0.7}
         )
         legend_text = f"🟢 Pre-Disaster Conditions"
         
     else:  # Post-Disaster Only
-        m.add_gdf(
-            gdf_post, 
+        add_vector_tile_layer(
+            m,
+            f"{layer_slug}_post",
+            gdf_post,
             layer_name=f"🔴 {hazard} - Post-Disaster", 
             style={"color": colors["post"], "weight": 3, "fillOpacity": 0.7}
         )
@@ -284,6 +353,39 @@ with col1:
     # Render the map
     m.to_streamlit(height=650)
 
+    # Zonal statistics of the change raster over the displayed polygons
+    st.markdown("### 📐 Zonal Change Statistics")
+    scenario_types = {"Flood": "Flooding", "Fire": "Wildfire", "Forest Loss": "Deforestation"}
+    scene = get_scenario(scenario_types[hazard], "Custom Location", (500, 500))
+    west, south, east, north = gdf_pre.total_bounds
+    zone_stats = zonal_statistics(
+        gdf_post,
+        scene.band_reader("change"),
+        from_bounds(west, south, east, north, scene.shape[1], scene.shape[0]),
+        shape=scene.shape,
+        change_threshold=3.0
+    )
+    st.dataframe(
+        zone_stats.drop(columns="geometry").round(2),
+        use_container_width=True
+    )
+    st.caption("Backscatter change (dB) from a simulated scene over the pre-disaster extent; "
+               "changed pixels have |Δσ⁰| > 3 dB.")
+
+    # Change products streamed to Cloud-Optimized GeoTIFFs; the map draws them on the next run
+    if st.button("💾 Export Change Rasters (COG)"):
+        with st.spinner("Writing Cloud-Optimized GeoTIFFs..."):
+            export_scene = get_scenario(scenario_types[hazard], "Custom Location", (2048, 2048))
+            exported = export_change_products(
+                export_scene.band_reader("before"),
+                export_scene.band_reader("after"),
+                from_bounds(west, south, east, north, export_scene.shape[1], export_scene.shape[0]),
+                layer_slug,
+                shape=export_scene.shape
+            )
+        st.success(f"✅ Wrote {', '.join(exported['paths'].values())} "
+                   f"({exported['changed_fraction']:.1%} of pixels changed)")
+
 # Footer with additional information
 st.markdown("---")
 col1, col2, col3 = st.columns(3)
@@ -0,0 +1,201 @@
+"""
+Geodesic Area and Perimeter Metrics for SAR Disaster Lens
+Vectorised per-feature areas, perimeters and pre/post change deltas in km²/km
+
+All ring vertices of a layer are flattened into one coordinate array, so each
+metric is a handful of NumPy passes over the edges, with no per-feature
+Python loop. Perimeters are WGS84 geodesic edge lengths: short edges use the
+local ellipsoidal metric, long ones pyproj's vectorised inverse solution. Areas are the spherical excess of each ring on
+the authalic sphere after mapping latitudes to authalic latitude. That sphere
+has the ellipsoid's surface area, so the results agree with ellipsoidal
+geodesic areas to well below 0.1% for hazard-sized polygons. Layer metrics
+are cached per dataset version (file mtime and size).
+"""
+
+import numpy as np
+import os
+import pandas as pd
+import shapely
+from functools import lru_cache
+from pyproj import Geod
+
+from geodata_loader import HAZARD_FILES, _signature, load_hazard
+
+GEOGRAPHIC_CRS = 'EPSG:4326'
+WGS84 = Geod(ellps='WGS84')
+_A = WGS84.a
+_E2 = WGS84.es
+_E = np.sqrt(_E2)
+# Radius of the sphere with the same surface area as the WGS84 ellipsoid
+_Q_POLE = 1 + (1 - _E2) / (2 * _E) * np.log((1 + _E) / (1 - _E))
+AUTHALIC_RADIUS = _A * np.sqrt(_Q_POLE / 2)
+SHORT_EDGE_DEG = 0.1
+_SHORT_EDGE_RAD = np.radians(SHORT_EDGE_DEG)
+
+
+def authalic_latitude(lat_deg):
+    """Authalic latitude (radians) of geodetic latitudes in degrees"""
+    sin_phi = np.sin(np.radians(lat_deg))
+    q = (1 - _E2) * (sin_phi / (1 - _E2 * sin_phi ** 2)
+                     - np.log((1 - _E * sin_phi) / (1 + _E * sin_phi)) / (2 * _E))
+    return np.arcsin(np.clip(q / _Q_POLE, -1.0, 1.0))
+
+
+def _ring_edges(geometries):
+    """Flattened ring and line coordinates with their ring -> geometry ids and exterior flags"""
+    geometry_ids = np.arange(len(geometries))
+    types = shapely.get_type_id(geometries)
+    if np.isin(types, (4, 5, 6, 7)).any():
+        geometries, geometry_ids = shapely.get_parts(geometries, return_index=True)
+        types = shapely.get_type_id(geometries)
+    polygonal, lines = types == 3, np.isin(types, (1, 2))
+    polygons, polygon_geometry = geometries[polygonal], geometry_ids[polygonal]
+
+    # Polygons without holes are their own single ring, so only holed ones need get_rings
+    holed = shapely.get_num_interior_rings(polygons) > 0
+    simple_coords, simple_ring = shapely.get_coordinates(polygons[~holed], return_index=True)
+    rings, ring_polygon = shapely.get_rings(polygons[holed], return_index=True)
+    holed_coords, holed_ring = shapely.get_coordinates(rings, return_index=True)
+    n_simple = int((~holed).sum())
+    exterior = np.ones(len(rings), dtype=bool)
+    exterior[1:] = ring_polygon[1:] != ring_polygon[:-1]
+
+    coords = np.concatenate([simple_coords, holed_coords])
+    coord_ring = np.concatenate([simple_ring, holed_ring + n_simple])
+    ring_geometry = np.concatenate([polygon_geometry[~holed], polygon_geometry[holed][ring_polygon]])
+    line_coords, coord_line = shapely.get_coordinates(geometries[lines], return_index=True)
+    return {
+        'coords': coords, 'coord_ring': coord_ring, 'ring_geometry': ring_geometry,
+        'exterior': np.concatenate([np.ones(n_simple, dtype=bool), exterior]),
+        'line_coords': line_coords, 'line_geometry': geometry_ids[lines][coord_line], 'coord_line': coord_line
+    }
+
+
+def _delta_lon(lon1, lon2):
+    """Longitude differences in degrees, wrapped across the antimeridian only when needed"""
+    d_lon = lon2 - lon1
+    if len(d_lon) and np.abs(d_lon).max() > 180.0:
+        d_lon = (d_lon + 180.0) % 360.0 - 180.0
+    return d_lon
+
+
+def edge_lengths(lon1, lat1, lon2, lat2):
+    """
+    WGS84 geodesic lengths (m) of many edges.
+
+    Short edges use the local ellipsoidal metric (meridional and normal radii
+    at the mid-latitude), accurate to about 1e-6 for edges below
+    SHORT_EDGE_DEG; longer ones use pyproj's geodesic inverse.
+    """
+    d_lon = np.radians(_delta_lon(lon1, lon2))
+    d_lat = np.radians(lat2 - lat1)
+    sin_mid = np.sin(np.radians((lat1 + lat2) / 2))
+    w2 = 1 - _E2 * sin_mid ** 2
+    normal = _A / np.sqrt(w2)
+    meridional = normal * (1 - _E2) / w2
+    lengths = np.hypot(normal * np.sqrt(1 - sin_mid ** 2) * d_lon, meridional * d_lat)
+    long_edges = np.flatnonzero((np.abs(d_lon) > _SHORT_EDGE_RAD) | (np.abs(d_lat) > _SHORT_EDGE_RAD))
+    if len(long_edges):
+        _, _, lengths[long_edges] = WGS84.inv(lon1[long_edges], lat1[long_edges], lon2[long_edges], lat2[long_edges])
+    return lengths
+
+
+def geodesic_metrics(geometries, crs=GEOGRAPHIC_CRS):
+    """
+    Area (km²) and perimeter (km) of every geometry.
+
+    geometries is a GeoSeries, GeoDataFrame or array of Shapely geometries in
+    crs. Polygon perimeters include hole boundaries (as Shapely's length
+    does); lines have zero area and their length as perimeter; points are 0.
+    Returns a DataFrame with area_km2 and perimeter_km aligned to the input.
+    """
+    index = None
+    if hasattr(geometries, 'geometry'):
+        series = geometries.geometry
+        if series.crs is not None and not series.crs.is_geographic:
+            series = series.to_crs(GEOGRAPHIC_CRS)
+        index = series.index
+        geometries = series.to_numpy()
+    elif crs != GEOGRAPHIC_CRS:
+        import geopandas as gpd
+        geometries = gpd.GeoSeries(geometries, crs=crs).to_crs(GEOGRAPHIC_CRS).to_numpy()
+    geometries = np.asarray(geometries, dtype=object)
+    n = len(geometries)
+    parts = _ring_edges(geometries)
+    coords, coord_ring, ring_geometry = parts['coords'], parts['coord_ring'], parts['ring_geometry']
+    lon, lat = coords[:, 0], coords[:, 1]
+    # Consecutive vertex pairs; pairs spanning two rings are masked out (rings are closed)
+    edge_ring = coord_ring[:-1]
+    boundary = coord_ring[1:] != edge_ring
+
+    length = edge_lengths(lon[:-1], lat[:-1], lon[1:], lat[1:])
+    length[boundary] = 0.0
+    perimeter = np.bincount(ring_geometry[edge_ring], weights=length, minlength=n)
+
+    # Spherical excess of the quadrilateral between each edge and the equator
+    half_tan = np.tan(authalic_latitude(lat) / 2)
+    t1, t2 = half_tan[:-1], half_tan[1:]
+    excess = 2 * np.arctan2(np.tan(np.radians(_delta_lon(lon[:-1], lon[1:])) / 2) * (t1 + t2), 1 + t1 * t2)
+    excess[boundary] = 0.0
+    ring_area = np.abs(np.bincount(edge_ring, weights=excess, minlength=len(ring_geometry)))
+    ring_area *= AUTHALIC_RADIUS ** 2
+    # Holes subtract from their polygon's exterior
+    signed = np.where(parts['exterior'], ring_area, -ring_area)
+    area = np.bincount(ring_geometry, weights=signed, minlength=n)
+
+    line_coords, coord_line = parts['line_coords'], parts['coord_line']
+    if len(line_coords) > 1:
+        line_length = edge_lengths(line_coords[:-1, 0], line_coords[:-1, 1], line_coords[1:, 0], line_coords[1:, 1])
+        line_length[coord_line[1:] != coord_line[:-1]] = 0.0
+        perimeter += np.bincount(parts['line_geometry'][:-1], weights=line_length, minlength=n)
+
+    return pd.DataFrame({'area_km2': np.maximum(area, 0.0) / 1e6, 'perimeter_km': perimeter / 1e3}, index=index)
+
+
+def layer_summary(metrics):
+    """Feature count, total area and total perimeter of a metrics frame"""
+    return {
+        'features': int(len(metrics)),
+        'area_km2': float(metrics['area_km2'].sum()),
+        'perimeter_km': float(metrics['perimeter_km'].sum())
+    }
+
+
+def change_metrics(pre, post):
+    """Post-minus-pre deltas (absolute and percent) of the layer summaries"""
+    result = {'pre': pre, 'post': post}
+    for key in ('features', 'area_km2', 'perimeter_km'):
+        delta = post[key] - pre[key]
+        result[f"{key}_delta"] = delta
+        result[f"{key}_pct"] = 100.0 * delta / pre[key] if pre[key] else float('nan')
+    return result
+
+
+@lru_cache(maxsize=32)
+def _cached_hazard_metrics(hazard, signatures, base_dir):
+    gdf_pre, gdf_post, _, _ = load_hazard(hazard, base_dir)
+    pre, post = geodesic_metrics(gdf_pre), geodesic_metrics(gdf_post)
+    return pre, post, change_metrics(layer_summary(pre), layer_summary(post))
+
+
+def hazard_metrics(hazard, base_dir=None):
+    """
+    Per-feature metrics of a hazard's pre/post layers plus their change summary.
+
+    Cached per dataset version: recomputed only when either file's mtime or
+    size changes. Returns (pre_metrics, post_metrics, change).
+    """
+    paths = [os.path.join(base_dir, p) if base_dir else p for p in HAZARD_FILES[hazard]]
+    signatures = tuple(_signature(path) for path in paths)
+    return _cached_hazard_metrics(hazard, signatures, base_dir)
+
+
+def geodesic_circles(lons, lats, radius_km, n_points=64):
+    """Polygons approximating geodesic circles (all centres and vertices in one vectorised call)"""
+    lons, lats = np.atleast_1d(lons).astype(float), np.atleast_1d(lats).astype(float)
+    radius_m = np.broadcast_to(np.asarray(radius_km, dtype=float) * 1e3, lons.shape)
+    azimuths = np.linspace(0.0, 360.0, n_points, endpoint=False)
+    lon, lat, _ = WGS84.fwd(np.repeat(lons, n_points), np.repeat(lats, n_points),
+                            np.tile(azimuths, len(lons)), np.repeat(radius_m, n_points))
+    ring = np.stack([lon, lat], axis=1).reshape(len(lons), n_points, 2)
+    return shapely.polygons(np.concatenate([ring, ring[:, :1]], axis=1))
@@ -0,0 +1,162 @@
+"""
+Tiled SAR Change Detection Engine for SAR Disaster Lens
+Log-ratio, mean-ratio and Kullback-Leibler detectors over before/after rasters
+
+Rasters are read and processed one tile (plus a small halo for the local
+statistics window) at a time, so peak memory depends on the tile size and the
+number of tiles in flight rather than on the scene size. Tiles are processed
+on a thread pool; NumPy and SciPy filters release the GIL.
+"""
+
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
+from scipy import ndimage
+
+from raster_tiles import (DEFAULT_TILE_SIZE, iter_tiles, tile_slices, padded_slices, padded_window,
+                          window_reader, allocate_output)
+
+NO_CHANGE, DECREASE, INCREASE = 0, 1, 2
+CHANGE_CLASSES = {NO_CHANGE: 'No change', DECREASE: 'Backscatter decrease', INCREASE: 'Backscatter increase'}
+
+# Default decision thresholds on each detector's magnitude
+DEFAULT_THRESHOLDS = {
+    'log_ratio': 2.0,     # dB
+    'mean_ratio': 0.4,    # 1 - min(ratio, 1/ratio)
+    'kl_divergence': 5.0
+}
+
+
+def _local_moments(intensity_db, window_size):
+    """Local mean of linear intensity plus mean/variance of dB values"""
+    linear = np.power(10.0, intensity_db / 10.0)
+    if window_size <= 1:
+        return linear, intensity_db, np.zeros_like(intensity_db)
+    mean_linear = ndimage.uniform_filter(linear, window_size, mode='nearest')
+    mean_db = ndimage.uniform_filter(intensity_db, window_size, mode='nearest')
+    mean_sq = ndimage.uniform_filter(intensity_db * intensity_db, window_size, mode='nearest')
+    return mean_linear, mean_db, np.maximum(mean_sq - mean_db * mean_db, 0.0)
+
+
+def log_ratio(before_db, after_db, window_size=5):
+    """Signed log-ratio of local mean intensities (dB)"""
+    mu_before, _, _ = _local_moments(before_db, window_size)
+    mu_after, _, _ = _local_moments(after_db, window_size)
+    return 10.0 * np.log10(np.maximum(mu_after, 1e-12) / np.maximum(mu_before, 1e-12))
+
+
+def mean_ratio(before_db, after_db, window_size=5):
+    """Mean-ratio detector 1 - min(mu1/mu2, mu2/mu1), in [0, 1)"""
+    mu_before, _, _ = _local_moments(before_db, window_size)
+    mu_after, _, _ = _local_moments(after_db, window_size)
+    ratio = np.maximum(mu_after, 1e-12) / np.maximum(mu_before, 1e-12)
+    return 1.0 - np.minimum(ratio, 1.0 / ratio)
+
+
+def kl_divergence(before_db, after_db, window_size=5, min_variance=0.01):
+    """Symmetric Kullback-Leibler divergence of local Gaussian dB statistics"""
+    _, m1, v1 = _local_moments(before_db, window_size)
+    _, m2, v2 = _local_moments(after_db, window_size)
+    v1 = np.maximum(v1, min_variance)
+    v2 = np.maximum(v2, min_variance)
+    return 0.5 * (v1 / v2 + v2 / v1 - 2.0 + (m1 - m2) ** 2 * (1.0 / v1 + 1.0 / v2))
+
+
+DETECTORS = {
+    'log_ratio': log_ratio,
+    'mean_ratio': mean_ratio,
+    'kl_divergence': kl_divergence
+}
+
+
+class ChangeDetectionEngine:
+    """Tile-parallel change detection writing magnitude and a classified mask"""
+
+    def __init__(self, detector='log_ratio', window_size=5, threshold=None,
+                 tile_size=DEFAULT_TILE_SIZE, max_workers=None):
+        if detector not in DETECTORS:
+            raise ValueError(f"Unknown detector '{detector}', expected one of {sorted(DETECTORS)}")
+        self.detector = detector
+        self.window_size = window_size
+        self.threshold = DEFAULT_THRESHOLDS[detector] if threshold is None else threshold
+        self.tile_size = tile_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.halo = window_size // 2
+
+    def process_tile(self, read_before, read_after, window, shape):
+        """Magnitude and classes for one tile, computed on a halo-padded read"""
+        _, inner = padded_slices(window, shape, self.halo)
+        read_window = padded_window(window, shape, self.halo)
+        before = np.asarray(read_before(read_window), dtype=np.float32)
+        after = np.asarray(read_after(read_window), dtype=np.float32)
+
+        magnitude = DETECTORS[self.detector](before, after, self.window_size)[inner]
+        # Direction of change always comes from the log-ratio sign
+        direction = magnitude if self.detector == 'log_ratio' else log_ratio(before, after, self.window_size)[inner]
+
+        changed = np.abs(magnitude) > self.threshold
+        classes = np.where(changed, np.where(direction < 0, DECREASE, INCREASE), NO_CHANGE).astype(np.uint8)
+        return magnitude.astype(np.float32), classes
+
+    def run(self, before, after, shape=None, magnitude_path=None, classes_path=None, sink=None):
+        """
+        Detect changes between two rasters (arrays, memmaps or window readers).
+
+        Returns a dict with the magnitude raster, the classified uint8 mask and
+        per-class pixel counts. Outputs are memory-mapped when paths are given.
+        With a sink, each finished tile is passed to sink(window, magnitude,
+        classes) on the calling thread, and full-size outputs are only kept
+        when paths are given (otherwise they are None).
+        """
+        if shape is None:
+            shape = before.shape
+        shape = tuple(shape[:2])
+        read_before, read_after = window_reader(before), window_reader(after)
+
+        keep_magnitude = sink is None or magnitude_path is not None
+        keep_classes = sink is None or classes_path is not None
+        magnitude = allocate_output(shape, np.float32, magnitude_path) if keep_magnitude else None
+        classes = allocate_output(shape, np.uint8, classes_path) if keep_classes else None
+        counts = np.zeros(len(CHANGE_CLASSES), dtype=np.int64)
+
+        def store(window, result):
+            tile_magnitude, tile_classes = result
+            sl = tile_slices(window)
+            if keep_magnitude:
+                magnitude[sl] = tile_magnitude
+            if keep_classes:
+                classes[sl] = tile_classes
+            if sink is not None:
+                sink(window, tile_magnitude, tile_classes)
+            counts[:] += np.bincount(tile_classes.ravel(), minlength=len(CHANGE_CLASSES))
+
+        windows = iter_tiles(shape, self.tile_size)
+        if self.max_workers == 1:
+            for window in windows:
+                store(window, self.process_tile(read_before, read_after, window, shape))
+        else:
+            # Bounded number of tiles in flight keeps memory independent of scene size
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                pending = []
+                for window in windows:
+                    pending.append((window, pool.submit(self.process_tile, read_before, read_after, window, shape)))
+                    if len(pending) >= 2 * self.max_workers:
+                        done_window, future = pending.pop(0)
+                        store(done_window, future.result())
+                for done_window, future in pending:
+                    store(done_window, future.result())
+
+        return {
+            'detector': self.detector,
+            'threshold': self.threshold,
+            'magnitude': magnitude,
+            'classes': classes,
+            'class_counts': {CHANGE_CLASSES[c]: int(n) for c, n in enumerate(counts)},
+            'changed_fraction': float(counts[1:].sum() / max(counts.sum(), 1))
+        }
+
+
+def detect_changes(before, after, detector='log_ratio', window_size=5, threshold=None, **kwargs):
+    """One-call tiled change detection"""
+    engine = ChangeDetectionEngine(detector, window_size, threshold, **kwargs)
+    return engine.run(before, after)
@@ -7,6 +7,16 @@ import numpy as np
 from datetime import datetime, timedelta
 import json
 import time
+import shapely
+
+from terrain_correction import cosine_normalise
+from scenario_generator import generate_sar_change_data
+from change_detection import detect_changes, NO_CHANGE, DEFAULT_THRESHOLDS
+from streaming_stats import raster_statistics
+from heatmap_pyramid import get_scenario_pyramid, viewport_from_selection
+from omnibus_change import simulate_sar_stack, detect_multitemporal_changes
+from area_metrics import geodesic_circles, geodesic_metrics
+from threejs_views import scenario_payload, terrain_comparison_html, change_surface_html
 
 # Page configuration
 st.set_page_config(
@@ -259,12 +269,17 @@ def generate_sample_sar_data():
     coherence = 0.6 + 0.3 * np.cos(2 * np.pi * np.arange(365) / 365) + np.random.normal(0, 0.1, 365)
     coherence = np.clip(coherence, 0, 1)
     
+    incidence_angle = 35 + 5 * np.sin(2 * np.pi * np.arange(365) / 180) + np.random.normal(0, 1, 365)
+    
     return pd.DataFrame({
         'date': dates,
         'VV': vv_data,
         'VH': vh_data,
         'coherence': coherence,
-        'incidence_angle': 35 + 5 * np.sin(2 * np.pi * np.arange(365) / 180) + np.random.normal(0, 1, 365)
+        'incidence_angle': incidence_angle,
+        # Backscatter normalised to a 35° reference so dates are comparable
+        'VV_norm': cosine_normalise(vv_data, incidence_angle),
+        'VH_norm': cosine_normalise(vh_data, incidence_angle)
     })
 
 def create_professional_time_series(data):
@@ -389,9 +404,14 @@ if st.session_state.current_page == 'Home':
         'disaster_type': ['Flood Monitoring', 'Wildfire Detection', 'Volcanic Activity', 'Landslide Risk', 'Deforestation', 'Coastal Erosion', 'Earthquake Monitoring', 'Drought Assessment', 'Ice Sheet Tracking', 'Urban Subsidence', 'Mining Impact', 'Hurricane Tracking'],
         'severity': ['Critical', 'High', 'Moderate', 'High', 'Moderate', 'Low', 'High', 'Moderate', 'Low', 'Moderate', 'High', 'Moderate'],
         'satellites': ['Sentinel-1A/B', 'ALOS-2, Sentinel-1', 'COSMO-SkyMed', 'TerraSAR-X', 'Sentinel-1A/B', 'Sentinel-1A/B', 'ALOS-2', 'Sentinel-1A/B', 'Sentinel-1A/B', 'TerraSAR-X', 'TerraSAR-X', 'Sentinel-1A/B'],
-        'coverage_area': ['12,500 km²', '8,200 km²', '3,100 km²', '4,600 km²', '25,700 km²', '6,800 km²', '11,200 km²', '15,300 km²', '18,900 km²', '720 km²', '9,400 km²', '13,600 km²'],
+        'coverage_radius_km': [63.1, 51.1, 31.4, 38.3, 90.4, 46.5, 59.7, 69.8, 77.6, 15.1, 54.7, 65.8],
         'last_update': ['2 hours ago', '1 hour ago', '4 hours ago', '3 hours ago', '6 hours ago', '1 hour ago', '30 min ago', '5 hours ago', '2 hours ago', '45 min ago', '3 hours ago', '1 hour ago']
     }
+    # coverage_radius_km are nominal monitoring radii of these demo sites, not measured acquisition
+    # footprints; the areas shown are of the geodesic circles drawn from them
+    coverage_footprints = geodesic_circles(locations_data['lon'], locations_data['lat'],
+                                           locations_data['coverage_radius_km'])
+    locations_data['coverage_area'] = [f"{area:,.0f} km²" for area in geodesic_metrics(coverage_footprints)['area_km2']]
     
     color_map = {'Critical': '#dc2626', 'High': '#f59e0b', 'Moderate': '#3b82f6', 'Low': '#10b981'}
     size_map = {'Critical': 25, 'High': 20, 'Moderate': 15, 'Low': 12}
@@ -403,7 +423,7 @@ if st.session_state.current_page == 'Home':
     fig.add_trace(go.Scattergeo(
         lat=locations_data['lat'],
         lon=locations_data['lon'],
-        text=[f"<b>📍 {location}</b><br>🚨 {disaster}<br>⚠️ Risk Level: {severity}<br>🛰️ Satellites: {satellite}<br>📏 Coverage: {area}<br>🕐 Last Update: {update}" 
+        text=[f"<b>📍 {location}</b><br>🚨 {disaster}<br>⚠️ Risk Level: {severity}<br>🛰️ Satellites: {satellite}<br>📏 Nominal Coverage: {area}<br>🕐 Last Update: {update}" 
               for location, disaster, severity, satellite, area, update in 
               zip(locations_data['location'], locations_data['disaster_type'], locations_data['severity'], 
                   locations_data['satellites'], locations_data['coverage_area'], locations_data['last_update'])],
@@ -434,17 +454,8 @@ if st.session_state.current_page == 'Home':
     ))
     
     # Add coverage circles to show monitoring range
-    for i, (lat, lon, severity, area) in enumerate(zip(locations_data['lat'], locations_data['lon'], 
-                                                       locations_data['severity'], locations_data['coverage_area'])):
-        # Extract numeric value from area string
-        area_km = float(area.split()[0].replace(',', ''))
-        # Calculate approximate radius for visualization (rough approximation)
-        radius_deg = np.sqrt(area_km) / 100  # Rough conversion to degrees
-        
-        # Create circle points
-        angles = np.linspace(0, 2*np.pi, 50)
-        circle_lats = lat + radius_deg * np.cos(angles)
-        circle_lons = lon + radius_deg * np.sin(angles)
+    for footprint, severity in zip(coverage_footprints, locations_data['severity']):
+        circle_lons, circle_lats = shapely.get_coordinates(footprint).T
         
         fig.add_trace(go.Scattergeo(
             lat=circle_lats,
@@ -624,59 +635,31 @@ elif st.session_state.current_page == 'Change Detection':
             "Analysis Period",
             ["Last Month", "Last 6 Months", "Last Year", "Custom Range"]
         )
-    
-    # Generate realistic SAR data for before/after comparison
-    def generate_sar_change_data(disaster_type, rows=100, cols=100):
-        np.random.seed(42)
-        
-        # Generate base SAR backscatter (before event)
-        if disaster_type == "Flooding":
-            before_data = -12 + 3 * np.random.random((rows, cols))
-            # Simulate flood - water appears very dark in SAR
-            flood_mask = np.random.random((rows, cols)) < 0.3
-            after_data = before_data.copy()
-            after_data[flood_mask] = -20 + 2 * np.random.random(np.sum(flood_mask))
-            
-        elif disaster_type == "Wildfire":
-            before_data = -8 + 4 * np.random.random((rows, cols))
-            # Simulate burn scars - increased backscatter from rough surfaces
-            burn_mask = np.random.random((rows, cols)) < 0.25
-            after_data = before_data.copy()
-            after_data[burn_mask] = before_data[burn_mask] + 5 + 2 * np.random.random(np.sum(burn_mask))
-            
-        elif disaster_type == "Deforestation":
-            before_data = -6 + 5 * np.random.random((rows, cols))
-            # Simulate deforestation - loss of volume scattering
-            deforest_mask = np.random.random((rows, cols)) < 0.2
-            after_data = before_data.copy()
-            after_data[deforest_mask] = before_data[deforest_mask] - 8 + 3 * np.random.random(np.sum(deforest_mask))
-            
-        elif disaster_type == "Landslide":
-            before_data = -10 + 6 * np.random.random((rows, cols))
-            # Simulate landslide - changes in surface roughness
-            slide_mask = np.random.random((rows, cols)) < 0.15
-            after_data = before_data.copy()
-            after_data[slide_mask] = -5 + 8 * np.random.random(np.sum(slide_mask))
-            
-        elif disaster_type == "Volcanic Eruption":
-            before_data = -7 + 4 * np.random.random((rows, cols))
-            # Simulate volcanic deposits - increased backscatter
-            volcanic_mask = np.random.random((rows, cols)) < 0.1
-            after_data = before_data.copy()
-            after_data[volcanic_mask] = before_data[volcanic_mask] + 8 + 3 * np.random.random(np.sum(volcanic_mask))
-            
-        else:  # Urban Development
-            before_data = -10 + 5 * np.random.random((rows, cols))
-            # Simulate urban development - strong corner reflections
-            urban_mask = np.random.random((rows, cols)) < 0.2
-            after_data = before_data.copy()
-            after_data[urban_mask] = -2 + 4 * np.random.random(np.sum(urban_mask))
         
-        change_data = after_data - before_data
-        return before_data, after_data, change_data
+        detector_options = {
+            "Log-Ratio": "log_ratio",
+            "Mean-Ratio": "mean_ratio",
+            "KL Divergence": "kl_divergence"
+        }
+        change_detector = st.selectbox(
+            "Change Detector",
+            list(detector_options.keys())
+        )
     
-    # Generate data
-    before_sar, after_sar, change_map = generate_sar_change_data(disaster_type)
+    # Generate data (cached per disaster type, location, resolution and seed)
+    before_sar, after_sar, change_map = generate_sar_change_data(disaster_type, location)
+    
+    # Heatmaps only carry the pyramid level matching the plot size and visible window
+    viewport_key = (disaster_type, location)
+    if st.session_state.get('change_viewport_key') != viewport_key:
+        st.session_state.change_viewport_key = viewport_key
+        st.session_state.change_viewport = (None, None)
+    heatmap_views = {
+        band: get_scenario_pyramid(disaster_type, location, before_sar.shape, band).viewport(
+            *st.session_state.change_viewport, plot_width_px=450, plot_height_px=350
+        )
+        for band in ('before', 'after', 'change')
+    }
     
     # Create comparison visualization
     fig = make_subplots(
@@ -689,7 +672,9 @@ elif st.session_state.current_page == 'Change Detection':
     # Before event
     fig.add_trace(
         go.Heatmap(
-            z=before_sar,
+            z=heatmap_views['before']['z'],
+            x=heatmap_views['before']['x'],
+            y=heatmap_views['before']['y'],
             colorscale='Blues',
             name='Before',
             showscale=False,
@@ -701,7 +686,9 @@ elif st.session_state.current_page == 'Change Detection':
     # After event
     fig.add_trace(
         go.Heatmap(
-            z=after_sar,
+            z=heatmap_views['after']['z'],
+            x=heatmap_views['after']['x'],
+            y=heatmap_views['after']['y'],
             colorscale='Blues',
             name='After',
             showscale=False,
@@ -713,7 +700,9 @@ elif st.session_state.current_page == 'Change Detection':
     # Change detection
     fig.add_trace(
         go.Heatmap(
-            z=change_map,
+            z=heatmap_views['change']['z'],
+            x=heatmap_views['change']['x'],
+            y=heatmap_views['change']['y'],
             colorscale='RdBu',
             name='Change',
             showscale=True,
@@ -724,11 +713,11 @@ elif st.session_state.current_page == 'Change Detection':
     )
     
     # Statistical analysis
-    change_histogram = np.histogram(change_map.flatten(), bins=50)
+    change_stats = raster_statistics(change_map, value_range=(-25, 25), bins=50)
     fig.add_trace(
         go.Scatter(
-            x=change_histogram[1][:-1],
-            y=change_histogram[0],
+            x=change_stats.histogram.edges[:-1],
+            y=change_stats.histogram.counts,
             mode='lines',
             fill='tonexty',
             name='Change Distribution',
@@ -741,396 +730,76 @@ elif st.session_state.current_page == 'Change Detection':
         height=800,
         title_text=f"SAR Change Detection Analysis - {disaster_type} in {location}",
         title_font=dict(size=18, color='#1e293b'),
-        showlegend=False
+        showlegend=False,
+        dragmode='select'
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    # Box-select on a heatmap zooms all three to that window at the matching resolution
+    event = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="box", key="change_heatmaps")
+    selected_viewport = viewport_from_selection(event.selection if event else None)
+    if selected_viewport and selected_viewport != st.session_state.change_viewport:
+        st.session_state.change_viewport = selected_viewport
+        st.rerun()
+    if st.session_state.change_viewport != (None, None) and st.button("🔄 Reset Zoom"):
+        st.session_state.change_viewport = (None, None)
+        st.rerun()
+    
+    # Multi-temporal mode: sequential omnibus test over a stack of acquisitions
+    st.markdown("### 📆 Multi-Temporal Omnibus Change Detection")
+    mt_col1, mt_col2 = st.columns(2)
+    with mt_col1:
+        n_acquisitions = st.slider("Acquisitions in Stack", 6, 30, 12)
+    with mt_col2:
+        significance = st.select_slider("Significance Level", [0.001, 0.005, 0.01, 0.05], value=0.01)
+    
+    sar_stack = simulate_sar_stack(disaster_type, location, before_sar.shape, n_acquisitions, n_acquisitions // 2)
+    acquisition_dates = pd.date_range(end=datetime.now(), periods=n_acquisitions, freq='12D')
+    omnibus = detect_multitemporal_changes(sar_stack, acquisition_dates, alpha=significance)
+    
+    first_change_dates = np.where(omnibus['first_change'] >= 0, omnibus['first_change'] + 1, np.nan)
+    mt_fig = make_subplots(
+        rows=1, cols=3,
+        subplot_titles=('First Change (acquisition)', 'Number of Changes', 'Changed Fraction per Interval'),
+        specs=[[{"type": "heatmap"}, {"type": "heatmap"}, {"type": "bar"}]]
+    )
+    mt_fig.add_trace(
+        go.Heatmap(z=first_change_dates, colorscale='Viridis', showscale=False,
+                   hovertemplate="First change at acquisition %{z}<extra></extra>"),
+        row=1, col=1
+    )
+    mt_fig.add_trace(
+        go.Heatmap(z=omnibus['change_count'], colorscale='Reds', showscale=False,
+                   hovertemplate="Changes: %{z}<extra></extra>"),
+        row=1, col=2
+    )
+    mt_fig.add_trace(
+        go.Bar(x=pd.to_datetime(omnibus['interval_dates']).strftime('%Y-%m-%d'),
+               y=omnibus['changed_fraction'] * 100, marker_color='#3b82f6',
+               hovertemplate="%{x}: %{y:.1f}% changed<extra></extra>"),
+        row=1, col=3
+    )
+    mt_fig.update_yaxes(title_text="Changed (%)", row=1, col=3)
+    mt_fig.update_layout(height=400, showlegend=False)
+    st.plotly_chart(mt_fig, use_container_width=True)
     
     # 3D Interactive Comparison using Three.js
     st.markdown("### 🌄 3D Interactive Terrain Comparison")
     
-    # Three.js 3D visualization
-    threejs_comparison = f"""
-    <div id="threejs-comparison" style="width: 100%; height: 700px; background: linear-gradient(135deg, #1e293b 0%, #334155 100%); border-radius: 15px; position: relative; margin: 20px 0;">
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/three.js/r128/three.min.js"></script>
-        <script src="https://cdn.jsdelivr.net/npm/three@0.128.0/examples/js/controls/OrbitControls.js"></script>
-        <script>
-            // Create two side-by-side 3D scenes for before/after comparison
-            const container = document.getElementById('threejs-comparison');
-            const containerWidth = container.clientWidth;
-            const containerHeight = container.clientHeight;
-            
-            // Scene 1: Before Event
-            const scene1 = new THREE.Scene();
-            const camera1 = new THREE.PerspectiveCamera(75, (containerWidth/2) / containerHeight, 0.1, 1000);
-            const renderer1 = new THREE.WebGLRenderer({{ alpha: true }});
-            renderer1.setSize(containerWidth/2, containerHeight);
-            renderer1.setClearColor(0x1e293b, 0.8);
-            renderer1.domElement.style.position = 'absolute';
-            renderer1.domElement.style.left = '0px';
-            container.appendChild(renderer1.domElement);
-            
-            // Scene 2: After Event  
-            const scene2 = new THREE.Scene();
-            const camera2 = new THREE.PerspectiveCamera(75, (containerWidth/2) / containerHeight, 0.1, 1000);
-            const renderer2 = new THREE.WebGLRenderer({{ alpha: true }});
-            renderer2.setSize(containerWidth/2, containerHeight);
-            renderer2.setClearColor(0x1e293b, 0.8);
-            renderer2.domElement.style.position = 'absolute';
-            renderer2.domElement.style.right = '0px';
-            container.appendChild(renderer2.domElement);
-            
-            // Generate 3D terrain data based on location and disaster type
-            function generateTerrainData(disasterType, location, isAfter = false) {{
-                const size = 50;
-                const geometry = new THREE.PlaneGeometry(10, 10, size-1, size-1);
-                const vertices = geometry.attributes.position;
-                
-                for (let i = 0; i < vertices.count; i++) {{
-                    const x = vertices.getX(i);
-                    const y = vertices.getY(i);
-                    let z = 0;
-                    
-                    // Generate location-specific base terrain
-                    if (location === 'Bangladesh Delta') {{
-                        // Flat delta terrain with river channels
-                        z = 0.1 * Math.sin(x * 2) * Math.cos(y * 1.5) - 0.05;
-                        // Add river channels
-                        if (Math.abs(Math.sin(x * 3)) < 0.3) z -= 0.2;
-                    }} else if (location === 'California Coast') {{
-                        // Rolling hills and valleys
-                        z = Math.sin(x * 0.8) * Math.cos(y * 0.6) * 1.2 + 0.5;
-                        // Add coastal features
-                        if (x > 3) z *= 0.3; // Flatter near coast
-                    }} else if (location === 'Amazon Rainforest') {{
-                        // Dense forest canopy with gentle undulations
-                        z = Math.sin(x * 0.4) * Math.cos(y * 0.4) * 0.8;
-                        // Add forest density variations
-                        z += (Math.random() - 0.5) * 0.3;
-                    }} else if (location === 'Nepal Mountains') {{
-                        // Steep mountainous terrain
-                        z = Math.sin(x * 0.3) * Math.cos(y * 0.3) * 3;
-                        // Add steep slopes and ridges
-                        z += Math.sin(x * 1.5) * 0.8;
-                        if (z < 0) z = Math.abs(z); // No negative elevations in mountains
-                    }} else if (location === 'Italy Volcanic Region') {{
-                        // Volcanic cone and lava fields
-                        const distFromCenter = Math.sqrt(x*x + y*y);
-                        z = Math.max(0, 2 - distFromCenter * 0.4);
-                        // Add volcanic texture
-                        z += Math.sin(distFromCenter * 2) * 0.3;
-                    }} else {{
-                        // Default terrain
-                        z = Math.sin(x * 0.5) * Math.cos(y * 0.5) * 0.5;
-                    }}
-                    
-                    if (disasterType === 'Flooding' && isAfter) {{
-                        // Simulate water level - flat areas at low elevation
-                        if (z < -0.2) {{
-                            z = -0.3; // Water level
-                        }}
-                    }} else if (disasterType === 'Wildfire' && isAfter) {{
-                        // Simulate burned rough terrain
-                        z += Math.random() * 0.3 - 0.15;
-                    }} else if (disasterType === 'Landslide' && isAfter) {{
-                        // Simulate landslide - displaced material
-                        if (x > 2 && x < 4 && y > -1 && y < 1) {{
-                            z -= 1.5; // Slide area
-                        }}
-                        if (x > -2 && x < 0 && y > -1 && y < 1) {{
-                            z += 0.8; // Debris pile
-                        }}
-                    }} else if (disasterType === 'Volcanic Eruption' && isAfter) {{
-                        // Simulate lava flow and ash deposits
-                        const distFromCenter = Math.sqrt(x*x + y*y);
-                        if (distFromCenter < 2) {{
-                            z += 0.5 + Math.random() * 0.3; // Volcanic buildup
-                        }}
-                    }}
-                    
-                    vertices.setZ(i, z);
-                }}
-                
-                geometry.attributes.position.needsUpdate = true;
-                geometry.computeVertexNormals();
-                return geometry;
-            }}
-            
-            // Create terrains
-            const beforeGeometry = generateTerrainData('{disaster_type}', '{location}', false);
-            const afterGeometry = generateTerrainData('{disaster_type}', '{location}', true);
-            
-            // Materials based on location and disaster type
-            let beforeMaterial, afterMaterial;
-            
-            // Location-specific base materials
-            let locationBaseColor = 0x8B4513; // Default brown
-            if ('{location}' === 'Bangladesh Delta') {{
-                locationBaseColor = 0x9ACD32; // Yellow-green for delta
-            }} else if ('{location}' === 'California Coast') {{
-                locationBaseColor = 0xDEB887; // Burlywood for coastal hills
-            }} else if ('{location}' === 'Amazon Rainforest') {{
-                locationBaseColor = 0x228B22; // Forest green
-            }} else if ('{location}' === 'Nepal Mountains') {{
-                locationBaseColor = 0x696969; // Dim gray for mountains
-            }} else if ('{location}' === 'Italy Volcanic Region') {{
-                locationBaseColor = 0x654321; // Dark brown for volcanic soil
-            }}
-            
-            if ('{disaster_type}' === 'Flooding') {{
-                beforeMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: locationBaseColor,
-                    wireframe: false,
-                    transparent: true,
-                    opacity: 0.9
-                }});
-                afterMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: '{location}' === 'Bangladesh Delta' ? 0x4682B4 : 0x4169E1,
-                    transparent: true,
-                    opacity: 0.8
-                }});
-            }} else if ('{disaster_type}' === 'Wildfire') {{
-                beforeMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: '{location}' === 'Amazon Rainforest' ? 0x006400 : 
-                           '{location}' === 'California Coast' ? 0x9ACD32 : locationBaseColor
-                }});
-                afterMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: '{location}' === 'California Coast' ? 0x8B0000 : 0xA0522D,
-                    emissive: 0x2F0000,
-                    emissiveIntensity: 0.2
-                }});
-            }} else if ('{disaster_type}' === 'Landslide') {{
-                beforeMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: '{location}' === 'Nepal Mountains' ? 0x708090 : locationBaseColor
-                }});
-                afterMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: '{location}' === 'Nepal Mountains' ? 0xA0522D : 0x8B4513
-                }});
-            }} else if ('{disaster_type}' === 'Volcanic Eruption') {{
-                beforeMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: '{location}' === 'Italy Volcanic Region' ? 0x654321 : locationBaseColor
-                }});
-                afterMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: 0xFF4500,
-                    emissive: 0x440000,
-                    emissiveIntensity: '{location}' === 'Italy Volcanic Region' ? 0.4 : 0.3
-                }});
-            }} else if ('{disaster_type}' === 'Deforestation') {{
-                beforeMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: '{location}' === 'Amazon Rainforest' ? 0x006400 : 0x228B22
-                }});
-                afterMaterial = new THREE.MeshPhongMaterial({{ 
-                    color: '{location}' === 'Amazon Rainforest' ? 0x8B4513 : 0xA0522D
-                }});
-            }} else {{
-                beforeMaterial = new THREE.MeshPhongMaterial({{ color: locationBaseColor }});
-                afterMaterial = new THREE.MeshPhongMaterial({{ color: 0x8B4513 }});
-            }}
-            
-            // Create meshes
-            const beforeTerrain = new THREE.Mesh(beforeGeometry, beforeMaterial);
-            const afterTerrain = new THREE.Mesh(afterGeometry, afterMaterial);
-            
-            scene1.add(beforeTerrain);
-            scene2.add(afterTerrain);
-            
-            // Add location-specific environmental effects
-            if ('{disaster_type}' === 'Flooding') {{
-                const waterGeometry = new THREE.PlaneGeometry(10, 10);
-                let waterColor = 0x006994;
-                
-                // Location-specific water appearance
-                if ('{location}' === 'Bangladesh Delta') {{
-                    waterColor = 0x8B7355; // Muddy river water
-                }} else if ('{location}' === 'California Coast') {{
-                    waterColor = 0x4682B4; // Clear coastal water
-                }}
-                
-                const waterMaterial = new THREE.MeshPhongMaterial({{
-                    color: waterColor,
-                    transparent: true,
-                    opacity: 0.6,
-                    side: THREE.DoubleSide
-                }});
-                const water = new THREE.Mesh(waterGeometry, waterMaterial);
-                water.position.z = -0.25;
-                water.rotation.x = 0;
-                scene2.add(water);
-            }}
-            
-            // Add location-specific vegetation for Amazon
-            if ('{location}' === 'Amazon Rainforest' && '{disaster_type}' !== 'Deforestation') {{
-                for (let i = 0; i < 30; i++) {{
-                    const treeGeometry = new THREE.ConeGeometry(0.1, 0.3, 8);
-                    const treeMaterial = new THREE.MeshPhongMaterial({{ color: 0x228B22 }});
-                    const tree = new THREE.Mesh(treeGeometry, treeMaterial);
-                    tree.position.x = (Math.random() - 0.5) * 8;
-                    tree.position.y = (Math.random() - 0.5) * 8;
-                    tree.position.z = 0.15;
-                    scene1.add(tree);
-                    
-                    if ('{disaster_type}' !== 'Wildfire') {{
-                        scene2.add(tree.clone());
-                    }}
-                }}
-            }}
-            
-            // Add snow caps for Nepal Mountains
-            if ('{location}' === 'Nepal Mountains') {{
-                const snowGeometry = new THREE.PlaneGeometry(10, 10);
-                const snowMaterial = new THREE.MeshPhongMaterial({{
-                    color: 0xFFFAFA,
-                    transparent: true,
-                    opacity: 0.4
-                }});
-                const snow = new THREE.Mesh(snowGeometry, snowMaterial);
-                snow.position.z = 1.5;
-                snow.rotation.x = 0;
-                scene1.add(snow);
-                scene2.add(snow.clone());
-            }}
-            
-            // Add particle effects for volcanic eruption
-            if ('{disaster_type}' === 'Volcanic Eruption') {{
-                const particleCount = 200;
-                const particles = new THREE.BufferGeometry();
-                const positions = new Float32Array(particleCount * 3);
-                
-                for (let i = 0; i < particleCount * 3; i += 3) {{
-                    positions[i] = (Math.random() - 0.5) * 8;
-                    positions[i + 1] = (Math.random() - 0.5) * 8;
-                    positions[i + 2] = Math.random() * 3;
-                }}
-                
-                particles.setAttribute('position', new THREE.BufferAttribute(positions, 3));
-                const particleMaterial = new THREE.PointsMaterial({{
-                    color: 0xff6600,
-                    size: 0.1,
-                    transparent: true,
-                    opacity: 0.8
-                }});
-                
-                const particleSystem = new THREE.Points(particles, particleMaterial);
-                scene2.add(particleSystem);
-            }}
-            
-            // Lighting
-            const ambientLight1 = new THREE.AmbientLight(0x404040, 0.6);
-            const ambientLight2 = new THREE.AmbientLight(0x404040, 0.6);
-            scene1.add(ambientLight1);
-            scene2.add(ambientLight2);
-            
-            const directionalLight1 = new THREE.DirectionalLight(0xffffff, 1);
-            const directionalLight2 = new THREE.DirectionalLight(0xffffff, 1);
-            directionalLight1.position.set(5, 5, 5);
-            directionalLight2.position.set(5, 5, 5);
-            scene1.add(directionalLight1);
-            scene2.add(directionalLight2);
-            
-            // Camera positions
-            camera1.position.set(5, 5, 5);
-            camera2.position.set(5, 5, 5);
-            camera1.lookAt(0, 0, 0);
-            camera2.lookAt(0, 0, 0);
-            
-            // Controls
-            const controls1 = new THREE.OrbitControls(camera1, renderer1.domElement);
-            const controls2 = new THREE.OrbitControls(camera2, renderer2.domElement);
-            controls1.enableDamping = true;
-            controls2.enableDamping = true;
-            
-            // Sync camera movements
-            controls1.addEventListener('change', () => {{
-                camera2.position.copy(camera1.position);
-                camera2.rotation.copy(camera1.rotation);
-                controls2.update();
-            }});
-            
-            controls2.addEventListener('change', () => {{
-                camera1.position.copy(camera2.position);
-                camera1.rotation.copy(camera2.rotation);
-                controls1.update();
-            }});
-            
-            // Animation loop
-            function animate() {{
-                requestAnimationFrame(animate);
-                
-                // Animate water for flooding
-                if ('{disaster_type}' === 'Flooding') {{
-                    const water = scene2.children.find(child => child.material && child.material.color.getHex() === 0x006994);
-                    if (water) {{
-                        water.rotation.z += 0.005;
-                        water.material.opacity = 0.5 + 0.1 * Math.sin(Date.now() * 0.001);
-                    }}
-                }}
-                
-                // Animate particles for volcanic eruption
-                if ('{disaster_type}' === 'Volcanic Eruption') {{
-                    const particles = scene2.children.find(child => child.type === 'Points');
-                    if (particles) {{
-                        particles.rotation.y += 0.01;
-                        const positions = particles.geometry.attributes.position;
-                        for (let i = 2; i < positions.count * 3; i += 3) {{
-                            positions.array[i] += 0.01;
-                            if (positions.array[i] > 3) positions.array[i] = 0;
-                        }}
-                        positions.needsUpdate = true;
-                    }}
-                }}
-                
-                controls1.update();
-                controls2.update();
-                renderer1.render(scene1, camera1);
-                renderer2.render(scene2, camera2);
-            }}
-            
-            animate();
-            
-            // Handle window resize
-            window.addEventListener('resize', () => {{
-                const newWidth = container.clientWidth;
-                const newHeight = container.clientHeight;
-                
-                camera1.aspect = (newWidth/2) / newHeight;
-                camera2.aspect = (newWidth/2) / newHeight;
-                camera1.updateProjectionMatrix();
-                camera2.updateProjectionMatrix();
-                
-                renderer1.setSize(newWidth/2, newHeight);
-                renderer2.setSize(newWidth/2, newHeight);
-            }});
-        </script>
-        
-        <!-- Labels and controls -->
-        <div style="position: absolute; top: 20px; left: 20px; color: white; font-family: 'Inter', sans-serif; background: rgba(0,0,0,0.7); padding: 15px; border-radius: 10px; z-index: 1000;">
-            <h4 style="margin: 0 0 10px 0; color: #ffffff;">🕐 BEFORE EVENT</h4>
-            <p style="margin: 5px 0; font-size: 14px;">Original terrain state</p>
-            <p style="margin: 5px 0; font-size: 14px;">📅 {pd.Timestamp.now().strftime('%Y-%m-%d')}</p>
-        </div>
-        
-        <div style="position: absolute; top: 20px; right: 20px; color: white; font-family: 'Inter', sans-serif; background: rgba(0,0,0,0.7); padding: 15px; border-radius: 10px; z-index: 1000;">
-            <h4 style="margin: 0 0 10px 0; color: #ffffff;">⚡ AFTER EVENT</h4>
-            <p style="margin: 5px 0; font-size: 14px;">{disaster_type} impact visible</p>
-            <p style="margin: 5px 0; font-size: 14px;">📅 {pd.Timestamp.now().strftime('%Y-%m-%d')}</p>
-        </div>
-        
-        <div style="position: absolute; bottom: 20px; left: 50%; transform: translateX(-50%); color: white; font-family: 'Inter', sans-serif; background: rgba(0,0,0,0.7); padding: 15px; border-radius: 10px; z-index: 1000; text-align: center;">
-            <h4 style="margin: 0 0 10px 0; color: #ffffff;">🎮 Interactive Controls</h4>
-            <p style="margin: 5px 0; font-size: 14px;">🖱️ Drag to rotate • 🔍 Scroll to zoom • Cameras are synchronized</p>
-            <p style="margin: 5px 0; font-size: 14px; color: #60a5fa;">Comparing {disaster_type} impact in {location}</p>
-        </div>
-    </div>
-    """
-    
-    st.components.v1.html(threejs_comparison, height=720)
+    # Static cached template fed with the same rasters as the heatmaps as binary typed arrays
+    threejs_payload = scenario_payload(
+        disaster_type, location, before_sar.shape,
+        change_threshold=DEFAULT_THRESHOLDS['log_ratio'],
+        date_label=pd.Timestamp.now().strftime('%Y-%m-%d')
+    )
+    st.components.v1.html(terrain_comparison_html(threejs_payload), height=720)
     
     # Analysis insights
     st.markdown("### 📊 Automated Analysis Results")
     
-    # Calculate statistics
+    # Calculate statistics from the tiled change-detection engine
+    detection = detect_changes(before_sar, after_sar, detector_options[change_detector])
     total_pixels = change_map.size
-    significant_change = np.abs(change_map) > 2  # 2dB threshold
+    significant_change = detection['classes'] != NO_CHANGE
     affected_pixels = np.sum(significant_change)
     affected_percentage = (affected_pixels / total_pixels) * 100
     mean_change = np.mean(change_map[significant_change]) if affected_pixels > 0 else 0
@@ -1210,185 +879,7 @@ elif st.session_state.current_page == 'Change Detection':
     # 3D Change Magnitude Visualization
     st.markdown("### 🌊 3D Change Magnitude Surface")
     
-    threejs_change_surface = f"""
-    <div id="change-surface" style="width: 100%; height: 500px; background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%); border-radius: 15px; position: relative; margin: 20px 0;">
-        <script>
-            // Create scene for change magnitude visualization
-            const changeScene = new THREE.Scene();
-            const changeCamera = new THREE.PerspectiveCamera(75, window.innerWidth / window.innerHeight, 0.1, 1000);
-            const changeRenderer = new THREE.WebGLRenderer({{ alpha: true }});
-            
-            const changeContainer = document.getElementById('change-surface');
-            changeRenderer.setSize(changeContainer.clientWidth, changeContainer.clientHeight);
-            changeRenderer.setClearColor(0x0f172a, 0.9);
-            changeContainer.appendChild(changeRenderer.domElement);
-            
-            // Generate change surface
-            const changeSurfaceGeometry = new THREE.PlaneGeometry(8, 8, 63, 63);
-            const changeVertices = changeSurfaceGeometry.attributes.position;
-            const colors = new Float32Array(changeVertices.count * 3);
-            
-            for (let i = 0; i < changeVertices.count; i++) {{
-                const x = changeVertices.getX(i);
-                const y = changeVertices.getY(i);
-                
-                // Generate change magnitude based on location and disaster type
-                let changeValue = 0;
-                
-                if ('{disaster_type}' === 'Flooding') {{
-                    if ('{location}' === 'Bangladesh Delta') {{
-                        // River-channel flooding pattern
-                        changeValue = -Math.abs(Math.sin(x * 3) * 2);
-                        if (Math.abs(Math.sin(x * 3)) < 0.3) changeValue -= 1;
-                    }} else {{
-                        changeValue = -Math.abs(Math.sin(x * 0.8) * Math.cos(y * 0.8) * 2);
-                    }}
-                }} else if ('{disaster_type}' === 'Wildfire') {{
-                    if ('{location}' === 'California Coast') {{
-                        // Wind-driven fire pattern
-                        changeValue = Math.max(0, Math.sin(x * 0.5 + y * 1.2) * 3);
-                    }} else if ('{location}' === 'Amazon Rainforest') {{
-                        // Scattered deforestation fires
-                        const distance = Math.sqrt(x*x + y*y);
-                        changeValue = Math.max(0, 2 - distance * 0.8) * (1 + Math.random() * 0.7);
-                    }} else {{
-                        const distance = Math.sqrt(x*x + y*y);
-                        changeValue = Math.max(0, 3 - distance) * (1 + Math.random() * 0.5);
-                    }}
-                }} else if ('{disaster_type}' === 'Volcanic Eruption') {{
-                    const distance = Math.sqrt(x*x + y*y);
-                    if ('{location}' === 'Italy Volcanic Region') {{
-                        // Realistic volcanic cone pattern
-                        changeValue = Math.max(0, 3 - distance * 0.3) * 1.5;
-                        // Add lava flow direction
-                        if (y < 0) changeValue *= 1.3;
-                    }} else {{
-                        changeValue = Math.max(0, 2 - distance * 0.5) * 2;
-                    }}
-                }} else if ('{disaster_type}' === 'Landslide') {{
-                    if ('{location}' === 'Nepal Mountains') {{
-                        // Mountain slope failure pattern
-                        changeValue = Math.sin(x * 0.8) * Math.cos(y * 0.3) * 2;
-                        if (x > 0 && y > -1 && y < 1) changeValue += 2;
-                    }} else {{
-                        changeValue = Math.sin(x * 0.5) * Math.cos(y * 0.5) * 1.5;
-                    }}
-                }} else if ('{disaster_type}' === 'Deforestation') {{
-                    if ('{location}' === 'Amazon Rainforest') {{
-                        // Road-based deforestation pattern
-                        changeValue = -Math.abs(Math.sin(x * 2) * 1.5);
-                        // Add branching pattern
-                        if (Math.abs(y) < 0.5) changeValue -= 1;
-                    }} else {{
-                        changeValue = -Math.abs(Math.sin(x * 0.6) * Math.cos(y * 0.6) * 1.2);
-                    }}
-                }} else {{
-                    changeValue = Math.sin(x * 0.5) * Math.cos(y * 0.5) * 1.5;
-                }}
-                
-                changeVertices.setZ(i, changeValue);
-                
-                // Color based on change magnitude
-                if (changeValue > 1) {{
-                    colors[i * 3] = 1;     // Red for positive change
-                    colors[i * 3 + 1] = 0.2;
-                    colors[i * 3 + 2] = 0.2;
-                }} else if (changeValue < -1) {{
-                    colors[i * 3] = 0.2;   // Blue for negative change
-                    colors[i * 3 + 1] = 0.4;
-                    colors[i * 3 + 2] = 1;
-                }} else {{
-                    colors[i * 3] = 0.5;   // Gray for no change
-                    colors[i * 3 + 1] = 0.6;
-                    colors[i * 3 + 2] = 0.5;
-                }}
-            }}
-            
-            changeSurfaceGeometry.setAttribute('color', new THREE.BufferAttribute(colors, 3));
-            changeSurfaceGeometry.attributes.position.needsUpdate = true;
-            changeSurfaceGeometry.computeVertexNormals();
-            
-            const changeMaterial = new THREE.MeshPhongMaterial({{
-                vertexColors: true,
-                wireframe: false,
-                transparent: true,
-                opacity: 0.8,
-                side: THREE.DoubleSide
-            }});
-            
-            const changeSurface = new THREE.Mesh(changeSurfaceGeometry, changeMaterial);
-            changeSurface.rotation.x = -Math.PI / 2;
-            changeScene.add(changeSurface);
-            
-            // Add wireframe overlay for better visualization
-            const wireframeMaterial = new THREE.MeshBasicMaterial({{
-                color: 0xffffff,
-                wireframe: true,
-                transparent: true,
-                opacity: 0.3
-            }});
-            const wireframe = new THREE.Mesh(changeSurfaceGeometry.clone(), wireframeMaterial);
-            wireframe.rotation.x = -Math.PI / 2;
-            wireframe.position.y = 0.01;
-            changeScene.add(wireframe);
-            
-            // Lighting for change surface
-            const changeAmbientLight = new THREE.AmbientLight(0x404040, 0.4);
-            changeScene.add(changeAmbientLight);
-            
-            const changeDirectionalLight = new THREE.DirectionalLight(0xffffff, 0.8);
-            changeDirectionalLight.position.set(10, 10, 5);
-            changeScene.add(changeDirectionalLight);
-            
-            // Camera and controls for change surface
-            changeCamera.position.set(6, 8, 6);
-            changeCamera.lookAt(0, 0, 0);
-            
-            const changeControls = new THREE.OrbitControls(changeCamera, changeRenderer.domElement);
-            changeControls.enableDamping = true;
-            changeControls.dampingFactor = 0.05;
-            
-            // Animation for change surface
-            function animateChange() {{
-                requestAnimationFrame(animateChange);
-                
-                // Gentle rotation for better viewing
-                changeSurface.rotation.z += 0.002;
-                wireframe.rotation.z += 0.002;
-                
-                changeControls.update();
-                changeRenderer.render(changeScene, changeCamera);
-            }}
-            
-            animateChange();
-            
-            // Handle resize for change surface
-            window.addEventListener('resize', () => {{
-                const newWidth = changeContainer.clientWidth;
-                const newHeight = changeContainer.clientHeight;
-                
-                changeCamera.aspect = newWidth / newHeight;
-                changeCamera.updateProjectionMatrix();
-                changeRenderer.setSize(newWidth, newHeight);
-            }});
-        </script>
-        
-        <div style="position: absolute; top: 20px; left: 20px; color: white; font-family: 'Inter', sans-serif; background: rgba(0,0,0,0.8); padding: 15px; border-radius: 10px;">
-            <h4 style="margin: 0 0 10px 0; color: #ffffff;">📊 Change Magnitude Surface</h4>
-            <p style="margin: 5px 0; font-size: 14px;">🔴 Red: Positive change (increase)</p>
-            <p style="margin: 5px 0; font-size: 14px;">🔵 Blue: Negative change (decrease)</p>
-            <p style="margin: 5px 0; font-size: 14px;">⚪ Gray: No significant change</p>
-        </div>
-        
-        <div style="position: absolute; bottom: 20px; right: 20px; color: white; font-family: 'Inter', sans-serif; background: rgba(0,0,0,0.8); padding: 15px; border-radius: 10px;">
-            <h4 style="margin: 0 0 10px 0; color: #ffffff;">🎯 Analysis Zone</h4>
-            <p style="margin: 5px 0; font-size: 14px;">{disaster_type} Impact Analysis</p>
-            <p style="margin: 5px 0; font-size: 14px;">Location: {location}</p>
-        </div>
-    </div>
-    """
-    
-    st.components.v1.html(threejs_change_surface, height=520)
+    st.components.v1.html(change_surface_html(threejs_payload), height=520)
     
     # Time series analysis
     st.markdown("### 📈 Temporal Change Analysis")
@@ -6,6 +6,8 @@ Advanced 3D visualization of Earth processes using SAR data
 import streamlit as st
 import streamlit.components.v1 as components
 
+from offset_tracking import ICE_VELOCITY_THRESHOLDS
+
 def create_digital_twin_component(width=800, height=600):
     """Create an advanced Three.js digital twin visualization component"""
     
@@ -590,6 +592,8 @@ def create_sar_data_layers():
         'ice_dynamics': {
             'colors': {'solid': [0.7, 0.9, 1.0], 'moving': [0.3, 0.6, 1.0], 'water': [0.1, 0.3, 0.8]},
             'thresholds': {'solid': -6, 'moving': -10, 'water': -18},
+            'velocity_thresholds': ICE_VELOCITY_THRESHOLDS,
+            'motion_estimation': 'FFT offset tracking (normalised cross-correlation)',
             'description': 'Ice sheet and glacier monitoring'
         }
     }
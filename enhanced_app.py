@@ -1,5 +1,4 @@
 import streamlit as st
-import geopandas as gpd
 import leafmap.foliumap as leafmap
 import plotly.express as px
 import plotly.graph_objects as go
@@ -8,6 +7,9 @@ import numpy as np
 from datetime import datetime, timedelta
 import json
 
+from geodata_loader import HAZARD_FILES, load_hazard, preload_hazards
+from mvt_server import add_vector_tile_layer
+
 st.set_page_config(
     page_title="SAR Disaster Lens - NASA Space Apps 2025", 
     layout="wide",
@@ -15,6 +17,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Parse every hazard's GeoJSON once in the background; later reruns hit the cache
+preload_hazards()
+
 # Custom CSS for NASA Space Apps styling
 st.markdown("""
 <style>
@@ -218,30 +223,22 @@ with tab1:
         
         analysis_mode = st.selectbox("Analysis Mode", analysis_modes)
         
-        # Load and display data (using existing GeoJSON files)
-        data_map = {
-            "Flood": ("data/flood_pre.geojson", "data/flood_post.geojson"),
-            "Forest Loss": ("data/forest_pre.geojson", "data/forest_post.geojson"),
-            "Fire": ("data/fire_pre.geojson", "data/fire_post.geojson"),
-        }
-        
-        if hazard in data_map:
-            pre_file, post_file = data_map[hazard]
-            
+        # Load and display data (using existing GeoJSON files, cached across reruns)
+        if hazard in HAZARD_FILES:
             try:
-                gdf_pre = gpd.read_file(pre_file)
-                gdf_post = gpd.read_file(post_file)
+                gdf_pre, gdf_post, load_seconds, from_cache = load_hazard(hazard)
+                st.caption(f"GeoJSON load: {load_seconds * 1000:.1f} ms {'(cached)' if from_cache else '(parsed)'}")
                 
                 # Enhanced map with multiple visualizations
                 m = leafmap.Map(center=[20, 80], zoom=6, height=500)
                 
                 # Add different layers based on polarization selection
                 if polarizations['VV']:
-                    m.add_gdf(gdf_pre, layer_name="VV Polarization - Pre", 
+                    add_vector_tile_layer(m, f"{hazard.lower().replace(' ', '_')}_pre", gdf_pre, layer_name="VV Polarization - Pre", 
                              style={"color": "#0000FF", "weight": 2, "fillOpacity": 0.6})
                 
                 if polarizations['VH']:
-                    m.add_gdf(gdf_post, layer_name="VH Polarization - Post", 
+                    add_vector_tile_layer(m, f"{hazard.lower().replace(' ', '_')}_post", gdf_post, layer_name="VH Polarization - Post", 
                              style={"color": "#FF0000", "weight": 2, "fillOpacity": 0.6})
                 
                 # Add base layers
@@ -0,0 +1,127 @@
+"""
+Cached GeoJSON Loading for SAR Disaster Lens
+Change-aware, process-wide cache of parsed hazard GeoDataFrames
+
+Parsed GeoDataFrames are kept for the lifetime of the server process and
+shared by every Streamlit session. Entries are keyed by path and validated
+against the file's mtime and size, so a file is parsed once per change
+rather than once per rerun. GeoJSON is parsed by the batched streaming
+reader in geojson_stream. All hazard files can be pre-parsed on a
+background thread at startup, and each load records its latency.
+"""
+
+import geopandas as gpd
+import os
+import threading
+import time
+from collections import namedtuple
+
+from geojson_stream import read_geojson
+
+# Pre/post GEE exports per hazard, shared by app.py and enhanced_app.py
+HAZARD_FILES = {
+    "Flood": ("data/flood_pre.geojson", "data/flood_post.geojson"),
+    "Forest Loss": ("data/forest_pre.geojson", "data/forest_post.geojson"),
+    "Fire": ("data/fire_pre.geojson", "data/fire_post.geojson"),
+}
+
+GEOJSON_SUFFIXES = ('.geojson', '.json')
+
+LoadRecord = namedtuple('LoadRecord', ['path', 'seconds', 'cache_hit'])
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class GeoDataCache:
+    """Parsed GeoDataFrames keyed by path and validated by (mtime, size)"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._path_locks = {}
+        self.history = []
+
+    def _path_lock(self, path):
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def load(self, path):
+        """GeoDataFrame for a path, parsing only if the file is new or has changed"""
+        path = os.path.abspath(path)
+        start = time.perf_counter()
+        # One parse per path at a time; concurrent callers wait for it instead of parsing again
+        with self._path_lock(path):
+            signature = _signature(path)
+            entry = self._entries.get(path)
+            cache_hit = entry is not None and entry[0] == signature
+            if not cache_hit:
+                entry = (signature, read_geojson(path) if path.lower().endswith(GEOJSON_SUFFIXES) else gpd.read_file(path))
+                self._entries[path] = entry
+        record = LoadRecord(path, time.perf_counter() - start, cache_hit)
+        with self._lock:
+            self.history.append(record)
+            del self.history[:-100]
+        # Shallow copy so callers cannot alter the cached frame's columns
+        return entry[1].copy(deep=False), record
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def cached_paths(self):
+        with self._lock:
+            return sorted(self._entries)
+
+
+_cache = GeoDataCache()
+_preload_thread = None
+
+
+def load_geojson(path):
+    """Cached (GeoDataFrame, LoadRecord) for one file"""
+    return _cache.load(path)
+
+
+def load_hazard(hazard, base_dir=None):
+    """
+    Cached pre/post GeoDataFrames for a hazard.
+
+    Returns (gdf_pre, gdf_post, load_seconds, all_cached).
+    """
+    paths = [os.path.join(base_dir, p) if base_dir else p for p in HAZARD_FILES[hazard]]
+    (gdf_pre, pre_record), (gdf_post, post_record) = [load_geojson(p) for p in paths]
+    return gdf_pre, gdf_post, pre_record.seconds + post_record.seconds, pre_record.cache_hit and post_record.cache_hit
+
+
+def preload_hazards(base_dir=None, background=True):
+    """Parse every hazard file once, by default on a daemon thread started at most once per process"""
+    global _preload_thread
+
+    def preload():
+        for hazard in HAZARD_FILES:
+            try:
+                load_hazard(hazard, base_dir)
+            except Exception:
+                # Missing or broken exports are reported when the page actually loads them
+                pass
+
+    if not background:
+        preload()
+        return None
+    with _cache._lock:
+        if _preload_thread is None:
+            _preload_thread = threading.Thread(target=preload, name='geojson-preload', daemon=True)
+            _preload_thread.start()
+    return _preload_thread
+
+
+def load_history():
+    """Recent LoadRecords (path, seconds, cache_hit), oldest first"""
+    with _cache._lock:
+        return list(_cache.history)
@@ -0,0 +1,512 @@
+"""
+Streaming GeoJSON Reader for SAR Disaster Lens
+Memory-mapped FeatureCollection parsing into ragged coordinate arrays
+
+gpd.read_file materialises a whole FeatureCollection, which does not scale
+to multi-gigabyte GEE exports over large AOIs. This reader memory-maps the
+file and finds feature boundaries with a vectorised scan of bracket depth
+outside strings. The scan runs over fixed-size chunks, so only the pages in
+use stay resident.
+
+Each batch of features is decoded with NumPy passes over its bytes, without
+building a dict per feature:
+  * coordinates become one flat float64 (n, 2) array plus offset arrays
+    (innermost first), the layout of shapely.to_ragged_array / GeoArrow;
+  * properties are parsed as newline-delimited JSON by pyarrow.
+A batch holds one geometry family. Polygon and MultiPolygon features of one
+batch share the MultiPolygon layout, and likewise for lines and points.
+GeometryCollections, mixed families, 3D positions and a top-level legacy
+"crs" member raise ValueError; read_geojson then falls back to
+gpd.read_file, which handles them.
+"""
+
+import geopandas as gpd
+import io
+import numpy as np
+import pandas as pd
+import re
+import shapely
+
+DEFAULT_BATCH_SIZE = 10000
+SCAN_CHUNK_BYTES = 16 << 20
+GEOGRAPHIC_CRS = 'EPSG:4326'
+
+_QUOTE, _BACKSLASH, _COLON = ord('"'), ord('\\'), ord(':')
+_DEPTH_DELTA = np.zeros(256, dtype=np.int8)
+_DEPTH_DELTA[[ord('{'), ord('[')]] = 1
+_DEPTH_DELTA[[ord('}'), ord(']')]] = -1
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[[ord(' '), ord('\t'), ord('\n'), ord('\r')]] = True
+_NUMBER_CHARS = np.zeros(256, dtype=bool)
+_NUMBER_CHARS[np.frombuffer(b'0123456789.-+eE', dtype=np.uint8)] = True
+_FEATURES_KEY = re.compile(rb'"features"\s*:\s*$')
+
+# Geometry type names identified by (length, first letter): (family, nesting depth of coordinates, multi)
+_GEOMETRY_TYPES = {
+    (5, ord('P')): ('point', 1, False),
+    (10, ord('M')): ('point', 2, True),
+    (10, ord('L')): ('line', 2, False),
+    (15, ord('M')): ('line', 3, True),
+    (7, ord('P')): ('polygon', 3, False),
+    (12, ord('M')): ('polygon', 4, True),
+}
+_RAGGED_TYPES = {
+    ('point', False): shapely.GeometryType.POINT,
+    ('point', True): shapely.GeometryType.MULTIPOINT,
+    ('line', False): shapely.GeometryType.LINESTRING,
+    ('line', True): shapely.GeometryType.MULTILINESTRING,
+    ('polygon', False): shapely.GeometryType.POLYGON,
+    ('polygon', True): shapely.GeometryType.MULTIPOLYGON,
+}
+
+
+def _structure(data, in_string=False, odd_backslashes=False, depth=0):
+    """
+    Unescaped quote positions and the bracket/brace positions outside strings with the depth after each.
+
+    The state arguments carry over from the previous chunk; returns
+    (quotes, structural, depth_after, (in_string, odd_backslashes, depth)).
+    """
+    quotes = np.flatnonzero(data == _QUOTE)
+    backslash = data == _BACKSLASH
+    if backslash.any():
+        # A quote is escaped by an odd run of backslashes right before it; runs reaching the
+        # chunk start continue the previous chunk's run
+        last_plain = np.maximum.accumulate(np.where(backslash, -1, np.arange(len(data))))
+        before = quotes - 1
+        clipped = np.maximum(before, 0)
+        run = np.where(before >= 0, before - last_plain[clipped], 0)
+        run += odd_backslashes & ((before < 0) | (last_plain[clipped] < 0))
+        quotes = quotes[run % 2 == 0]
+        trailing_run = len(data) - 1 - last_plain[-1] + (odd_backslashes and last_plain[-1] < 0)
+    else:
+        if odd_backslashes and len(quotes) and quotes[0] == 0:
+            quotes = quotes[1:]
+        trailing_run = odd_backslashes if len(data) == 0 else 0
+
+    delta = _DEPTH_DELTA[data]
+    structural = np.flatnonzero(delta)
+    # Inside a string when an odd number of real quotes precede the character
+    inside = (np.searchsorted(quotes, structural) + in_string) % 2 == 1
+    structural = structural[~inside]
+    depth_after = depth + np.cumsum(delta[structural], dtype=np.int64)
+    state = ((in_string + len(quotes)) % 2 == 1, trailing_run % 2 == 1,
+             int(depth_after[-1]) if len(depth_after) else depth)
+    return quotes, structural, depth_after, state
+
+
+def _check_top_level(data, depth):
+    """Raise ValueError for a top-level "crs" member in data outside the features array"""
+    quotes, structural, depth_after, _ = _structure(data, depth=depth)
+    crs_keys, _ = _Region(data, (quotes, structural, depth_after)).keys('crs', 1)
+    if len(crs_keys):
+        raise ValueError("Top-level 'crs' member; coordinates may not be EPSG:4326")
+
+
+def _scan_chunks(data, chunk_bytes=SCAN_CHUNK_BYTES):
+    """
+    Per scan chunk: the (k, 2) array of features completed in it and the
+    chunk's quotes, structural positions and depths (absolute positions,
+    limited to the inside of the features array).
+    """
+    state = (False, False, 0)
+    features_open = None
+    pending = None
+    for offset in range(0, len(data), chunk_bytes):
+        quotes, structural, depth_after, state = _structure(data[offset:offset + chunk_bytes], *state)
+        quotes, structural = quotes + offset, structural + offset
+        chars = data[structural]
+        if features_open is None:
+            # The features array is the '[' directly inside the top-level object after a "features" key
+            for index in np.flatnonzero((chars == ord('[')) & (depth_after == 2)):
+                position = structural[index]
+                if _FEATURES_KEY.search(bytes(data[max(0, position - 64):position])):
+                    features_open = position
+                    break
+            else:
+                continue
+            _check_top_level(data[:features_open], 0)
+        inside = structural > features_open
+        closed = np.flatnonzero(inside & (chars == ord(']')) & (depth_after == 1))
+        if len(closed):
+            _check_top_level(data[structural[closed[0]]:], 2)
+            inside &= structural < structural[closed[0]]
+        chars, depth_after, structural = chars[inside], depth_after[inside], structural[inside]
+        starts = structural[(chars == ord('{')) & (depth_after == 3)]
+        ends = structural[(chars == ord('}')) & (depth_after == 2)] + 1
+        if pending is not None:
+            starts = np.concatenate([[pending], starts])
+        pending = starts[len(ends)] if len(starts) > len(ends) else None
+        spans = np.stack([starts[:len(ends)], ends], axis=1).astype(np.int64)
+        yield spans, quotes[quotes > features_open], structural, depth_after
+        if len(closed):
+            return
+    if features_open is None:
+        raise ValueError("Not a GeoJSON FeatureCollection: no top-level 'features' array")
+
+
+def iter_feature_spans(data, chunk_bytes=SCAN_CHUNK_BYTES):
+    """(start, end) byte ranges of the features of a FeatureCollection held in a uint8 array or memmap"""
+    for spans, _, _, _ in _scan_chunks(data, chunk_bytes):
+        for start, end in spans.tolist():
+            yield start, end
+
+
+def _gather(data, starts, ends):
+    """Concatenation of the non-overlapping byte ranges [starts, ends) of data, plus each range's start in it"""
+    marks = np.zeros(len(data) + 1, dtype=np.int8)
+    np.add.at(marks, starts, 1)
+    np.add.at(marks, ends, -1)
+    lengths = ends - starts
+    return data[np.cumsum(marks[:-1], dtype=np.int8) > 0], np.cumsum(lengths) - lengths
+
+
+def _skip_whitespace(data, positions):
+    positions = positions.copy()
+    while True:
+        inside = positions < len(data)
+        blank = np.zeros(len(positions), dtype=bool)
+        blank[inside] = _WHITESPACE[data[positions[inside]]]
+        if not blank.any():
+            return positions
+        positions[blank] += 1
+
+
+class _Region:
+    """Structure of a run of consecutive features, used to locate member values by key"""
+
+    def __init__(self, data, structure=None):
+        self.data = data
+        quotes, self.structural, self.depth_after = structure or _structure(data)[:3]
+        self.opens, self.closes = quotes[0::2], quotes[1::2]
+        # Strings followed by ':' are object keys; values start after the colon
+        colon = _skip_whitespace(data, self.closes + 1)
+        is_key = np.zeros(len(colon), dtype=bool)
+        is_key[colon < len(data)] = data[colon[colon < len(data)]] == _COLON
+        self.key_opens, self.key_closes = self.opens[is_key], self.closes[is_key]
+        self.value_starts = _skip_whitespace(data, colon[is_key] + 1)
+        index = np.searchsorted(self.structural, self.key_opens) - 1
+        self.key_depths = np.where(index >= 0, self.depth_after[np.maximum(index, 0)], 0)
+
+    def keys(self, name, depth):
+        """Key-string and value-start positions of members called name at an object depth"""
+        name = name.encode()
+        match = (self.key_closes - self.key_opens - 1 == len(name)) & (self.key_depths == depth)
+        for i, char in enumerate(name):
+            match[match] = self.data[self.key_opens[match] + 1 + i] == char
+        return self.key_opens[match], self.value_starts[match]
+
+    def container_end(self, starts):
+        """Exclusive end of the object/array opening at each start position"""
+        index = np.searchsorted(self.structural, starts)
+        depth = self.depth_after[index]
+        ends = np.empty(len(starts), dtype=np.int64)
+        for level in np.unique(depth):
+            closers = self.structural[self.depth_after == level - 1]
+            at = depth == level
+            ends[at] = closers[np.searchsorted(closers, starts[at])] + 1
+        return ends
+
+
+def _members(region, feature_starts, name, depth, within=None):
+    """Per-feature value start of a member (-1 where absent); within limits matches to (starts, ends) spans"""
+    keys, values = region.keys(name, depth)
+    result = np.full(len(feature_starts), -1, dtype=np.int64)
+    if within is not None:
+        span_starts, span_ends = within
+        present = np.flatnonzero(span_starts >= 0)
+        index = np.searchsorted(span_starts[present], keys, side='right') - 1
+        ok = (index >= 0) & (keys < span_ends[present][np.maximum(index, 0)])
+        result[present[index[ok]]] = values[ok]
+    else:
+        result[np.searchsorted(feature_starts, keys, side='right') - 1] = values
+    return result
+
+
+def _child_offsets(parent_starts, child_starts):
+    """Offsets of children grouped under the last parent starting before each child"""
+    parent = np.searchsorted(parent_starts, child_starts, side='right') - 1
+    return np.concatenate([[0], np.cumsum(np.bincount(parent, minlength=len(parent_starts)))]).astype(np.int64)
+
+
+def _parse_numbers(text):
+    """Start positions and float64 values of the JSON numbers in a byte array"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    numbers = _NUMBER_CHARS[text]
+    first = numbers & ~np.concatenate([[False], numbers[:-1]])
+    token_starts = np.flatnonzero(first)
+    # Number characters packed back to back, so each token is exactly one string for pyarrow's parser
+    packed = text[numbers]
+    offsets = np.append(np.flatnonzero(first[numbers]), len(packed)).astype(np.int32)
+    strings = pa.StringArray.from_buffers(len(token_starts), pa.py_buffer(offsets), pa.py_buffer(packed))
+    try:
+        values = pc.cast(strings, pa.float64()).to_numpy(zero_copy_only=False)
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"Malformed coordinate values: {e}")
+    return token_starts, values
+
+
+def _parse_coordinates(data, starts, ends, nesting, family, multi):
+    """Flat (n, 2) coordinates and ragged offsets of coordinate arrays at the given byte ranges"""
+    text, text_starts = _gather(data, starts, ends)
+    delta = _DEPTH_DELTA[text]
+    brackets = np.flatnonzero(delta)
+    depth_after = np.cumsum(delta[brackets], dtype=np.int64)
+    opens = brackets[delta[brackets] > 0]
+    feature_of_open = np.searchsorted(text_starts, opens, side='right') - 1
+    # Level 0 is a position, 1 a ring or line, 2 a polygon of a MultiPolygon
+    level = nesting[feature_of_open] - depth_after[delta[brackets] > 0]
+    positions = opens[level == 0]
+
+    token_starts, values = _parse_numbers(text)
+    per_position = _child_offsets(positions, token_starts)
+    values_per_position = np.diff(per_position)
+    if np.any(values_per_position < 2):
+        raise ValueError("Coordinate positions need at least two values")
+    if np.any(values_per_position > 2):
+        raise ValueError("3D coordinate positions in feature batch")
+    coords = np.stack([values[per_position[:-1]], values[per_position[:-1] + 1]], axis=1)
+
+    n = len(starts)
+    if family == 'point' and not multi:
+        point_coords = np.full((n, 2), np.nan)
+        point_coords[np.searchsorted(text_starts, positions, side='right') - 1] = coords
+        return point_coords, ()
+    if family == 'point' or (family == 'line' and not multi):
+        return coords, (_child_offsets(text_starts, positions),)
+    parts = opens[level == 1]
+    offsets = [_child_offsets(parts, positions)]
+    if family == 'polygon' and multi:
+        polygons = opens[level == 2]
+        offsets.append(_child_offsets(polygons, parts))
+        parts = polygons
+    offsets.append(_child_offsets(text_starts, parts))
+    return coords, tuple(offsets)
+
+
+def _parse_properties(data, starts, ends, n):
+    """DataFrame of feature properties, parsed as newline-delimited JSON"""
+    import pyarrow as pa
+    import pyarrow.json as pa_json
+
+    present = starts >= 0
+    if not present.any():
+        return pd.DataFrame(index=pd.RangeIndex(n))
+    # One object per line: the byte after each object (a separator) becomes the newline,
+    # and raw newlines cannot occur inside JSON strings
+    text, line_starts = _gather(data, starts[present], ends[present] + 1)
+    text[text == ord('\n')] = ord(' ')
+    text[line_starts + ends[present] - starts[present]] = ord('\n')
+    try:
+        frame = pa_json.read_json(io.BytesIO(text.tobytes())).to_pandas()
+    except pa.ArrowInvalid:
+        # Values whose type changes between rows; pyarrow infers one type per column
+        import json
+        rows = json.loads(b'[' + b','.join(bytes(data[s:e]) for s, e in zip(starts[present], ends[present])) + b']')
+        frame = pd.DataFrame.from_records(rows)
+    if present.all():
+        return frame
+    full = pd.DataFrame(index=pd.RangeIndex(n), columns=frame.columns)
+    full.loc[np.flatnonzero(present)] = frame.to_numpy()
+    return full.infer_objects()
+
+
+class FeatureBatch:
+    """
+    Consecutive features of a FeatureCollection as ragged coordinate arrays.
+
+    coords is a flat (n, 2) float64 array and offsets are the int64 offset
+    arrays (innermost first) of shapely.from_ragged_array for geometry_type.
+    missing flags null geometries; single flags features that were single-part
+    in the source but share a Multi* layout with their batch; properties is a
+    DataFrame or None.
+    """
+
+    def __init__(self, start, geometry_type, coords, offsets, missing, properties=None, single=None):
+        self.start = start
+        self.geometry_type = geometry_type
+        self.coords = coords
+        self.offsets = offsets
+        self.missing = missing
+        self.properties = properties
+        self.single = single
+
+    def __len__(self):
+        return len(self.missing)
+
+    def feature(self, i):
+        """(coords, offsets) of one feature, with offsets relative to its own coords"""
+        if not self.offsets:
+            return self.coords[i:i + 1], ()
+        lo, hi = i, i + 1
+        offsets = []
+        for level in reversed(self.offsets):
+            segment = level[lo:hi + 1]
+            offsets.append(segment - segment[0])
+            lo, hi = segment[0], segment[-1]
+        return self.coords[lo:hi], tuple(reversed(offsets))
+
+    def geometries(self):
+        """Shapely geometries (None where the feature's geometry is null)"""
+        geometries = shapely.from_ragged_array(self.geometry_type, self.coords, self.offsets or None)
+        if self.single is not None and self.single.any():
+            # Point / LineString / Polygon features come back as their only part
+            geometries[self.single] = shapely.get_geometry(geometries[self.single], 0)
+        geometries[self.missing] = None
+        return geometries
+
+    def to_geodataframe(self, crs=GEOGRAPHIC_CRS):
+        frame = self.properties if self.properties is not None else pd.DataFrame(index=pd.RangeIndex(len(self)))
+        return gpd.GeoDataFrame(frame, geometry=self.geometries(), crs=crs)
+
+
+def _parse_batch(data, spans, first_index, properties, structure=None):
+    spans = np.asarray(spans, dtype=np.int64)
+    offset = spans[0, 0]
+    region = _Region(data[offset:spans[-1, 1]], structure)
+    feature_starts, feature_ends = spans[:, 0] - offset, spans[:, 1] - offset
+    n = len(spans)
+
+    geometry = _members(region, feature_starts, 'geometry', 1)
+    is_object = geometry >= 0
+    is_object[is_object] = region.data[geometry[is_object]] == ord('{')
+    geometry_starts = np.where(is_object, geometry, -1)
+    geometry_ends = np.full(n, -1, dtype=np.int64)
+    geometry_ends[is_object] = region.container_end(geometry_starts[is_object])
+    within = (geometry_starts, geometry_ends)
+    type_values = _members(region, feature_starts, 'type', 2, within)
+    coordinate_values = _members(region, feature_starts, 'coordinates', 2, within)
+
+    if np.any((type_values >= 0) & (coordinate_values < 0)):
+        raise ValueError("Geometry without coordinates (e.g. GeometryCollection) in feature batch")
+    missing = (type_values < 0) | (coordinate_values < 0)
+    present = np.flatnonzero(~missing)
+    # Geometry type names are told apart by their length and first letter
+    type_starts = type_values[present] + 1
+    name_ends = region.closes[np.searchsorted(region.closes, type_starts)]
+    codes = (name_ends - type_starts) * 256 + region.data[type_starts]
+    unique_codes, code_index = np.unique(codes, return_inverse=True)
+    kinds = [_GEOMETRY_TYPES.get((int(code) // 256, int(code) % 256)) for code in unique_codes]
+    if None in kinds:
+        raise ValueError("Unsupported geometry type (e.g. GeometryCollection) in feature batch")
+    families = {kind[0] for kind in kinds}
+    if len(families) > 1:
+        raise ValueError(f"Mixed geometry families {sorted(families)} in one feature batch")
+    family = families.pop() if families else 'polygon'
+    multi = any(kind[2] for kind in kinds)
+    nesting = np.array([kind[1] for kind in kinds], dtype=np.int64)[code_index]
+    single = None
+    if multi:
+        single = np.zeros(n, dtype=bool)
+        single[present] = ~np.array([kind[2] for kind in kinds], dtype=bool)[code_index]
+
+    starts = np.zeros(n, dtype=np.int64)
+    ends = np.zeros(n, dtype=np.int64)
+    starts[present] = coordinate_values[present]
+    ends[present] = region.container_end(coordinate_values[present])
+    full_nesting = np.zeros(n, dtype=np.int64)
+    full_nesting[present] = nesting
+    coords, offsets = _parse_coordinates(region.data, starts, ends, full_nesting, family, multi)
+
+    frame = None
+    if properties:
+        values = _members(region, feature_starts, 'properties', 1)
+        is_object = values >= 0
+        is_object[is_object] = region.data[values[is_object]] == ord('{')
+        value_starts = np.where(is_object, values, -1)
+        value_ends = np.full(n, -1, dtype=np.int64)
+        value_ends[is_object] = region.container_end(value_starts[is_object])
+        frame = _parse_properties(region.data, value_starts, value_ends, n)
+    return FeatureBatch(first_index, _RAGGED_TYPES[(family, multi)], coords, offsets, missing, frame, single)
+
+
+def iter_batches(path, batch_size=DEFAULT_BATCH_SIZE, properties=True, chunk_bytes=SCAN_CHUNK_BYTES):
+    """FeatureBatches of up to batch_size features from a memory-mapped GeoJSON FeatureCollection"""
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    spans = np.empty((0, 2), dtype=np.int64)
+    quotes = structural = depth_after = np.empty(0, dtype=np.int64)
+    index = 0
+    chunks = _scan_chunks(data, chunk_bytes)
+    done = False
+    while not done:
+        try:
+            chunk_spans, chunk_quotes, chunk_structural, chunk_depth = next(chunks)
+            spans = np.concatenate([spans, chunk_spans])
+            quotes = np.concatenate([quotes, chunk_quotes])
+            structural = np.concatenate([structural, chunk_structural])
+            depth_after = np.concatenate([depth_after, chunk_depth])
+        except StopIteration:
+            done = True
+        while len(spans) >= batch_size or (done and len(spans)):
+            batch, spans = spans[:batch_size], spans[batch_size:]
+            start, end = batch[0, 0], batch[-1, 1]
+            # Reuse the scan's structure; depths become relative to the features array
+            q, s = np.searchsorted(quotes, end), np.searchsorted(structural, end)
+            structure = (quotes[:q] - start, structural[:s] - start, depth_after[:s] - 2)
+            quotes, structural, depth_after = quotes[q:], structural[s:], depth_after[s:]
+            yield _parse_batch(data, batch, index, properties, structure)
+            index += len(batch)
+
+
+def iter_features(path, batch_size=DEFAULT_BATCH_SIZE):
+    """(index, geometry_type, coords, offsets) of every feature, parsed batch by batch"""
+    for batch in iter_batches(path, batch_size, properties=False):
+        for i in range(len(batch)):
+            yield (batch.start + i, batch.geometry_type) + batch.feature(i)
+
+
+def iter_geometries(path, batch_size=DEFAULT_BATCH_SIZE, bbox=None):
+    """(feature indices, Shapely geometry array) per batch, optionally only features intersecting bbox"""
+    for batch in iter_batches(path, batch_size, properties=False):
+        geometries = batch.geometries()
+        indices = np.arange(batch.start, batch.start + len(batch))
+        if bbox is not None:
+            keep = shapely.intersects(geometries, shapely.box(*bbox))
+            indices, geometries = indices[keep], geometries[keep]
+        yield indices, geometries
+
+
+def read_geojson(path, bbox=None, batch_size=DEFAULT_BATCH_SIZE, properties=True):
+    """
+    GeoDataFrame of a GeoJSON FeatureCollection, parsed in batches.
+
+    bbox (minx, miny, maxx, maxy) keeps only intersecting features, batch by
+    batch, so the result is all that is held in memory. Layouts the batch
+    parser does not handle are read with gpd.read_file instead.
+    """
+    try:
+        frames = []
+        for batch in iter_batches(path, batch_size, properties):
+            if bbox is not None and len(batch.coords):
+                minx, miny = np.nanmin(batch.coords, axis=0)
+                maxx, maxy = np.nanmax(batch.coords, axis=0)
+                if minx > bbox[2] or maxx < bbox[0] or miny > bbox[3] or maxy < bbox[1]:
+                    continue
+            gdf = batch.to_geodataframe()
+            if bbox is not None:
+                gdf = gdf[shapely.intersects(gdf.geometry.to_numpy(), shapely.box(*bbox))]
+            frames.append(gdf)
+    except ValueError:
+        return gpd.read_file(path, bbox=tuple(bbox) if bbox is not None else None)
+    if not frames:
+        return gpd.GeoDataFrame(geometry=[], crs=GEOGRAPHIC_CRS)
+    return gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=GEOGRAPHIC_CRS)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Stream a GeoJSON FeatureCollection and report its size")
+    parser.add_argument('path')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    features = vertices = 0
+    for feature_batch in iter_batches(args.path, args.batch_size, properties=False):
+        features += len(feature_batch)
+        vertices += len(feature_batch.coords)
+    print(f"{features} features, {vertices} vertices in {time.perf_counter() - start:.2f}s")
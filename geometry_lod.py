@@ -0,0 +1,136 @@
+"""
+Zoom-Level Geometry Simplification for SAR Disaster Lens
+Precomputed level-of-detail versions of vector layers for leafmap / folium maps
+
+folium embeds every vertex of a layer into the page, although at small map
+scales most of them fall within the same screen pixel. A GeometryPyramid
+holds one topology-preserving simplification of a layer per zoom range,
+with the tolerance set to a fraction of a web-mercator pixel at the most
+detailed zoom of that range. Features smaller than a pixel can be dropped.
+Above the last range the original geometries are used. Pyramids are cached
+by layer content, so each layer is simplified once per process.
+"""
+
+import hashlib
+import math
+import numpy as np
+import shapely
+from collections import OrderedDict
+
+TILE_SIZE = 256
+EARTH_CIRCUMFERENCE_M = 40075016.686
+# (min_zoom, max_zoom) ranges served by simplified levels; deeper zooms get full resolution
+DEFAULT_ZOOM_RANGES = ((0, 4), (5, 7), (8, 10), (11, 13))
+DEFAULT_TOLERANCE_PX = 0.5
+DEFAULT_MIN_AREA_PX = 0.25
+MAX_CACHED_PYRAMIDS = 16
+
+
+def pixel_size(zoom, geographic=True, latitude=0.0, tile_size=TILE_SIZE):
+    """
+    Ground size of one web-mercator pixel at a zoom level.
+
+    Degrees for geographic layers, metres for projected ones. Mercator pixels
+    shrink by cos(latitude), so pass the layer's highest absolute latitude for
+    a bound that holds everywhere in the layer.
+    """
+    scale = math.cos(math.radians(min(abs(latitude), 85.0511)))
+    world_units = 360.0 if geographic else EARTH_CIRCUMFERENCE_M
+    return world_units / (tile_size * 2 ** zoom) * scale
+
+
+def simplify_level(geometries, tolerance, min_area=0.0):
+    """
+    Topology-preserving simplification of a geometry array.
+
+    Returns (simplified, keep), where keep flags the geometries that are not
+    empty and not smaller than min_area (in squared layer units).
+    """
+    simplified = shapely.simplify(geometries, tolerance, preserve_topology=True)
+    keep = ~shapely.is_empty(simplified) & ~shapely.is_missing(simplified)
+    if min_area > 0:
+        polygonal = np.isin(shapely.get_type_id(geometries), (3, 6))
+        keep &= ~polygonal | (shapely.area(geometries) >= min_area)
+    return simplified, keep
+
+
+class GeometryPyramid:
+    """Per-zoom-range simplified copies of a GeoDataFrame"""
+
+    def __init__(self, gdf, zoom_ranges=DEFAULT_ZOOM_RANGES, tolerance_px=DEFAULT_TOLERANCE_PX,
+                 min_area_px=DEFAULT_MIN_AREA_PX):
+        self.source = gdf
+        self.zoom_ranges = tuple(sorted(tuple(r) for r in zoom_ranges))
+        geographic = gdf.crs is None or gdf.crs.is_geographic
+        geometries = gdf.geometry.to_numpy()
+        latitude = 0.0
+        if geographic and len(gdf) and not gdf.geometry.is_empty.all():
+            _, miny, _, maxy = gdf.total_bounds
+            latitude = max(abs(miny), abs(maxy))
+
+        self.levels = []
+        for min_zoom, max_zoom in self.zoom_ranges:
+            size = pixel_size(max_zoom, geographic, latitude)
+            simplified, keep = simplify_level(geometries, tolerance_px * size, min_area_px * size ** 2)
+            level = gdf[keep].copy()
+            level[gdf.geometry.name] = simplified[keep]
+            self.levels.append(level)
+
+    def level_index(self, zoom):
+        """Index of the simplified level covering a zoom, or None for full resolution"""
+        for index, (min_zoom, max_zoom) in enumerate(self.zoom_ranges):
+            if zoom <= max_zoom:
+                return index
+        return None
+
+    def for_zoom(self, zoom):
+        """GeoDataFrame to draw at a map zoom level"""
+        index = self.level_index(zoom)
+        return self.source if index is None else self.levels[index]
+
+    def vertex_counts(self):
+        """Total vertices per level, keyed by zoom range, plus the full-resolution count under None"""
+        counts = {None: int(shapely.get_num_coordinates(self.source.geometry.to_numpy()).sum())}
+        for zoom_range, level in zip(self.zoom_ranges, self.levels):
+            counts[zoom_range] = int(shapely.get_num_coordinates(level.geometry.to_numpy()).sum())
+        return counts
+
+
+def _layer_key(gdf, zoom_ranges, tolerance_px, min_area_px):
+    digest = hashlib.sha1()
+    for wkb in shapely.to_wkb(gdf.geometry.to_numpy()):
+        digest.update(wkb if wkb is not None else b'')
+    digest.update(repr((list(gdf.columns), list(gdf.index), str(gdf.crs))).encode())
+    return (digest.hexdigest(), tuple(tuple(r) for r in zoom_ranges), tolerance_px, min_area_px)
+
+
+class PyramidCache:
+    """LRU cache of GeometryPyramids keyed by layer geometries, columns and CRS"""
+
+    def __init__(self, max_entries=MAX_CACHED_PYRAMIDS):
+        self.max_entries = max_entries
+        self._pyramids = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, gdf, zoom_ranges=DEFAULT_ZOOM_RANGES, tolerance_px=DEFAULT_TOLERANCE_PX,
+            min_area_px=DEFAULT_MIN_AREA_PX):
+        key = _layer_key(gdf, zoom_ranges, tolerance_px, min_area_px)
+        if key in self._pyramids:
+            self.hits += 1
+            self._pyramids.move_to_end(key)
+            return self._pyramids[key]
+        self.misses += 1
+        pyramid = GeometryPyramid(gdf, zoom_ranges, tolerance_px, min_area_px)
+        self._pyramids[key] = pyramid
+        while len(self._pyramids) > self.max_entries:
+            self._pyramids.popitem(last=False)
+        return pyramid
+
+
+_default_cache = PyramidCache()
+
+
+def layer_for_zoom(gdf, zoom, cache=None, **kwargs):
+    """Cached level-of-detail copy of a layer for a map zoom level"""
+    return (cache or _default_cache).get(gdf, **kwargs).for_zoom(zoom)
@@ -0,0 +1,334 @@
+"""
+Bulk Ingestion of Earth Engine Exports for SAR Disaster Lens
+Headless loading of GEE GeoJSON exports into a hazard/date-partitioned store
+
+The GEE scripts export {prefix}_{epoch} GeoJSON (flood_post, fire_post,
+forest_post) to Drive. This command scans a directory of those exports and
+repairs invalid geometries in worker processes. Each export becomes a
+Hilbert-sorted GeoParquet (or FlatGeobuf) file at
+    {root}/{hazard}/date={YYYY-MM-DD}/{epoch}-{digest}.parquet
+through hazard_store.convert_layer, so partitions keep its bbox pushdown.
+Every layer is recorded in {root}/catalog.json under its partition path,
+i.e. by (hazard, date, epoch, digest), and every source file with its
+signature and the layer it produced. Re-runs therefore skip unchanged exports
+without reading them, and identical content dropped under two names for the
+same date is stored once. When an export changes, the layer it superseded is
+removed along with its file. The run never imports Streamlit and can be
+scheduled next to the app.
+"""
+
+import datetime
+import geopandas as gpd
+import hashlib
+import json
+import numpy as np
+import os
+import pandas as pd
+import re
+import shapely
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from geodata_loader import HAZARD_FILES, _signature
+from geojson_stream import read_geojson
+from hazard_store import DEFAULT_STORE_DIR, EPOCHS, STORE_FORMATS, convert_layer, read_layer
+
+MANIFEST_NAME = 'catalog.json'
+EXPORT_SUFFIXES = ('.geojson', '.json')
+DIGEST_CHARS = 12
+# Export prefixes as used by the data/ files: flood -> Flood, forest -> Forest Loss, fire -> Fire
+HAZARD_PREFIXES = {os.path.basename(files[0]).split('_')[0]: hazard for hazard, files in HAZARD_FILES.items()}
+# flood_post.geojson, fire_pre_2024-07-01.geojson, forest_post-20240701-0000000000.geojson, ...
+_EXPORT_NAME = re.compile(r'^(?P<prefix>[a-z]+)_(?P<epoch>' + '|'.join(EPOCHS) + r')(?P<rest>.*)$', re.IGNORECASE)
+_DATE = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})')
+
+
+def parse_export_name(path):
+    """
+    (hazard, epoch, date) of an export file, or None if it is not one.
+
+    The acquisition date (ISO string) comes from a YYYY-MM-DD or YYYYMMDD
+    token after the epoch, falling back to the file's modification date (UTC).
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = _EXPORT_NAME.match(name)
+    if not match or match['prefix'].lower() not in HAZARD_PREFIXES:
+        return None
+    date = None
+    for year, month, day in _DATE.findall(match['rest']):
+        try:
+            date = datetime.date(int(year), int(month), int(day))
+            break
+        except ValueError:
+            continue
+    if date is None:
+        date = datetime.datetime.fromtimestamp(os.path.getmtime(path), datetime.timezone.utc).date()
+    return HAZARD_PREFIXES[match['prefix'].lower()], match['epoch'].lower(), date.isoformat()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-1 of a file's content, read in chunks"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _polygonal_parts(geometries):
+    """Polygonal parts of geometry collections (as MultiPolygons); collections without any become None"""
+    parts, owner = shapely.get_parts(geometries, return_index=True)
+    # Collections can hold MultiPolygons, which need one more level of flattening
+    parts, part_owner = shapely.get_parts(parts, return_index=True)
+    owner = owner[part_owner]
+    polygons = shapely.get_type_id(parts) == 3
+    result = np.full(len(geometries), None, dtype=object)
+    if polygons.any():
+        owners, starts = np.unique(owner[polygons], return_index=True)
+        groups = np.split(parts[polygons], starts[1:])
+        result[owners] = [shapely.multipolygons(group) for group in groups]
+    return result
+
+
+def repair_geometries(geometries):
+    """
+    Make invalid geometries valid, keeping their dimension.
+
+    make_valid can turn a self-intersecting polygon into a collection with
+    stray lines or points; only the polygonal parts of those are kept, and
+    polygons that collapse entirely are dropped.
+    Returns (geometries, keep, repaired_count) where keep flags the non-empty,
+    non-missing results.
+    """
+    geometries = np.asarray(geometries, dtype=object).copy()
+    invalid = ~shapely.is_missing(geometries) & ~shapely.is_valid(geometries)
+    if invalid.any():
+        fixed = shapely.make_valid(geometries[invalid])
+        fixed_types = shapely.get_type_id(fixed)
+        polygonal = np.isin(shapely.get_type_id(geometries[invalid]), (3, 6))
+        collections = polygonal & (fixed_types == 7)
+        if collections.any():
+            fixed[collections] = _polygonal_parts(fixed[collections])
+        # Polygons that collapsed to lines or points are dropped
+        fixed[polygonal & ~np.isin(fixed_types, (3, 6, 7))] = None
+        geometries[invalid] = fixed
+    keep = ~shapely.is_missing(geometries) & ~shapely.is_empty(geometries)
+    return geometries, keep, int(invalid.sum())
+
+
+def partition_path(hazard, date, epoch, digest, fmt='parquet', root=DEFAULT_STORE_DIR):
+    slug = hazard.lower().replace(' ', '_')
+    return os.path.join(root, slug, f"date={date}", f"{epoch}-{digest[:DIGEST_CHARS]}{STORE_FORMATS[fmt]}")
+
+
+def ingest_export(path, hazard, epoch, date, fmt='parquet', root=DEFAULT_STORE_DIR):
+    """Validate, repair and store one export; returns its catalogue record"""
+    start = time.perf_counter()
+    digest = file_digest(path)
+    # Streamed in batches, so multi-gigabyte exports never exist as one parsed JSON document
+    gdf = read_geojson(path)
+    if gdf.crs is None:
+        # RFC 7946 GeoJSON is always WGS84
+        gdf = gdf.set_crs('EPSG:4326')
+    geometries, keep, repaired = repair_geometries(gdf.geometry.to_numpy())
+    gdf = gdf[keep].copy()
+    gdf[gdf.geometry.name] = geometries[keep]
+
+    dest = partition_path(hazard, date, epoch, digest, fmt, root)
+    # Write next to the destination and rename, so readers never see a partial file
+    stem, ext = os.path.splitext(dest)
+    tmp_path = f"{stem}.{os.getpid()}.tmp{ext}"
+    try:
+        convert_layer(gdf, tmp_path)
+        os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {
+        'digest': digest,
+        'hazard': hazard,
+        'epoch': epoch,
+        'date': date,
+        'path': os.path.relpath(dest, root),
+        'format': fmt,
+        'source': os.path.abspath(path),
+        'features': int(len(gdf)),
+        'repaired': repaired,
+        'dropped': int((~keep).sum()),
+        'bbox': [float(v) for v in gdf.total_bounds] if len(gdf) else None,
+        'crs': str(gdf.crs),
+        'bytes': os.path.getsize(dest),
+        'seconds': round(time.perf_counter() - start, 3),
+        'ingested_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+    }
+
+
+def _ingest_task(task):
+    path, hazard, epoch, date, fmt, root = task
+    try:
+        return path, ingest_export(path, hazard, epoch, date, fmt, root), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def load_manifest(root=DEFAULT_STORE_DIR):
+    """Catalogue of ingested layers: {'layers': {partition path: record}, 'sources': {path: {signature, layer}}}"""
+    path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'layers': {}, 'sources': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(records, sources, root):
+    # Merge into the catalogue as it is on disk now, in case another run finished meanwhile
+    manifest = load_manifest(root)
+    manifest['layers'].update(records)
+    manifest['sources'].update(sources)
+    # Layers no source produces any more were superseded by a changed export
+    current = {source['layer'] for source in manifest['sources'].values()}
+    for key in set(manifest['layers']) - current:
+        del manifest['layers'][key]
+        stale = os.path.join(root, key)
+        if os.path.exists(stale):
+            os.remove(stale)
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def scan_exports(source_dir, recursive=False):
+    """Export files under a directory as [(path, hazard, epoch, date)], plus the unrecognised file paths"""
+    if recursive:
+        paths = [os.path.join(d, name) for d, _, names in os.walk(source_dir) for name in names]
+    else:
+        paths = [os.path.join(source_dir, name) for name in os.listdir(source_dir)]
+    exports, unrecognised = [], []
+    for path in sorted(paths):
+        if not path.lower().endswith(EXPORT_SUFFIXES) or not os.path.isfile(path):
+            continue
+        parsed = parse_export_name(path)
+        if parsed is None:
+            unrecognised.append(path)
+        else:
+            exports.append((path,) + parsed)
+    return exports, unrecognised
+
+
+def ingest_directory(source_dir, root=DEFAULT_STORE_DIR, fmt='parquet', workers=None, limit=None,
+                     recursive=False, progress=None):
+    """
+    Ingest every new or changed export in a directory.
+
+    Exports whose (mtime, size) match the catalogue are skipped without being
+    read. limit caps the number of exports handled per run, which bounds its
+    duration when a large backlog arrives at once. progress(path, record,
+    error) is called as each export finishes. Returns a summary with the
+    'ingested' records, 'failed' (path, error) pairs and 'skipped' and
+    'unrecognised' paths.
+    """
+    start = time.perf_counter()
+    workers = workers if workers is not None else os.cpu_count() or 1
+    manifest = load_manifest(root)
+    exports, unrecognised = scan_exports(source_dir, recursive)
+
+    pending, skipped = [], []
+    for path, hazard, epoch, date in exports:
+        known = manifest['sources'].get(os.path.abspath(path))
+        if known and tuple(known['signature']) == _signature(path) and known.get('layer') in manifest['layers']:
+            skipped.append(path)
+        else:
+            pending.append((path, hazard, epoch, date, fmt, root))
+    if limit is not None:
+        pending = pending[:limit]
+
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            results = (future.result() for future in as_completed([pool.submit(_ingest_task, t) for t in pending]))
+            results = [_report(result, progress) for result in results]
+    else:
+        results = [_report(_ingest_task(task), progress) for task in pending]
+
+    records, sources, failed = {}, {}, []
+    for path, record, error in results:
+        if error is not None:
+            failed.append((path, error))
+            continue
+        records[record['path']] = record
+        sources[record['source']] = {'signature': list(_signature(path)), 'layer': record['path']}
+    if records:
+        _save_manifest(records, sources, root)
+    return {
+        'ingested': sorted(records.values(), key=lambda r: (r['hazard'], r['date'], r['epoch'])),
+        'failed': failed,
+        'skipped': skipped,
+        'unrecognised': unrecognised,
+        'seconds': time.perf_counter() - start
+    }
+
+
+def _report(result, progress):
+    if progress is not None:
+        progress(*result)
+    return result
+
+
+def find_layers(hazard=None, epoch=None, start=None, end=None, bbox=None, root=DEFAULT_STORE_DIR):
+    """Catalogue records matching a hazard, epoch, inclusive ISO date range and bbox, oldest first"""
+    matches = []
+    for record in load_manifest(root)['layers'].values():
+        if hazard is not None and record['hazard'] != hazard:
+            continue
+        if epoch is not None and record['epoch'] != epoch:
+            continue
+        if (start is not None and record['date'] < start) or (end is not None and record['date'] > end):
+            continue
+        if bbox is not None:
+            if record['bbox'] is None:
+                continue
+            minx, miny, maxx, maxy = record['bbox']
+            if minx > bbox[2] or maxx < bbox[0] or miny > bbox[3] or maxy < bbox[1]:
+                continue
+        matches.append(record)
+    return sorted(matches, key=lambda r: (r['date'], r['hazard'], r['epoch'], r['digest']))
+
+
+def read_partitions(hazard, epoch, start=None, end=None, bbox=None, filters=None, root=DEFAULT_STORE_DIR):
+    """Features of all catalogued layers of a hazard/epoch in a date range, with a 'date' column"""
+    frames = []
+    for record in find_layers(hazard, epoch, start, end, bbox, root):
+        gdf = read_layer(os.path.join(root, record['path']), bbox, filters)
+        frames.append(gdf.assign(date=record['date']))
+    if not frames:
+        return gpd.GeoDataFrame({'date': []}, geometry=[], crs='EPSG:4326')
+    return gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=frames[0].crs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest Earth Engine GeoJSON exports into the partitioned hazard store")
+    parser.add_argument('source_dir', help="Directory holding {flood,fire,forest}_{pre,post}[_YYYY-MM-DD] exports")
+    parser.add_argument('--root', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--format', choices=sorted(STORE_FORMATS), default='parquet')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--limit', type=int, default=None, help="Maximum exports to ingest in this run")
+    parser.add_argument('--recursive', action='store_true')
+    args = parser.parse_args()
+
+    def print_progress(path, record, error):
+        if error is not None:
+            print(f"FAILED {path}: {error}")
+        else:
+            print(f"{record['hazard']} {record['epoch']} {record['date']}: {record['features']} features "
+                  f"({record['repaired']} repaired, {record['dropped']} dropped) -> {record['path']}")
+
+    summary = ingest_directory(args.source_dir, args.root, args.format, args.workers, args.limit,
+                               args.recursive, print_progress)
+    print(f"Ingested {len(summary['ingested'])}, skipped {len(summary['skipped'])} unchanged, "
+          f"{len(summary['failed'])} failed, {len(summary['unrecognised'])} unrecognised "
+          f"in {summary['seconds']:.1f}s")
@@ -0,0 +1,162 @@
+"""
+Columnar Hazard Polygon Store for SAR Disaster Lens
+GeoParquet / FlatGeobuf copies of the GEE exports with bbox and attribute pushdown
+
+Each hazard/epoch GeoJSON is converted once into either
+  * GeoParquet, with features sorted along a Hilbert curve, small row groups
+    and a covering bbox column, so pyarrow skips row groups whose bbox
+    statistics miss the query window; or
+  * FlatGeobuf, with its packed Hilbert R-tree spatial index.
+Readers push a bounding box and simple attribute predicates down to the
+storage layer, so only features intersecting the current map view are read.
+"""
+
+import geopandas as gpd
+import math
+import numpy as np
+import operator
+import os
+import time
+
+from geodata_loader import HAZARD_FILES, load_hazard
+
+DEFAULT_STORE_DIR = os.path.join('data', 'store')
+STORE_FORMATS = {'parquet': '.parquet', 'fgb': '.fgb'}
+EPOCHS = ('pre', 'post')
+ROW_GROUP_SIZE = 10000
+FILTER_OPERATORS = ('=', '==', '!=', '<', '<=', '>', '>=', 'in', 'not in')
+_COMPARISONS = {'=': operator.eq, '==': operator.eq, '!=': operator.ne,
+                '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+def convert_layer(source, dest, row_group_size=ROW_GROUP_SIZE):
+    """Write a vector file as GeoParquet (.parquet) or FlatGeobuf (.fgb) with a spatial index"""
+    gdf = source if isinstance(source, gpd.GeoDataFrame) else gpd.read_file(source)
+    if len(gdf):
+        # Spatially clustered rows give tight per-row-group / per-node bounding boxes
+        gdf = gdf.iloc[gdf.geometry.hilbert_distance().argsort()].reset_index(drop=True)
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    if dest.endswith('.parquet'):
+        gdf.to_parquet(dest, write_covering_bbox=True, row_group_size=row_group_size)
+    elif dest.endswith('.fgb'):
+        gdf.to_file(dest, driver='FlatGeobuf', SPATIAL_INDEX='YES')
+    else:
+        raise ValueError(f"Unsupported store file '{dest}', expected one of {sorted(STORE_FORMATS.values())}")
+    return dest
+
+
+def _sql_literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def filters_to_sql(filters):
+    """[(column, op, value), ...] (AND-ed) as an OGR SQL WHERE clause"""
+    clauses = []
+    for column, op, value in filters:
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator '{op}'")
+        if op in ('in', 'not in'):
+            clauses.append(f'"{column}" {op.upper()} ({", ".join(_sql_literal(v) for v in value)})')
+        else:
+            clauses.append(f'"{column}" {"=" if op == "==" else op} {_sql_literal(value)}')
+    return ' AND '.join(clauses)
+
+
+def read_layer(path, bbox=None, filters=None, columns=None):
+    """
+    Read features of a store file intersecting bbox (minx, miny, maxx, maxy)
+    that satisfy all (column, op, value) filters.
+    """
+    if path.endswith('.parquet'):
+        parquet_filters = [(c, '==' if op == '=' else op, v) for c, op, v in filters] if filters else None
+        return gpd.read_parquet(path, columns=columns, bbox=bbox, filters=parquet_filters)
+    where = filters_to_sql(filters) if filters else None
+    return gpd.read_file(path, bbox=tuple(bbox) if bbox is not None else None, where=where, columns=columns)
+
+
+def store_path(hazard, epoch, fmt='parquet', root=DEFAULT_STORE_DIR):
+    slug = hazard.lower().replace(' ', '_')
+    return os.path.join(root, slug, f"{epoch}{STORE_FORMATS[fmt]}")
+
+
+def build_store(fmt='parquet', root=DEFAULT_STORE_DIR, hazards=None):
+    """Convert the hazard GeoJSON exports into the store; returns the written paths"""
+    written = []
+    for hazard in hazards or HAZARD_FILES:
+        for epoch, source in zip(EPOCHS, HAZARD_FILES[hazard]):
+            written.append(convert_layer(source, store_path(hazard, epoch, fmt, root)))
+    return written
+
+
+def view_bbox(center, zoom, width_px, height_px, tile_size=256):
+    """Approximate (minx, miny, maxx, maxy) in degrees of a web-mercator map view centred on [lat, lon]"""
+    lat, lon = center
+    world_px = tile_size * 2 ** zoom
+    x = (lon + 180.0) / 360.0 * world_px
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * world_px
+
+    def to_lon(px):
+        return px / world_px * 360.0 - 180.0
+
+    def to_lat(py):
+        return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * py / world_px))))
+
+    half_w, half_h = width_px / 2.0, height_px / 2.0
+    return (max(to_lon(x - half_w), -180.0), max(to_lat(min(y + half_h, world_px)), -85.0511),
+            min(to_lon(x + half_w), 180.0), min(to_lat(max(y - half_h, 0.0)), 85.0511))
+
+
+def _is_current(path, source):
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source)
+
+
+def load_hazard_view(hazard, bbox=None, filters=None, root=DEFAULT_STORE_DIR):
+    """
+    Pre/post features of a hazard intersecting a map view.
+
+    Reads from the store (GeoParquet preferred) when it is at least as new as
+    the GeoJSON export, otherwise from the cached GeoJSON loader. Returns
+    (gdf_pre, gdf_post, load_seconds, source) with source 'store', 'cached'
+    or 'parsed'.
+    """
+    start = time.perf_counter()
+    for fmt in STORE_FORMATS:
+        paths = [store_path(hazard, epoch, fmt, root) for epoch in EPOCHS]
+        if all(_is_current(path, source) for path, source in zip(paths, HAZARD_FILES[hazard])):
+            gdf_pre, gdf_post = [read_layer(path, bbox, filters) for path in paths]
+            return gdf_pre, gdf_post, time.perf_counter() - start, 'store'
+
+    gdf_pre, gdf_post, _, from_cache = load_hazard(hazard)
+    if filters:
+        gdf_pre, gdf_post = [gdf[_filter_mask(gdf, filters)] for gdf in (gdf_pre, gdf_post)]
+    if bbox is not None:
+        minx, miny, maxx, maxy = bbox
+        gdf_pre, gdf_post = gdf_pre.cx[minx:maxx, miny:maxy], gdf_post.cx[minx:maxx, miny:maxy]
+    return gdf_pre, gdf_post, time.perf_counter() - start, 'cached' if from_cache else 'parsed'
+
+
+def _filter_mask(gdf, filters):
+    mask = np.ones(len(gdf), dtype=bool)
+    for column, op, value in filters:
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator '{op}'")
+        series = gdf[column]
+        if op in ('in', 'not in'):
+            result = series.isin(value) if op == 'in' else ~series.isin(value)
+        else:
+            result = _COMPARISONS[op](series, value)
+        mask &= np.asarray(result, dtype=bool)
+    return mask
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert hazard GeoJSON exports into the columnar store")
+    parser.add_argument('--format', choices=sorted(STORE_FORMATS), default='parquet')
+    parser.add_argument('--root', default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+    for written_path in build_store(args.format, args.root):
+        print(f"Wrote {written_path}")
@@ -0,0 +1,136 @@
+"""
+Viewport-Aware Heatmap Decimation for SAR Disaster Lens
+Block-reduced raster pyramids that keep Plotly heatmap payloads constant in size
+
+Each pyramid level halves the resolution of the one below with a mean, max or
+min reduction, built tile by tile. For a given plot size and visible window
+the coarsest level that still gives about one value per screen pixel is
+selected and only the visible window of that level is sent to the browser.
+"""
+
+import numpy as np
+import warnings
+from functools import lru_cache
+
+from raster_tiles import DEFAULT_TILE_SIZE, TileWindow, iter_tiles, window_reader
+
+REDUCERS = {
+    'mean': np.nanmean,
+    'max': np.nanmax,
+    'min': np.nanmin
+}
+
+
+def block_reduce(array, factor, how='mean'):
+    """Reduce an array by non-overlapping factor x factor blocks; ragged edges are NaN-padded"""
+    if factor == 1:
+        return np.asarray(array, dtype=np.float32)
+    rows, cols = array.shape
+    out_rows, out_cols = -(-rows // factor), -(-cols // factor)
+    padded = np.full((out_rows * factor, out_cols * factor), np.nan, dtype=np.float32)
+    padded[:rows, :cols] = array
+    blocks = padded.reshape(out_rows, factor, out_cols, factor)
+    # All-NaN blocks are expected along ragged edges
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return REDUCERS[how](blocks, axis=(1, 3)).astype(np.float32)
+
+
+def _clip_range(value_range, size):
+    """Integer [start, stop) pixel span covering a float axis range"""
+    if value_range is None:
+        return 0, size
+    start = max(0, int(np.floor(min(value_range))))
+    stop = min(size, int(np.ceil(max(value_range))) + 1)
+    return min(start, size - 1), max(stop, start + 1)
+
+
+class RasterPyramid:
+    """Power-of-two overview pyramid over an array, memmap or window reader"""
+
+    def __init__(self, source, shape=None, how='mean', tile_size=DEFAULT_TILE_SIZE, min_size=64):
+        if how not in REDUCERS:
+            raise ValueError(f"Unknown reduction '{how}', expected one of {sorted(REDUCERS)}")
+        self.shape = tuple((shape or source.shape)[:2])
+        self.how = how
+        self.tile_size = tile_size
+        self._read = window_reader(source)
+        self.levels = [None]  # level 0 is read on demand from the source
+        self._build(min_size)
+
+    def _build(self, min_size):
+        """Build overview levels tile by tile until the coarsest fits within min_size"""
+        level_shape = self.shape
+        reader = self._read
+        factor = 2
+        # Tiles must align with the reduction blocks
+        tile = max(factor, self.tile_size - self.tile_size % factor)
+        while max(level_shape) > min_size:
+            next_shape = (-(-level_shape[0] // factor), -(-level_shape[1] // factor))
+            level = np.empty(next_shape, dtype=np.float32)
+            for window in iter_tiles(level_shape, tile):
+                reduced = block_reduce(np.asarray(reader(window), dtype=np.float32), factor, self.how)
+                row, col = window.row // factor, window.col // factor
+                level[row:row + reduced.shape[0], col:col + reduced.shape[1]] = reduced
+            self.levels.append(level)
+            level_shape = next_shape
+            reader = window_reader(level)
+
+    @property
+    def n_levels(self):
+        return len(self.levels)
+
+    def level_shape(self, level):
+        if level == 0:
+            return self.shape
+        return self.levels[level].shape
+
+    def read(self, level, row0, row1, col0, col1):
+        """Window of a level in that level's pixel coordinates"""
+        if level == 0:
+            return np.asarray(self._read(TileWindow(row0, col0, row1 - row0, col1 - col0)), dtype=np.float32)
+        return self.levels[level][row0:row1, col0:col1]
+
+    def choose_level(self, visible_rows, visible_cols, plot_height_px, plot_width_px):
+        """Coarsest level that still gives at least one value per screen pixel"""
+        scale = max(visible_rows / max(plot_height_px, 1), visible_cols / max(plot_width_px, 1), 1.0)
+        level = int(np.floor(np.log2(scale)))
+        return min(max(level, 0), self.n_levels - 1)
+
+    def viewport(self, x_range=None, y_range=None, plot_width_px=600, plot_height_px=400):
+        """
+        z values plus full-resolution x/y pixel coordinates for a visible window.
+
+        x_range/y_range are in full-resolution column/row units (e.g. a box
+        selection, see viewport_from_selection); None means the whole raster.
+        """
+        rows, cols = self.shape
+        x0, x1 = _clip_range(x_range, cols)
+        y0, y1 = _clip_range(y_range, rows)
+
+        level = self.choose_level(y1 - y0, x1 - x0, plot_height_px, plot_width_px)
+        factor = 2 ** level
+        r0, r1 = y0 // factor, -(-y1 // factor)
+        c0, c1 = x0 // factor, -(-x1 // factor)
+        z = self.read(level, r0, r1, c0, c1)
+        # Cell centres in full-resolution pixel units keep axes stable across levels
+        x = (np.arange(c0, c0 + z.shape[1]) + 0.5) * factor - 0.5
+        y = (np.arange(r0, r0 + z.shape[0]) + 0.5) * factor - 0.5
+        return {'z': z, 'x': x, 'y': y, 'level': level, 'factor': factor}
+
+
+def viewport_from_selection(selection, axes=('x', 'x2', 'x3')):
+    """(x_range, y_range) of the last box selection made on one of the heatmap axes"""
+    boxes = (selection or {}).get('box') or []
+    for box in reversed(boxes):
+        if box.get('xref', 'x') in axes and 'x' in box and 'y' in box:
+            return tuple(box['x']), tuple(box['y'])
+    return None
+
+
+@lru_cache(maxsize=32)
+def get_scenario_pyramid(disaster_type, location, resolution, band, how='mean', seed=42):
+    """Cached pyramid over one band of a generated change scenario"""
+    from scenario_generator import get_scenario
+    scene = get_scenario(disaster_type, location, tuple(resolution), seed)
+    return RasterPyramid(scene.band_reader(band), shape=scene.shape, how=how)
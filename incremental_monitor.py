@@ -0,0 +1,336 @@
+"""
+Incremental Change Monitoring for SAR Disaster Lens
+Per-tile persistent state updated as new Sentinel-1 acquisitions arrive
+
+Each tile keeps the running state of the sequential omnibus test (run sum,
+run length, first/last change and change count) in its own .npz file under a
+state directory, together with its change mask of every interval as
+bit-packed rows (packed_masks), so change counts over any date range come
+from popcounts. A JSON manifest records the acquisition dates and which
+tiles each dependent product still has to absorb. Ingesting an
+acquisition touches only the tiles it covers, so the update cost follows the
+size of the new data rather than the length of the archive. Dependent
+products (zonal statistics, vectorised change polygons) are marked dirty and
+rebuilt lazily on the next read.
+"""
+
+import bisect
+import json
+import numpy as np
+import os
+from collections import OrderedDict
+
+from raster_tiles import DEFAULT_TILE_SIZE, TileWindow, band_window_reader, iter_tiles, tile_index, tile_slices
+from omnibus_change import SENTINEL1_GRD_ENL, omnibus_step
+from packed_masks import PackedMaskStack
+from terrain_correction import db_to_linear
+
+MANIFEST_NAME = 'manifest.json'
+MAX_CACHED_TILES = 64
+STATE_BANDS = ('first_change', 'last_change', 'change_count', 'last_p_value', 'run_length')
+
+
+class IncrementalChangeMonitor:
+    """Running first-detection / change-count products over a growing acquisition archive"""
+
+    def __init__(self, state_dir, shape=None, bands=1, tile_size=DEFAULT_TILE_SIZE,
+                 enl=SENTINEL1_GRD_ENL, alpha=0.01, db=True):
+        self.state_dir = state_dir
+        os.makedirs(os.path.join(state_dir, 'tiles'), exist_ok=True)
+        manifest_path = os.path.join(state_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            if shape is None:
+                raise ValueError("shape is required when creating a new monitor state directory")
+            self.manifest = {
+                'shape': list(shape[-2:]),
+                'bands': bands,
+                'tile_size': tile_size,
+                'enl': enl,
+                'alpha': alpha,
+                'db': db,
+                'dates': [],
+                'tiles': {},
+                'dirty': {}
+            }
+            self._save_manifest()
+        self.shape = tuple(self.manifest['shape'])
+        self.tile_size = self.manifest['tile_size']
+        self._tiles = OrderedDict()
+        self._products = {}
+
+    # -- persistence -------------------------------------------------------
+
+    def _save_manifest(self):
+        path = os.path.join(self.state_dir, MANIFEST_NAME)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(path + '.tmp', path)
+
+    def _tile_path(self, key):
+        return os.path.join(self.state_dir, 'tiles', f"r{key[0]}_c{key[1]}.npz")
+
+    def _window(self, key):
+        row, col = key[0] * self.tile_size, key[1] * self.tile_size
+        return TileWindow(row, col, min(self.tile_size, self.shape[0] - row), min(self.tile_size, self.shape[1] - col))
+
+    def _empty_state(self, window):
+        pixels = (window.height, window.width)
+        return {
+            'run_sum': np.zeros((self.manifest['bands'],) + pixels, dtype=np.float64),
+            'run_length': np.zeros(pixels, dtype=np.float64),
+            'first_change': np.full(pixels, -1, dtype=np.int32),
+            'last_change': np.full(pixels, -1, dtype=np.int32),
+            'change_count': np.zeros(pixels, dtype=np.uint16),
+            'last_p_value': np.ones(pixels, dtype=np.float32),
+            # One packed change mask per interval (row i: change seen at acquisition i + 1)
+            'change_bits': np.zeros((0, -(-window.height * window.width // 8)), dtype=np.uint8)
+        }
+
+    def load_tile(self, key):
+        """State arrays of one tile (empty state for tiles never observed)"""
+        key = tuple(key)
+        if key in self._tiles:
+            self._tiles.move_to_end(key)
+            return self._tiles[key]
+        path = self._tile_path(key)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                state = {name: data[name] for name in data.files}
+        else:
+            state = self._empty_state(self._window(key))
+        self._tiles[key] = state
+        while len(self._tiles) > MAX_CACHED_TILES:
+            self._tiles.popitem(last=False)
+        return state
+
+    def _save_tile(self, key, state):
+        path = self._tile_path(key)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, **state)
+        os.replace(path + '.tmp', path)
+
+    # -- ingestion ---------------------------------------------------------
+
+    @property
+    def dates(self):
+        return list(self.manifest['dates'])
+
+    def affected_tiles(self, acquisition, shape=None):
+        """Tile keys whose window holds any valid pixel of an acquisition"""
+        read = band_window_reader(acquisition)
+        keys = []
+        for window in iter_tiles(shape or self.shape, self.tile_size):
+            if np.isfinite(np.asarray(read(window))).any():
+                keys.append(tile_index(window, self.tile_size))
+        return keys
+
+    def ingest(self, acquisition, date, footprint=None):
+        """
+        Update the running products with one acquisition.
+
+        acquisition is an array, memmap or window reader over the monitor grid,
+        shaped ([bands,] rows, cols) with NaN outside the imaged swath.
+        footprint optionally bounds the update to (row0, col0, row1, col1)
+        pixel bounds; otherwise tiles without valid data are skipped.
+        Returns the updated tile keys.
+        """
+        index = len(self.manifest['dates'])
+        if footprint is not None:
+            row0, col0, row1, col1 = footprint
+            keys = sorted({tile_index(w, self.tile_size) for w in iter_tiles(self.shape, self.tile_size)
+                           if w.row < row1 and w.row + w.height > row0 and w.col < col1 and w.col + w.width > col0})
+        else:
+            keys = self.affected_tiles(acquisition)
+
+        read = band_window_reader(acquisition)
+        bands = self.manifest['bands']
+        for key in keys:
+            window = self._window(key)
+            data = np.asarray(read(window), dtype=np.float64).reshape((bands, window.height, window.width))
+            if self.manifest['db']:
+                data = db_to_linear(data)
+            valid = np.isfinite(data).all(axis=0)
+            if not valid.any():
+                continue
+
+            state = self.load_tile(key)
+            p, changed, run_sum, run_length = omnibus_step(
+                state['run_sum'], state['run_length'], np.where(valid, data, 1.0),
+                self.manifest['enl'], self.manifest['alpha'])
+            changed &= valid
+            # Pixels outside the swath keep their previous state
+            state['run_sum'] = np.where(valid, run_sum, state['run_sum'])
+            state['run_length'] = np.where(valid, run_length, state['run_length'])
+            state['last_p_value'] = np.where(valid, p, state['last_p_value']).astype(np.float32)
+            # Interval indices as in omnibus_block: a change seen at acquisition t is in interval t - 1
+            state['first_change'][changed & (state['first_change'] < 0)] = index - 1
+            state['last_change'][changed] = index - 1
+            state['change_count'] += changed.astype(np.uint16)
+            if index > 0:
+                history = PackedMaskStack.from_bits(state['change_bits'], changed.shape)
+                # Intervals of acquisitions that missed this tile had no change here
+                while len(history) < index - 1:
+                    history.append(np.zeros(changed.shape, dtype=bool))
+                state['change_bits'] = history.append(changed).bits
+
+            self._save_tile(key, state)
+            self.manifest['tiles'][f"{key[0]},{key[1]}"] = index
+            for dirty in self.manifest['dirty'].values():
+                if [key[0], key[1]] not in dirty:
+                    dirty.append([key[0], key[1]])
+
+        self.manifest['dates'].append(str(date))
+        self._save_manifest()
+        return keys
+
+    # -- reading -----------------------------------------------------------
+
+    def band_reader(self, band):
+        """Callable window -> array assembling one state band from the tiles"""
+        if band not in STATE_BANDS:
+            raise ValueError(f"Unknown band '{band}', expected one of {STATE_BANDS}")
+        return self._tile_reader(lambda state, tile_window: state[band])
+
+    def _interval_range(self, start=None, end=None):
+        """[lo, hi) interval indices whose closing acquisition date is within [start, end]"""
+        closing = self.manifest['dates'][1:]
+        lo = bisect.bisect_left(closing, str(start)) if start is not None else 0
+        hi = bisect.bisect_right(closing, str(end)) if end is not None else len(closing)
+        return lo, hi
+
+    def change_count_reader(self, start=None, end=None):
+        """
+        Callable window -> number of changes per pixel detected on acquisitions
+        dated within [start, end] (inclusive; None leaves that side open).
+        """
+        lo, hi = self._interval_range(start, end)
+
+        def values(state, tile_window):
+            history = PackedMaskStack.from_bits(state['change_bits'], (tile_window.height, tile_window.width))
+            return history.counts_per_pixel(lo, hi)
+
+        return self._tile_reader(values)
+
+    def changed_pixels_per_date(self):
+        """Changed pixels over the whole grid for each interval, aligned with dates[1:]"""
+        totals = np.zeros(max(len(self.manifest['dates']) - 1, 0), dtype=np.int64)
+        for name in self.manifest['tiles']:
+            key = tuple(map(int, name.split(',')))
+            window = self._window(key)
+            counts = PackedMaskStack.from_bits(self.load_tile(key)['change_bits'],
+                                               (window.height, window.width)).counts_per_date()
+            totals[:len(counts)] += counts
+        return totals
+
+    def _tile_reader(self, tile_values):
+        """Callable window -> array assembled from tile_values(state, tile_window) of the overlapping tiles"""
+
+        def read(window):
+            out = None
+            for tile_window in iter_tiles(self.shape, self.tile_size):
+                if (tile_window.row >= window.row + window.height or tile_window.row + tile_window.height <= window.row
+                        or tile_window.col >= window.col + window.width or tile_window.col + tile_window.width <= window.col):
+                    continue
+                values = tile_values(self.load_tile(tile_index(tile_window, self.tile_size)), tile_window)
+                if out is None:
+                    out = np.empty((window.height, window.width), dtype=values.dtype)
+                r0, r1 = max(window.row, tile_window.row), min(window.row + window.height, tile_window.row + tile_window.height)
+                c0, c1 = max(window.col, tile_window.col), min(window.col + window.width, tile_window.col + tile_window.width)
+                out[r0 - window.row:r1 - window.row, c0 - window.col:c1 - window.col] = \
+                    values[r0 - tile_window.row:r1 - tile_window.row, c0 - tile_window.col:c1 - tile_window.col]
+            return out
+
+        return read
+
+    def changed_reader(self):
+        """Callable window -> bool mask of pixels with at least one detected change"""
+        counts = self.band_reader('change_count')
+        return lambda window: counts(window) > 0
+
+    def read_band(self, band):
+        """Whole state band as one array; intended for small grids"""
+        return self.band_reader(band)(TileWindow(0, 0, self.shape[0], self.shape[1]))
+
+    # -- dependent products ------------------------------------------------
+
+    def register_product(self, name, update):
+        """
+        Register a lazily rebuilt dependent product.
+
+        update(monitor, dirty_tiles, previous) returns the new product value;
+        dirty_tiles lists the tile keys changed since the last build (all
+        observed tiles on the first build) and previous is the last value.
+        """
+        self._products[name] = {'update': update, 'value': None, 'built': False}
+        if name not in self.manifest['dirty']:
+            self.manifest['dirty'][name] = [list(map(int, key.split(','))) for key in self.manifest['tiles']]
+            self._save_manifest()
+
+    def is_dirty(self, name):
+        product = self._products[name]
+        return not product['built'] or bool(self.manifest['dirty'][name])
+
+    def product(self, name):
+        """Current value of a registered product, rebuilt only if tiles changed since the last read"""
+        product = self._products[name]
+        if self.is_dirty(name):
+            dirty = [tuple(key) for key in self.manifest['dirty'][name]]
+            if not product['built']:
+                # A fresh process has no previous value, so every observed tile counts as dirty
+                dirty = [tuple(map(int, key.split(','))) for key in self.manifest['tiles']]
+            product['value'] = product['update'](self, dirty, product['value'])
+            product['built'] = True
+            self.manifest['dirty'][name] = []
+            self._save_manifest()
+        return product['value']
+
+
+def zonal_product(zones, transform):
+    """
+    Dependent product: zonal change statistics that re-accumulate only dirty tiles.
+
+    Per-tile partial accumulators are kept and merged, so a rebuild costs one
+    pass over the changed tiles plus a merge over all tiles.
+    """
+    from zonal_stats import ZonalAccumulator, _default_cache
+
+    geometries = list(zones.geometry) if hasattr(zones, 'geometry') else list(zones)
+    partials = {}
+
+    def update(monitor, dirty_tiles, previous):
+        grid = _default_cache.get(geometries, monitor.shape, transform, monitor.tile_size)
+        for key in dirty_tiles:
+            window = monitor._window(key)
+            state = monitor.load_tile(key)
+            partial = ZonalAccumulator(len(geometries))
+            partial.update(grid[tile_slices(window)], state['change_count'], state['change_count'] > 0)
+            partials[key] = partial
+        result = ZonalAccumulator(len(geometries))
+        for partial in partials.values():
+            result.merge(partial)
+        stats = result.to_frame().rename(columns={'mean': 'mean_change_count', 'min': 'min_change_count',
+                                                  'max': 'max_change_count', 'std': 'std_change_count'})
+        if hasattr(zones, 'geometry'):
+            import pandas as pd
+            return pd.concat([zones.reset_index(drop=True), stats], axis=1)
+        return stats
+
+    return update
+
+
+def vector_product(transform=None, crs=None, min_pixels=1, name_prefix='change'):
+    """
+    Dependent product: polygons of every pixel that has changed at least once (full rebuild when dirty).
+
+    Without a transform the polygons are in pixel coordinates (see vectorize_mask).
+    """
+    from raster_vectorize import vectorize_mask
+
+    def update(monitor, dirty_tiles, previous):
+        return vectorize_mask(monitor.changed_reader(), transform, crs, shape=monitor.shape,
+                              tile_size=monitor.tile_size, min_pixels=min_pixels, name_prefix=name_prefix)
+
+    return update
@@ -0,0 +1,564 @@
+"""
+Local Vector Tile Server for SAR Disaster Lens
+Mapbox Vector Tiles (MVT) of hazard layers served over HTTP as /{layer}/{z}/{x}/{y}.pbf
+
+Layers are projected to web mercator once and indexed with an STRtree. A
+tile request queries the index with the tile's buffered envelope, clips the
+hits to it, simplifies them to a fraction of a screen pixel, snaps them to
+the tile's integer grid and encodes the result as MVT protobuf. This module
+has its own minimal protobuf writer, so no extra packages are needed.
+Encoded tiles are kept in an LRU cache with a byte budget, and the tiles of
+the hot small-scale zoom levels can be built in advance. Maps request only
+the tiles they show, so page weight no longer grows with the number of
+polygons.
+"""
+
+import errno
+import math
+import numpy as np
+import os
+import shapely
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from geometry_lod import GeometryPyramid, _layer_key
+
+WEB_MERCATOR_CRS = 'EPSG:3857'
+WEB_MERCATOR_HALF_WORLD = 20037508.342789244
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+TILE_PIXELS = 256
+DEFAULT_TOLERANCE_PX = 0.5
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+MAX_LAYERS = 64
+HOT_ZOOMS = range(0, 7)
+DEFAULT_HOST = os.environ.get('SAR_TILE_HOST', '127.0.0.1')
+DEFAULT_PORT = int(os.environ.get('SAR_TILE_PORT', '8765'))
+
+_POINT, _LINESTRING, _POLYGON = 1, 2, 3
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+
+# -- tile math -------------------------------------------------------------
+
+def tile_bounds(z, x, y):
+    """(minx, miny, maxx, maxy) of an XYZ tile in web-mercator metres"""
+    span = 2 * WEB_MERCATOR_HALF_WORLD / 2 ** z
+    minx = -WEB_MERCATOR_HALF_WORLD + x * span
+    maxy = WEB_MERCATOR_HALF_WORLD - y * span
+    return minx, maxy - span, minx + span, maxy
+
+
+def tiles_for_bounds(bounds, z):
+    """(x, y) of every tile at zoom z intersecting web-mercator bounds"""
+    n = 2 ** z
+    span = 2 * WEB_MERCATOR_HALF_WORLD / n
+    minx, miny, maxx, maxy = bounds
+
+    def index(value):
+        return min(max(int(math.floor(value / span)), 0), n - 1)
+
+    x0, x1 = index(minx + WEB_MERCATOR_HALF_WORLD), index(maxx + WEB_MERCATOR_HALF_WORLD)
+    y0, y1 = index(WEB_MERCATOR_HALF_WORLD - maxy), index(WEB_MERCATOR_HALF_WORLD - miny)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+# -- protobuf / MVT encoding -----------------------------------------------
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number, wire_type, payload):
+    key = _varint((number << 3) | wire_type)
+    if wire_type == 2:
+        return key + _varint(len(payload)) + payload
+    return key + payload
+
+
+def _packed(number, values):
+    return _field(number, 2, b''.join(_varint(v) for v in values))
+
+
+def _encode_value(value):
+    """MVT Value message for a str, bool, int or float"""
+    if isinstance(value, (bool, np.bool_)):
+        return _field(7, 0, _varint(int(value)))
+    if isinstance(value, (int, np.integer)):
+        value = int(value)
+        return _field(5, 0, _varint(value)) if value >= 0 else _field(6, 0, _varint(_zigzag(value)))
+    if isinstance(value, (float, np.floating)):
+        return _field(3, 1, np.float64(value).tobytes())
+    return _field(1, 2, str(value).encode('utf-8'))
+
+
+def _command(command_id, count):
+    return (command_id & 0x7) | (count << 3)
+
+
+class _Cursor:
+    """Geometry command writer tracking the delta-encoding cursor"""
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.commands = []
+
+    def points(self, command_id, coords):
+        self.commands.append(_command(command_id, len(coords)))
+        for x, y in coords:
+            self.commands.append(_zigzag(x - self.x))
+            self.commands.append(_zigzag(y - self.y))
+            self.x, self.y = x, y
+
+
+def _varints(values):
+    """Varint bytes of many unsigned integers, plus the end offset of each value"""
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 10):
+        lengths += values >= np.uint64(1 << (7 * k))
+    ends = np.cumsum(lengths)
+    out = np.empty(int(ends[-1]) if len(values) else 0, dtype=np.uint8)
+    for k in range(int(lengths.max()) if len(values) else 0):
+        selected = lengths > k
+        byte = (values[selected] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= np.where(lengths[selected] > k + 1, np.uint64(0x80), np.uint64(0))
+        out[(ends - lengths)[selected] + k] = byte
+    return out, ends
+
+
+def _zigzags(values):
+    values = np.asarray(values, dtype=np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def polygon_commands(geometries):
+    """
+    Packed MVT command bytes of polygonal geometries, one bytes object each.
+
+    Works on all rings of all geometries at once: closing and repeated
+    vertices are dropped, degenerate rings (and holes of degenerate
+    exteriors) removed, rings re-oriented so exteriors have positive area in
+    the y-down tile frame, and cursor deltas taken per geometry.
+    """
+    n_geometries = len(geometries)
+    polygons, polygon_geometry = shapely.get_parts(geometries, return_index=True)
+    rings, ring_polygon = shapely.get_rings(polygons, return_index=True)
+    coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+    coords = np.rint(coords).astype(np.int64)
+    n_rings = len(rings)
+    if not n_rings:
+        return [b''] * n_geometries
+
+    ring_end = np.cumsum(np.bincount(coord_ring, minlength=n_rings))
+    position = np.arange(len(coords))
+    closing = position == ring_end[coord_ring] - 1
+    repeated = np.zeros(len(coords), dtype=bool)
+    repeated[1:] = (coord_ring[1:] == coord_ring[:-1]) & np.all(coords[1:] == coords[:-1], axis=1)
+    kept = ~closing & ~repeated
+    coords, coord_ring = coords[kept], coord_ring[kept]
+
+    counts = np.bincount(coord_ring, minlength=n_rings)
+    starts = np.cumsum(counts) - counts
+    following = np.arange(1, len(coords) + 1)
+    following[starts[counts > 0] + counts[counts > 0] - 1] = starts[counts > 0]
+    cross = coords[:, 0] * coords[following, 1] - coords[following, 0] * coords[:, 1]
+    area = np.bincount(coord_ring, weights=cross, minlength=n_rings)
+
+    exterior = np.ones(n_rings, dtype=bool)
+    exterior[1:] = ring_polygon[1:] != ring_polygon[:-1]
+    valid = (counts >= 3) & (area != 0)
+    # Holes are only written after a surviving exterior of the same polygon
+    polygon_valid = np.zeros(len(polygons), dtype=bool)
+    polygon_valid[ring_polygon[exterior]] = valid[exterior]
+    valid &= polygon_valid[ring_polygon]
+    reverse = (area > 0) != exterior
+
+    # Kept vertices of valid rings in output order (reversed rings read backwards)
+    ring_ids = np.flatnonzero(valid)
+    n = counts[ring_ids]
+    ring_of = np.repeat(ring_ids, n)
+    offset = np.arange(len(ring_of)) - np.repeat(np.cumsum(n) - n, n)
+    source = starts[ring_of] + np.where(reverse[ring_of], counts[ring_of] - 1 - offset, offset)
+    xy = coords[source]
+    geometry_of = polygon_geometry[ring_polygon[ring_of]]
+
+    # The cursor restarts at (0, 0) for every feature
+    previous = np.zeros_like(xy)
+    previous[1:] = xy[:-1]
+    first_of_geometry = np.ones(len(xy), dtype=bool)
+    first_of_geometry[1:] = geometry_of[1:] != geometry_of[:-1]
+    previous[first_of_geometry] = 0
+    deltas = _zigzags(xy - previous)
+
+    # Per ring: MoveTo(1), x, y, LineTo(n - 1), 2(n - 1) params, ClosePath(1)
+    ring_length = 2 * n + 3
+    ring_start = np.cumsum(ring_length) - ring_length
+    commands = np.empty(int(ring_length.sum()), dtype=np.uint64)
+    commands[ring_start] = _command(_MOVE_TO, 1)
+    commands[ring_start + 3] = ((n - 1) << 3) | _LINE_TO
+    commands[ring_start + ring_length - 1] = _command(_CLOSE_PATH, 1)
+    slot = np.repeat(ring_start, n) + 1 + 2 * offset + (offset > 0)
+    commands[slot] = deltas[:, 0]
+    commands[slot + 1] = deltas[:, 1]
+
+    encoded, ends = _varints(commands)
+    ring_geometry = polygon_geometry[ring_polygon[ring_ids]]
+    geometry_commands = np.bincount(ring_geometry, weights=ring_length, minlength=n_geometries).astype(np.int64)
+    command_end = np.cumsum(geometry_commands)
+    byte_end = np.where(command_end > 0, ends[np.maximum(command_end - 1, 0)], 0)
+    byte_start = np.concatenate(([0], byte_end[:-1]))
+    data = encoded.tobytes()
+    return [data[start:stop] for start, stop in zip(byte_start, byte_end)]
+
+
+def encode_geometry(geometry):
+    """(MVT geometry type, packed command bytes) of a geometry in integer tile coordinates"""
+    parts = shapely.get_parts(geometry)
+    kind = shapely.get_type_id(parts[0]) if len(parts) else -1
+    if kind in (3, 6):
+        return _POLYGON, polygon_commands(np.array([geometry], dtype=object))[0]
+    cursor = _Cursor()
+    if kind == 0:
+        cursor.points(_MOVE_TO, [tuple(np.rint(p.coords[0]).astype(np.int64)) for p in parts])
+        return _POINT, b''.join(_varint(c) for c in cursor.commands)
+    for line in parts:
+        coords = [tuple(c) for c in np.rint(np.asarray(line.coords)).astype(np.int64)]
+        if len(coords) >= 2:
+            cursor.points(_MOVE_TO, coords[:1])
+            cursor.points(_LINE_TO, coords[1:])
+    return _LINESTRING, b''.join(_varint(c) for c in cursor.commands)
+
+
+def encode_layer(name, geometries, properties=None, extent=MVT_EXTENT, ids=None):
+    """
+    MVT Layer message.
+
+    geometries are in integer tile coordinates (y down); properties is an
+    optional list of dicts and ids an optional sequence of non-negative
+    feature ids, one per geometry. None and NaN property values are omitted.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    polygonal = np.isin(shapely.get_type_id(geometries), (3, 6))
+    encoded = [None] * len(geometries)
+    for index, commands in zip(np.flatnonzero(polygonal), polygon_commands(geometries[polygonal])):
+        encoded[index] = (_POLYGON, commands)
+    for index in np.flatnonzero(~polygonal):
+        encoded[index] = encode_geometry(geometries[index])
+
+    keys, values = OrderedDict(), OrderedDict()
+    features = []
+    for index, (geom_type, commands) in enumerate(encoded):
+        if not commands:
+            continue
+        tags = []
+        for key, value in (properties[index] if properties is not None else {}).items():
+            if value is None or (isinstance(value, (float, np.floating)) and np.isnan(value)):
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(_encode_value(value), len(values)))
+        feature_id = int(ids[index]) if ids is not None else index
+        feature = _field(1, 0, _varint(feature_id)) + _field(3, 0, _varint(geom_type)) + _field(4, 2, commands)
+        if tags:
+            feature += _packed(2, tags)
+        features.append(_field(2, 2, feature))
+    layer = _field(15, 0, _varint(2)) + _field(1, 2, name.encode('utf-8')) + b''.join(features)
+    layer += b''.join(_field(3, 2, key.encode('utf-8')) for key in keys)
+    layer += b''.join(_field(4, 2, value) for value in values)
+    layer += _field(5, 0, _varint(extent))
+    return _field(3, 2, layer)
+
+
+# -- layers and cache ------------------------------------------------------
+
+class VectorTileSource:
+    """One vector layer projected to web mercator, indexed for tile queries"""
+
+    def __init__(self, name, gdf, tolerance_px=DEFAULT_TOLERANCE_PX, extent=MVT_EXTENT, buffer=MVT_BUFFER):
+        self.name = name
+        self.key = _layer_key(gdf, (), tolerance_px, extent)
+        projected = gdf.to_crs(WEB_MERCATOR_CRS) if gdf.crs is not None else gdf.set_crs(WEB_MERCATOR_CRS)
+        projected = projected.reset_index(drop=True)
+        projected[projected.geometry.name] = shapely.make_valid(projected.geometry.to_numpy())
+        columns = [c for c in gdf.columns if c != gdf.geometry.name]
+        self.properties = projected[columns].to_dict('records') if columns else [{}] * len(projected)
+        # Small-scale tiles clip pre-simplified geometries from the level-of-detail pyramid
+        self.pyramid = GeometryPyramid(projected, tolerance_px=tolerance_px)
+        self._indexes = {}
+        self.bounds = tuple(projected.total_bounds) if len(projected) else None
+        self.tolerance_px = tolerance_px
+        self.extent = extent
+        self.buffer = buffer
+
+    def _index(self, z):
+        """(geometries, source rows, STRtree) of the pyramid level used at zoom z"""
+        level = self.pyramid.level_index(z)
+        if level not in self._indexes:
+            layer = self.pyramid.for_zoom(z)
+            geometries = shapely.orient_polygons(layer.geometry.to_numpy())
+            self._indexes[level] = (geometries, layer.index.to_numpy(), shapely.STRtree(geometries))
+        return self._indexes[level]
+
+    def render(self, z, x, y):
+        """Encoded MVT bytes of one tile (an empty tile when nothing intersects it)"""
+        geometries, rows, tree = self._index(z)
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        scale = self.extent / (maxx - minx)
+        pad = self.buffer / scale
+        hits = tree.query(shapely.box(minx - pad, miny - pad, maxx + pad, maxy + pad), predicate='intersects')
+        if not len(hits):
+            return b''
+        clipped = shapely.clip_by_rect(geometries[hits], minx - pad, miny - pad, maxx + pad, maxy + pad)
+        # World metres -> tile units, y pointing down
+        local = shapely.transform(clipped, lambda xy: np.column_stack(((xy[:, 0] - minx) * scale,
+                                                                       (maxy - xy[:, 1]) * scale)))
+        local = shapely.simplify(local, self.tolerance_px * self.extent / TILE_PIXELS, preserve_topology=True)
+        local = shapely.set_precision(local, 1.0)
+        keep = ~shapely.is_empty(local) & ~shapely.is_missing(local)
+        if not keep.any():
+            return b''
+        features = rows[hits[keep]]
+        return encode_layer(self.name, local[keep], [self.properties[i] for i in features], self.extent, features)
+
+
+class TileCache:
+    """LRU cache of encoded tiles bounded by total bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._tiles.move_to_end(key)
+            return tile
+
+    def put(self, key, tile):
+        with self._lock:
+            if key in self._tiles:
+                self.bytes -= len(self._tiles.pop(key))
+            self._tiles[key] = tile
+            self.bytes += len(tile)
+            while self.bytes > self.max_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def evict_layer(self, name):
+        with self._lock:
+            for key in [k for k in self._tiles if k[0] == name]:
+                self.bytes -= len(self._tiles.pop(key))
+
+
+class VectorTileServer:
+    """Threaded HTTP server for /{layer}/{z}/{x}/{y}.pbf tiles of registered layers"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_cache_bytes=DEFAULT_CACHE_BYTES,
+                 max_layers=MAX_LAYERS):
+        self.host = host
+        self.port = port
+        self.cache = TileCache(max_cache_bytes)
+        self.max_layers = max_layers
+        self.sources = OrderedDict()
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    def register_layer(self, name, gdf, tolerance_px=DEFAULT_TOLERANCE_PX, precompute_zooms=HOT_ZOOMS, key=None):
+        """Serve a GeoDataFrame as a layer; re-registering unchanged data is a no-op"""
+        key = key or _layer_key(gdf, (), tolerance_px, MVT_EXTENT)
+        with self._lock:
+            current = self.sources.get(name)
+            if current is not None and current.key == key:
+                self.sources.move_to_end(name)
+                return current
+        source = VectorTileSource(name, gdf, tolerance_px)
+        with self._lock:
+            self.sources[name] = source
+            self.sources.move_to_end(name)
+            # Least recently used layers (e.g. views no session shows any more) are dropped
+            evicted = []
+            while len(self.sources) > self.max_layers:
+                evicted.append(self.sources.popitem(last=False)[0])
+        for evicted_name in evicted + [name]:
+            self.cache.evict_layer(evicted_name)
+        if precompute_zooms:
+            self.precompute(name, precompute_zooms)
+        return source
+
+    def tile(self, name, z, x, y, fmt='pbf'):
+        """Encoded tile bytes, from the cache when possible"""
+        with self._lock:
+            source = self.sources[name]
+            self.sources.move_to_end(name)
+        key = (name, z, x, y)
+        tile = self.cache.get(key)
+        if tile is None:
+            tile = source.render(z, x, y)
+            self.cache.put(key, tile)
+        return tile
+
+    def precompute(self, name, zooms=HOT_ZOOMS):
+        """Render every tile of a layer's extent at the given zoom levels; returns the tile count"""
+        source = self.sources[name]
+        if source.bounds is None:
+            return 0
+        count = 0
+        for z in zooms:
+            for x, y in tiles_for_bounds(source.bounds, z):
+                self.tile(name, z, x, y)
+                count += 1
+        return count
+
+    def content_type(self, extension):
+        return MVT_CONTENT_TYPE if extension in ('pbf', 'mvt') else None
+
+    def url_template(self, name):
+        """Leaflet-style {z}/{x}/{y} URL of a layer"""
+        base = os.environ.get('SAR_TILE_URL', f"http://{self.host}:{self.port}")
+        return f"{base.rstrip('/')}/{name}/{{z}}/{{x}}/{{y}}.pbf"
+
+    def start(self):
+        """Serve on a daemon thread; returns self"""
+        if self._httpd is None:
+            self._httpd = _bind(self.host, self.port, _handler(self))
+            self.port = self._httpd.server_address[1]
+            threading.Thread(target=self._httpd.serve_forever, name='mvt-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def _bind(host, port, handler):
+    """ThreadingHTTPServer on port, or on a free port when another process (e.g. a second app) holds it"""
+    try:
+        httpd = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        if e.errno != errno.EADDRINUSE:
+            raise
+        httpd = ThreadingHTTPServer((host, 0), handler)
+    httpd.daemon_threads = True
+    return httpd
+
+
+def layer_id(name, gdf, tolerance_px=DEFAULT_TOLERANCE_PX):
+    """(content-keyed layer name, layer key); sessions showing different data never share a layer"""
+    key = _layer_key(gdf, (), tolerance_px, MVT_EXTENT)
+    return f"{name}_{key[0][:12]}", key
+
+
+def _handler(server):
+    """Request handler serving server.tile(name, z, x, y, extension) for /{name}/{z}/{x}/{y}.{extension}"""
+
+    class TileHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = self.path.split('?')[0].strip('/').split('/')
+            try:
+                name, z, x = parts[0], int(parts[1]), int(parts[2])
+                y_text, _, extension = parts[3].partition('.')
+                y = int(y_text)
+                content_type = server.content_type(extension)
+                if name not in server.sources or content_type is None or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+                    raise KeyError(name)
+            except (IndexError, ValueError, KeyError):
+                self.send_error(404)
+                return
+            body = server.tile(name, z, x, y, extension)
+            self.send_response(200 if body else 204)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Cache-Control', 'max-age=3600')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return TileHandler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Process-wide tile server, started on first use"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = VectorTileServer(host, port).start()
+        return _server
+
+
+def add_vector_tile_layer(m, name, gdf, layer_name=None, style=None, server=None):
+    """
+    Register a GeoDataFrame with the tile server and add it to a folium/leafmap map as vector tiles.
+
+    The served layer is name plus a hash of the data, so concurrent sessions
+    showing different views of the same hazard do not replace each other's
+    layers or cached tiles.
+    """
+    from folium.plugins import VectorGridProtobuf
+
+    server = server or get_server()
+    name, key = layer_id(name, gdf)
+    server.register_layer(name, gdf, key=key)
+    layer_style = dict(style or {})
+    layer_style.setdefault('fill', True)
+    options = {'vectorTileLayerStyles': {name: layer_style}, 'interactive': False}
+    VectorGridProtobuf(server.url_template(name), layer_name or name, options).add_to(m)
+    return m
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from geodata_loader import HAZARD_FILES
+    from hazard_store import load_hazard_view
+
+    parser = argparse.ArgumentParser(description="Serve the hazard layers as Mapbox vector tiles")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_BYTES / 2 ** 20)
+    args = parser.parse_args()
+
+    tile_server = VectorTileServer(args.host, args.port, int(args.cache_mb * 2 ** 20))
+    for hazard_name in HAZARD_FILES:
+        gdf_pre, gdf_post, _, _ = load_hazard_view(hazard_name)
+        slug = hazard_name.lower().replace(' ', '_')
+        for epoch, layer in (('pre', gdf_pre), ('post', gdf_post)):
+            tile_server.register_layer(f"{slug}_{epoch}", layer)
+            print(f"Layer {slug}_{epoch}: {tile_server.url_template(f'{slug}_{epoch}')}")
+    tile_server.start()
+    print(f"Serving vector tiles on http://{tile_server.host}:{tile_server.port} "
+          f"({tile_server.cache.bytes / 1024:.0f} KiB precomputed)")
+    while True:
+        time.sleep(3600)
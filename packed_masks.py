@@ -0,0 +1,239 @@
+"""
+Bit-Packed Masks for SAR Disaster Lens
+Compact water, flood and burn masks with bitwise logic, popcounts and RLE storage
+
+Masks are stored as np.packbits bitsets (8 pixels per byte, little bit order)
+so logical operations and pixel counts run on bytes. A stack holds one packed
+row per date; per-pixel counts over time (e.g. days flooded) come from a
+bit-sliced binary counter, which adds a whole date with a handful of byte-wise
+XOR/AND operations instead of unpacking it.
+"""
+
+import numpy as np
+
+BIT_ORDER = 'little'
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(bits):
+        return _POPCOUNT_TABLE[bits]
+
+
+def _pack(mask):
+    return np.packbits(np.asarray(mask, dtype=bool).ravel(), bitorder=BIT_ORDER)
+
+
+def _padding_mask(size):
+    """Byte mask with only the valid bits of the last byte set"""
+    n_bytes = -(-size // 8)
+    valid = np.full(n_bytes, 0xFF, dtype=np.uint8)
+    if size % 8:
+        valid[-1] = (1 << (size % 8)) - 1
+    return valid
+
+
+class PackedMask:
+    """Boolean raster stored as a packed bitset"""
+
+    def __init__(self, bits, shape):
+        self.bits = np.asarray(bits, dtype=np.uint8)
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_array(cls, mask):
+        mask = np.asarray(mask, dtype=bool)
+        return cls(_pack(mask), mask.shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def to_array(self):
+        return np.unpackbits(self.bits, count=self.size, bitorder=BIT_ORDER).astype(bool).reshape(self.shape)
+
+    def _check(self, other):
+        if self.shape != other.shape:
+            raise ValueError(f"Mask shapes differ: {self.shape} vs {other.shape}")
+
+    def __and__(self, other):
+        self._check(other)
+        return PackedMask(self.bits & other.bits, self.shape)
+
+    def __or__(self, other):
+        self._check(other)
+        return PackedMask(self.bits | other.bits, self.shape)
+
+    def __xor__(self, other):
+        self._check(other)
+        return PackedMask(self.bits ^ other.bits, self.shape)
+
+    def __invert__(self):
+        # Padding bits in the last byte must stay clear so counts remain exact
+        return PackedMask(~self.bits & _padding_mask(self.size), self.shape)
+
+    def __eq__(self, other):
+        return isinstance(other, PackedMask) and self.shape == other.shape and np.array_equal(self.bits, other.bits)
+
+    def count(self):
+        """Number of set pixels (popcount)"""
+        return int(_popcount(self.bits).sum(dtype=np.int64))
+
+    def fraction(self):
+        return self.count() / self.size if self.size else 0.0
+
+    def any(self):
+        return bool(self.bits.any())
+
+
+class PackedMaskStack:
+    """Time series of same-shaped masks, one packed row per date"""
+
+    def __init__(self, shape, capacity=16):
+        self.shape = tuple(shape)
+        self.size = int(np.prod(self.shape))
+        self._bits = np.zeros((capacity, -(-self.size // 8)), dtype=np.uint8)
+        self.length = 0
+
+    @classmethod
+    def from_arrays(cls, masks):
+        masks = list(masks)
+        stack = cls(np.shape(masks[0]), capacity=max(len(masks), 1))
+        for mask in masks:
+            stack.append(mask)
+        return stack
+
+    @classmethod
+    def from_bits(cls, bits, shape):
+        """Stack over existing (dates, packed bytes) rows, e.g. as saved from .bits"""
+        bits = np.asarray(bits, dtype=np.uint8)
+        stack = cls(shape, capacity=max(len(bits), 1))
+        if bits.shape[1:] != stack._bits.shape[1:]:
+            raise ValueError(f"Packed rows do not match stack shape {stack.shape}")
+        stack._bits[:len(bits)] = bits
+        stack.length = len(bits)
+        return stack
+
+    @property
+    def bits(self):
+        return self._bits[:self.length]
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return PackedMask(self.bits[index], self.shape)
+
+    def append(self, mask):
+        packed = mask.bits if isinstance(mask, PackedMask) else _pack(mask)
+        if packed.size != self._bits.shape[1]:
+            raise ValueError(f"Mask does not match stack shape {self.shape}")
+        if self.length == self._bits.shape[0]:
+            grown = np.zeros((2 * self._bits.shape[0], self._bits.shape[1]), dtype=np.uint8)
+            grown[:self.length] = self._bits[:self.length]
+            self._bits = grown
+        self._bits[self.length] = packed
+        self.length += 1
+        return self
+
+    def counts_per_date(self):
+        """Set pixels in each mask (e.g. flooded pixels per date)"""
+        return _popcount(self.bits).sum(axis=1, dtype=np.int64)
+
+    def union(self):
+        return PackedMask(np.bitwise_or.reduce(self.bits, axis=0), self.shape)
+
+    def intersection(self):
+        return PackedMask(np.bitwise_and.reduce(self.bits, axis=0), self.shape)
+
+    def counts_per_pixel(self, start=0, stop=None):
+        """
+        Number of dates each pixel is set (e.g. days flooded) over [start, stop).
+
+        Accumulated in a bit-sliced binary counter: plane k holds bit k of every
+        pixel's count, and each date is added with a ripple-carry of XOR/AND.
+        """
+        bits = self.bits[start:stop]
+        n_planes = max(int(len(bits)).bit_length(), 1)
+        planes = np.zeros((n_planes, bits.shape[1]), dtype=np.uint8)
+        for row in bits:
+            carry = row.copy()
+            for plane in planes:
+                if not carry.any():
+                    break
+                next_carry = plane & carry
+                plane ^= carry
+                carry = next_carry
+
+        counts = np.zeros(self.size, dtype=np.uint32)
+        for k, plane in enumerate(planes):
+            counts += np.unpackbits(plane, count=self.size, bitorder=BIT_ORDER).astype(np.uint32) << k
+        return counts.reshape(self.shape)
+
+
+def encode_rle(mask):
+    """Run-length encode a mask as (starts, lengths) of its set runs in flattened order"""
+    flat = mask.to_array().ravel() if isinstance(mask, PackedMask) else np.asarray(mask, dtype=bool).ravel()
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], flat, [False])).view(np.int8)))
+    starts, stops = edges[0::2], edges[1::2]
+    dtype = np.uint32 if flat.size < 2 ** 32 else np.uint64
+    return starts.astype(dtype), (stops - starts).astype(dtype)
+
+
+def decode_rle(starts, lengths, shape):
+    """PackedMask from run-length (starts, lengths)"""
+    size = int(np.prod(shape))
+    starts = np.asarray(starts, dtype=np.int64)
+    # Runs are maximal, so no run ends where another starts
+    delta = np.zeros(size + 1, dtype=np.int8)
+    delta[starts] = 1
+    delta[starts + np.asarray(lengths, dtype=np.int64)] = -1
+    return PackedMask(_pack(np.cumsum(delta[:-1], dtype=np.int8)), shape)
+
+
+def save_rle(path, masks):
+    """
+    Save a PackedMask or PackedMaskStack run-length encoded in a compressed .npz.
+
+    Each date is stored as alternating clear/set run lengths (small integers
+    that compress well); run_offsets[i]:run_offsets[i + 1] selects date i.
+    """
+    stack = masks if isinstance(masks, PackedMaskStack) else PackedMaskStack.from_arrays([masks.to_array()])
+    runs = []
+    for i in range(len(stack)):
+        starts, lengths = encode_rle(stack[i])
+        edges = np.empty(2 * starts.size, dtype=np.int64)
+        edges[0::2] = starts
+        edges[1::2] = starts.astype(np.int64) + lengths
+        runs.append(np.diff(edges, prepend=0).astype(starts.dtype))
+    offsets = np.cumsum([0] + [r.size for r in runs]).astype(np.int64)
+    np.savez_compressed(
+        path,
+        shape=np.asarray(stack.shape, dtype=np.int64),
+        run_offsets=offsets,
+        runs=np.concatenate(runs) if runs else np.empty(0, np.uint32)
+    )
+    return path
+
+
+def load_rle(path):
+    """Load a run-length encoded .npz back into a PackedMaskStack"""
+    with np.load(path) as data:
+        shape = tuple(int(n) for n in data['shape'])
+        offsets = data['run_offsets']
+        runs = data['runs']
+    stack = PackedMaskStack(shape, capacity=max(len(offsets) - 1, 1))
+    for i in range(len(offsets) - 1):
+        edges = np.cumsum(runs[offsets[i]:offsets[i + 1]], dtype=np.int64)
+        stack.append(decode_rle(edges[0::2], edges[1::2] - edges[0::2], shape))
+    return stack
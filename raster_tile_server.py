@@ -0,0 +1,372 @@
+"""
+Local XYZ Raster Tile Server for SAR Disaster Lens
+Colour-mapped PNG/WebP web-mercator tiles of SAR backscatter and change rasters
+
+Each tile is one windowed read through a WarpedVRT aligned to the tile's
+web-mercator grid. For Cloud-Optimized GeoTIFFs, GDAL serves small-scale
+tiles from the internal overviews, so a tile costs about the same at every
+zoom no matter how large the mosaic is. Values go through a 256-entry RGBA
+palette as one vectorised lookup and are encoded with GDAL's PNG or WebP
+driver. Encoded tiles are cached in memory under a byte budget and on disk
+under a size budget, with the least recently used entries evicted first.
+"""
+
+import hashlib
+import numpy as np
+import os
+import rasterio
+import threading
+import warnings
+from rasterio.enums import ColorInterp, Resampling
+from rasterio.errors import NotGeoreferencedWarning
+from rasterio.io import MemoryFile
+from rasterio.transform import from_bounds
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+
+from mvt_server import TILE_PIXELS, WEB_MERCATOR_CRS, TileCache, _bind, _handler, tile_bounds, tiles_for_bounds
+
+DEFAULT_HOST = os.environ.get('SAR_RASTER_TILE_HOST', '127.0.0.1')
+DEFAULT_PORT = int(os.environ.get('SAR_RASTER_TILE_PORT', '8766'))
+RASTER_DIR = os.path.join('data', 'rasters')
+DEFAULT_CACHE_DIR = os.path.join('data', 'tile_cache')
+DEFAULT_CACHE_BYTES = 128 * 1024 * 1024
+DEFAULT_DISK_BYTES = 1024 * 1024 * 1024
+TILE_FORMATS = {'png': ('PNG', 'image/png', {}), 'webp': ('WEBP', 'image/webp', {'QUALITY': 85})}
+
+# Colour ramps as evenly spaced anchors, interpolated to 256 entries
+PALETTES = {
+    'gray': ('#000000', '#ffffff'),
+    'viridis': ('#440154', '#3b528b', '#21918c', '#5ec962', '#fde725'),
+    'blues': ('#f7fbff', '#c6dbef', '#6baed6', '#2171b5', '#08306b'),
+    # Diverging: blue for decreases, gray for no change, red for increases
+    'change': ('#2166ac', '#67a9cf', '#9e9e9e', '#ef8a62', '#b2182b')
+}
+
+# Default styles of raster products by file name suffix ({hazard}_{product}.tif)
+PRODUCT_STYLES = {
+    'backscatter': {'palette': 'gray'},
+    'change': {'palette': 'change', 'vmin': -10.0, 'vmax': 10.0},
+    'coherence': {'palette': 'viridis', 'vmin': 0.0, 'vmax': 1.0},
+    # Class maps and masks are drawn with the colour table stored in the file
+    'classes': {},
+    'mask': {}
+}
+
+
+def _rgba(color):
+    color = color.lstrip('#')
+    if len(color) == 6:
+        color += 'ff'
+    return [int(color[i:i + 2], 16) for i in range(0, 8, 2)]
+
+
+def palette_lut(name='gray'):
+    """(256, 4) uint8 RGBA lookup table of a named ramp or a sequence of hex anchors"""
+    anchors = np.array([_rgba(c) for c in (PALETTES[name] if isinstance(name, str) else name)], dtype=np.float64)
+    positions = np.linspace(0, 255, len(anchors))
+    steps = np.arange(256)
+    return np.stack([np.interp(steps, positions, anchors[:, k]) for k in range(4)], axis=1).round().astype(np.uint8)
+
+
+def categorical_lut(colors):
+    """(256, 4) RGBA lookup table mapping integer class values (0-255) to hex colours; others transparent"""
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    for value, color in colors.items():
+        lut[int(value)] = _rgba(color)
+    return lut
+
+
+def colorize(values, valid, lut, vmin=None, vmax=None):
+    """
+    RGBA (4, rows, cols) image of a band through a lookup table.
+
+    With vmin/vmax the values are stretched linearly onto the 256 entries;
+    without them they are used directly as integer indices (class maps).
+    Invalid pixels are transparent.
+    """
+    if vmin is None or vmax is None:
+        index = np.clip(values, 0, 255).astype(np.uint8)
+    else:
+        scale = 255.0 / max(vmax - vmin, 1e-12)
+        index = np.clip((np.nan_to_num(values, nan=vmin) - vmin) * scale, 0, 255).astype(np.uint8)
+    rgba = lut[index]
+    rgba[~valid] = 0
+    return np.moveaxis(rgba, -1, 0)
+
+
+def encode_image(rgba, fmt='png'):
+    """PNG or WebP bytes of a (4, rows, cols) uint8 image"""
+    driver, _, options = TILE_FORMATS[fmt]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', NotGeoreferencedWarning)
+        with MemoryFile() as memfile:
+            with memfile.open(driver=driver, width=rgba.shape[2], height=rgba.shape[1], count=4,
+                              dtype='uint8', **options) as dataset:
+                dataset.write(rgba)
+            return memfile.read()
+
+
+class DiskTileCache:
+    """Encoded tiles on disk, evicting the least recently used files beyond a size budget"""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_DISK_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.bytes = sum(entry[2] for entry in self._entries())
+
+    def _entries(self):
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, path, stat.st_size
+
+    def _path(self, key):
+        layer, z, x, y, fmt = key
+        return os.path.join(self.root, layer, str(z), str(x), f"{y}.{fmt}")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                tile = f.read()
+        except FileNotFoundError:
+            return None
+        # The modification time doubles as the last access time for eviction
+        os.utime(path)
+        return tile
+
+    def put(self, key, tile):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(tile)
+        os.replace(path + '.tmp', path)
+        with self._lock:
+            self.bytes += len(tile)
+            if self.bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete the oldest files until the cache is back under 90% of its budget"""
+        entries = sorted(self._entries())
+        self.bytes = sum(entry[2] for entry in entries)
+        for _, path, size in entries:
+            if self.bytes <= 0.9 * self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.bytes -= size
+            except FileNotFoundError:
+                pass
+
+
+class RasterTileSource:
+    """One band of a raster file rendered as colour-mapped web-mercator tiles"""
+
+    def __init__(self, name, path, band=1, palette='gray', vmin=None, vmax=None, categories=None,
+                 resampling=None, nodata=None):
+        self.name = name
+        self.path = path
+        self.band = band
+        with rasterio.open(path) as src:
+            if categories is None and src.colorinterp[band - 1] == ColorInterp.palette:
+                # Classified products carry their own colour table
+                transparent = {int(v) for v in src.tags().get('TRANSPARENT_VALUES', '').split(',') if v.strip()}
+                categories = {value: '#%02x%02x%02x%02x' % (tuple(rgba[:3]) + (0 if value in transparent else rgba[3],))
+                              for value, rgba in src.colormap(band).items() if value < 256}
+            self.lut = categorical_lut(categories) if categories else palette_lut(palette)
+            self.vmin, self.vmax = (None, None) if categories else (vmin, vmax)
+            self.resampling = Resampling[resampling or ('nearest' if categories else 'bilinear')]
+            self.nodata = src.nodata if nodata is None else nodata
+            self.bounds = transform_bounds(src.crs, WEB_MERCATOR_CRS, *src.bounds)
+            self.crs = src.crs
+            self.resolution = min(src.res)
+            self.overviews = src.overviews(band)
+            if self.vmin is None and not categories:
+                # Stretch from the coarsest overview (or a decimated read) when no range is given
+                factor = max(1, max(src.height, src.width) // 1024)
+                sample = src.read(band, out_shape=(max(1, src.height // factor), max(1, src.width // factor)),
+                                  masked=True).compressed()
+                sample = sample[np.isfinite(sample)]
+                self.vmin, self.vmax = (np.percentile(sample, [2, 98]) if sample.size else (0.0, 1.0))
+            stat = os.stat(path)
+        style = repr((os.path.abspath(path), stat.st_mtime_ns, stat.st_size, band, self.lut.tobytes(),
+                      self.vmin, self.vmax, self.resampling.name, self.nodata))
+        # Disk cache entries are namespaced by source file version and style
+        self.key = f"{name}-{hashlib.sha1(style.encode()).hexdigest()[:12]}"
+
+    def _overview_options(self, minx, miny, maxx, maxy):
+        """Open options selecting the coarsest overview still at least as fine as the tile's pixels"""
+        if not self.overviews:
+            return {}
+        left, _, right, _ = transform_bounds(WEB_MERCATOR_CRS, self.crs, minx, miny, maxx, maxy)
+        tile_resolution = (right - left) / TILE_PIXELS
+        level = None
+        for index, factor in enumerate(self.overviews):
+            if self.resolution * factor <= tile_resolution:
+                level = index
+        return {} if level is None else {'OVERVIEW_LEVEL': level}
+
+    def render(self, z, x, y, fmt='png'):
+        """Encoded tile bytes, or b'' for tiles outside the raster"""
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        left, bottom, right, top = self.bounds
+        if minx >= right or maxx <= left or miny >= top or maxy <= bottom:
+            return b''
+        with rasterio.open(self.path, **self._overview_options(minx, miny, maxx, maxy)) as src:
+            with WarpedVRT(src, crs=WEB_MERCATOR_CRS, transform=from_bounds(minx, miny, maxx, maxy, TILE_PIXELS, TILE_PIXELS),
+                           width=TILE_PIXELS, height=TILE_PIXELS, resampling=self.resampling,
+                           src_nodata=self.nodata, add_alpha=True) as vrt:
+                values = vrt.read(self.band).astype(np.float64)
+                valid = vrt.read(vrt.count) > 0
+        valid &= np.isfinite(values)
+        if self.nodata is not None and not np.isnan(self.nodata):
+            valid &= values != self.nodata
+        if not valid.any():
+            return b''
+        return encode_image(colorize(values, valid, self.lut, self.vmin, self.vmax), fmt)
+
+
+def hazard_rasters(slug, root=RASTER_DIR):
+    """(layer name, path, style) of every raster named {slug}_{product}.tif|.tiff in a directory"""
+    if not os.path.isdir(root):
+        return []
+    rasters = []
+    for filename in sorted(os.listdir(root)):
+        stem, extension = os.path.splitext(filename)
+        if extension.lower() in ('.tif', '.tiff') and stem.startswith(f"{slug}_"):
+            product = stem[len(slug) + 1:]
+            rasters.append((stem, os.path.join(root, filename), dict(PRODUCT_STYLES.get(product, {}))))
+    return rasters
+
+
+class RasterTileServer:
+    """Threaded HTTP server for /{layer}/{z}/{x}/{y}.png|webp tiles of registered rasters"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_cache_bytes=DEFAULT_CACHE_BYTES,
+                 cache_dir=DEFAULT_CACHE_DIR, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.host = host
+        self.port = port
+        self.cache = TileCache(max_cache_bytes)
+        self.disk_cache = DiskTileCache(cache_dir, max_disk_bytes) if cache_dir else None
+        self.sources = {}
+        self._signatures = {}
+        self._httpd = None
+
+    def register_raster(self, name, path, precompute_zooms=None, **style):
+        """Serve one band of a raster file; style is passed to RasterTileSource. Unchanged re-registration is a no-op"""
+        stat = os.stat(path)
+        signature = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, repr(sorted(style.items())))
+        previous = self.sources.get(name)
+        if previous is not None and self._signatures.get(name) == signature:
+            return previous
+        source = RasterTileSource(name, path, **style)
+        self.sources[name] = source
+        self._signatures[name] = signature
+        if previous is not None and previous.key != source.key:
+            self.cache.evict_layer(name)
+        if precompute_zooms:
+            self.precompute(name, precompute_zooms)
+        return source
+
+    def tile(self, name, z, x, y, fmt='png'):
+        """Encoded tile bytes from the memory cache, then the disk cache, then the raster"""
+        source = self.sources[name]
+        key = (name, z, x, y, fmt, source.key)
+        tile = self.cache.get(key)
+        if tile is not None:
+            return tile
+        disk_key = (source.key, z, x, y, fmt)
+        tile = self.disk_cache.get(disk_key) if self.disk_cache else None
+        if tile is None:
+            tile = source.render(z, x, y, fmt)
+            if self.disk_cache and tile:
+                self.disk_cache.put(disk_key, tile)
+        self.cache.put(key, tile)
+        return tile
+
+    def precompute(self, name, zooms, fmt='png'):
+        """Render every tile of a raster's extent at the given zoom levels; returns the tile count"""
+        source = self.sources[name]
+        count = 0
+        for z in zooms:
+            for x, y in tiles_for_bounds(source.bounds, z):
+                self.tile(name, z, x, y, fmt)
+                count += 1
+        return count
+
+    def content_type(self, extension):
+        return TILE_FORMATS[extension][1] if extension in TILE_FORMATS else None
+
+    def url_template(self, name, fmt='png'):
+        """Leaflet-style {z}/{x}/{y} URL of a layer"""
+        base = os.environ.get('SAR_RASTER_TILE_URL', f"http://{self.host}:{self.port}")
+        return f"{base.rstrip('/')}/{name}/{{z}}/{{x}}/{{y}}.{fmt}"
+
+    def start(self):
+        """Serve on a daemon thread; returns self"""
+        if self._httpd is None:
+            self._httpd = _bind(self.host, self.port, _handler(self))
+            self.port = self._httpd.server_address[1]
+            threading.Thread(target=self._httpd.serve_forever, name='raster-tile-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Process-wide raster tile server, started on first use"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = RasterTileServer(host, port).start()
+        return _server
+
+
+def add_raster_tile_layer(m, name, path, layer_name=None, opacity=0.8, fmt='png', server=None, **style):
+    """Register a raster with the tile server and add it to a leafmap map as an XYZ tile layer"""
+    server = server or get_server()
+    server.register_raster(name, path, **style)
+    m.add_tile_layer(url=server.url_template(name, fmt), name=layer_name or name,
+                     attribution='SAR Disaster Lens', opacity=opacity)
+    return m
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Serve rasters (ideally COGs) as colour-mapped XYZ tiles")
+    parser.add_argument('rasters', nargs='+', help="Raster files; the layer name is the file stem")
+    parser.add_argument('--palette', default='gray', choices=sorted(PALETTES))
+    parser.add_argument('--vmin', type=float)
+    parser.add_argument('--vmax', type=float)
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    tile_server = RasterTileServer(args.host, args.port, cache_dir=args.cache_dir)
+    for raster_path in args.rasters:
+        layer = os.path.splitext(os.path.basename(raster_path))[0]
+        tile_server.register_raster(layer, raster_path, palette=args.palette, vmin=args.vmin, vmax=args.vmax)
+    tile_server.start()
+    for layer in tile_server.sources:
+        print(f"Layer {layer}: {tile_server.url_template(layer)}")
+    while True:
+        time.sleep(3600)
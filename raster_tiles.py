@@ -0,0 +1,87 @@
+"""
+Tiled Raster Helpers for SAR Disaster Lens
+Window iteration shared by the scene-scale SAR processing modules
+"""
+
+import numpy as np
+from collections import namedtuple
+
+DEFAULT_TILE_SIZE = 512
+
+TileWindow = namedtuple('TileWindow', ['row', 'col', 'height', 'width'])
+
+
+def tile_grid_shape(shape, tile_size=DEFAULT_TILE_SIZE):
+    """Number of tile rows and columns needed to cover a raster"""
+    rows, cols = shape[:2]
+    return (-(-rows // tile_size), -(-cols // tile_size))
+
+
+def iter_tiles(shape, tile_size=DEFAULT_TILE_SIZE):
+    """Yield row-major TileWindow objects covering a raster of the given shape"""
+    rows, cols = shape[:2]
+    for row in range(0, rows, tile_size):
+        for col in range(0, cols, tile_size):
+            yield TileWindow(row, col, min(tile_size, rows - row), min(tile_size, cols - col))
+
+
+def tile_index(window, tile_size=DEFAULT_TILE_SIZE):
+    """(tile_row, tile_col) grid index of a window produced by iter_tiles"""
+    return (window.row // tile_size, window.col // tile_size)
+
+
+def tile_slices(window):
+    """Array slices selecting a window"""
+    return (slice(window.row, window.row + window.height),
+            slice(window.col, window.col + window.width))
+
+
+def read_tile(array, window):
+    """Read a window from an in-memory or memory-mapped raster"""
+    return array[tile_slices(window)]
+
+
+def window_reader(source):
+    """Callable window -> ndarray for an in-memory/memory-mapped raster or an existing reader"""
+    if callable(source):
+        return source
+    return lambda window: np.asarray(read_tile(source, window))
+
+
+def read_band_tile(array, window):
+    """Read a window from a ([bands,] rows, cols) band stack, keeping the band axis"""
+    return array[(Ellipsis,) + tile_slices(window)]
+
+
+def band_window_reader(source):
+    """Like window_reader, but windows slice the last two axes of a ([bands,] rows, cols) array"""
+    if callable(source):
+        return source
+    return lambda window: np.asarray(read_band_tile(source, window))
+
+
+def padded_window(window, shape, halo):
+    """Window grown by a halo and clipped to the raster bounds"""
+    outer, _ = padded_slices(window, shape, halo)
+    return TileWindow(outer[0].start, outer[1].start,
+                      outer[0].stop - outer[0].start, outer[1].stop - outer[1].start)
+
+
+def padded_slices(window, shape, halo):
+    """Slices for a window grown by a halo, plus the inner slices into that padded block"""
+    rows, cols = shape[:2]
+    row0 = max(0, window.row - halo)
+    col0 = max(0, window.col - halo)
+    row1 = min(rows, window.row + window.height + halo)
+    col1 = min(cols, window.col + window.width + halo)
+    outer = (slice(row0, row1), slice(col0, col1))
+    inner = (slice(window.row - row0, window.row - row0 + window.height),
+             slice(window.col - col0, window.col - col0 + window.width))
+    return outer, inner
+
+
+def allocate_output(shape, dtype=np.float32, path=None):
+    """Allocate a destination raster, memory-mapped to disk when a path is given"""
+    if path is None:
+        return np.empty(shape, dtype=dtype)
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=tuple(shape))
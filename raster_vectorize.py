@@ -0,0 +1,217 @@
+"""
+Raster-to-Polygon Vectorisation for SAR Disaster Lens
+Offline replacement for Earth Engine reduceToVectors on tiled change masks
+
+Pass 1 labels each tile independently and records provisional labels.
+Provisional labels that touch across tile borders are merged with a
+vectorised union-find. Pass 2 maps tiles to final component ids, accumulates
+pixel counts and bounding boxes, and traces per-tile outlines that are
+dissolved per component. Cost is linear in the number of tiles and memory is
+bounded by the tile size plus the (optionally memory-mapped) label raster.
+"""
+
+import numpy as np
+import geopandas as gpd
+import shapely
+from rasterio import features
+from rasterio.transform import Affine, from_bounds
+from scipy import ndimage
+
+from raster_tiles import DEFAULT_TILE_SIZE, iter_tiles, tile_slices, window_reader, allocate_output
+
+EQUAL_AREA_CRS = 'EPSG:6933'
+
+
+def _structure(eight_connected):
+    return np.ones((3, 3), dtype=bool) if eight_connected else ndimage.generate_binary_structure(2, 1)
+
+
+def label_tiles(mask, shape, tile_size=DEFAULT_TILE_SIZE, eight_connected=True, labels_path=None):
+    """Pass 1: label every tile on its own with globally unique provisional labels"""
+    read = window_reader(mask)
+    labels = allocate_output(shape, np.int32, labels_path)
+    structure = _structure(eight_connected)
+    next_label = 0
+    for window in iter_tiles(shape, tile_size):
+        tile_labels, count = ndimage.label(np.asarray(read(window), dtype=bool), structure=structure)
+        tile_labels = tile_labels.astype(np.int32)
+        tile_labels[tile_labels > 0] += next_label
+        labels[tile_slices(window)] = tile_labels
+        next_label += count
+    return labels, next_label
+
+
+def _find_roots(parent):
+    """Pointer jumping until every label points at its root"""
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent = grand
+
+
+def union_pairs(parent, a, b):
+    """Vectorised union-find: merge the sets of each (a[i], b[i]) pair, smaller root wins"""
+    while True:
+        parent = _find_roots(parent)
+        ra, rb = parent[a], parent[b]
+        differ = ra != rb
+        if not differ.any():
+            return parent
+        low = np.minimum(ra[differ], rb[differ])
+        high = np.maximum(ra[differ], rb[differ])
+        np.minimum.at(parent, high, low)
+
+
+def _border_pairs(first, second, eight_connected):
+    """Label pairs that touch across a border given the two facing pixel lines"""
+    pairs = [(first, second)]
+    if eight_connected:
+        pairs += [(first[:-1], second[1:]), (first[1:], second[:-1])]
+    a = np.concatenate([p[0] for p in pairs])
+    b = np.concatenate([p[1] for p in pairs])
+    keep = (a > 0) & (b > 0)
+    return a[keep], b[keep]
+
+
+def stitch_labels(labels, n_labels, tile_size=DEFAULT_TILE_SIZE, eight_connected=True):
+    """Lookup table mapping provisional labels to compact final component ids (0 = background)"""
+    rows, cols = labels.shape
+    parent = np.arange(n_labels + 1, dtype=np.int64)
+    pairs_a, pairs_b = [], []
+    for col in range(tile_size, cols, tile_size):
+        a, b = _border_pairs(np.asarray(labels[:, col - 1]), np.asarray(labels[:, col]), eight_connected)
+        pairs_a.append(a)
+        pairs_b.append(b)
+    for row in range(tile_size, rows, tile_size):
+        a, b = _border_pairs(np.asarray(labels[row - 1, :]), np.asarray(labels[row, :]), eight_connected)
+        pairs_a.append(a)
+        pairs_b.append(b)
+    if pairs_a:
+        parent = union_pairs(parent, np.concatenate(pairs_a), np.concatenate(pairs_b))
+
+    _, compact = np.unique(parent[1:], return_inverse=True)
+    lookup = np.zeros(n_labels + 1, dtype=np.int32)
+    lookup[1:] = compact.ravel() + 1
+    return lookup
+
+
+def component_properties(labels, lookup, tile_size=DEFAULT_TILE_SIZE):
+    """Pixel count and pixel bounding box for every final component"""
+    n = int(lookup.max()) + 1
+    count = np.zeros(n, dtype=np.int64)
+    min_row = np.full(n, np.iinfo(np.int64).max)
+    min_col = np.full(n, np.iinfo(np.int64).max)
+    max_row = np.full(n, -1, dtype=np.int64)
+    max_col = np.full(n, -1, dtype=np.int64)
+
+    for window in iter_tiles(labels.shape, tile_size):
+        final = lookup[np.asarray(labels[tile_slices(window)])]
+        r, c = np.nonzero(final)
+        ids = final[r, c]
+        r = r + window.row
+        c = c + window.col
+        count += np.bincount(ids, minlength=n)
+        np.minimum.at(min_row, ids, r)
+        np.minimum.at(min_col, ids, c)
+        np.maximum.at(max_row, ids, r)
+        np.maximum.at(max_col, ids, c)
+
+    return {'pixel_count': count, 'min_row': min_row, 'min_col': min_col, 'max_row': max_row, 'max_col': max_col}
+
+
+def trace_components(labels, lookup, transform, tile_size=DEFAULT_TILE_SIZE, eight_connected=True):
+    """Outline polygons per component: traced per tile, dissolved across tile borders"""
+    pieces = {}
+    for window in iter_tiles(labels.shape, tile_size):
+        final = lookup[np.asarray(labels[tile_slices(window)])]
+        if not final.any():
+            continue
+        tile_transform = transform * Affine.translation(window.col, window.row)
+        for geometry, value in features.shapes(final, mask=final > 0, transform=tile_transform,
+                                               connectivity=8 if eight_connected else 4):
+            pieces.setdefault(int(value), []).append(shapely.geometry.shape(geometry))
+
+    polygons = {}
+    for component, parts in pieces.items():
+        geometry = parts[0] if len(parts) == 1 else shapely.union_all(parts)
+        polygons[component] = shapely.make_valid(geometry)
+    return polygons
+
+
+def vectorize_mask(mask, transform=None, crs=None, shape=None, tile_size=DEFAULT_TILE_SIZE,
+                   eight_connected=True, min_pixels=1, name_prefix='change', labels_path=None):
+    """
+    Vectorise a boolean mask (array, memmap or window reader) into a GeoDataFrame.
+
+    Columns mirror the GEE exports in data/ (id, name) plus pixel_count,
+    area_km2 and the component bounding box in CRS coordinates. Without a
+    transform, polygons are in (col, row) pixel coordinates with no CRS and
+    area_km2 is NaN; pixel_count is then the only area measure.
+    """
+    if shape is None:
+        shape = mask.shape
+    shape = tuple(shape[:2])
+    georeferenced = transform is not None
+    if not georeferenced and crs is not None:
+        raise ValueError("A crs needs the transform that maps pixels into it")
+    transform = Affine.identity() if transform is None else Affine(*tuple(transform)[:6])
+
+    labels, n_labels = label_tiles(mask, shape, tile_size, eight_connected, labels_path)
+    lookup = stitch_labels(labels, n_labels, tile_size, eight_connected)
+    props = component_properties(labels, lookup, tile_size)
+
+    # Drop components below the minimum size before tracing
+    small = props['pixel_count'] < min_pixels
+    small[0] = True
+    lookup = np.where(small[lookup], 0, lookup).astype(np.int32)
+    polygons = trace_components(labels, lookup, transform, tile_size, eight_connected)
+
+    ids = np.array(sorted(polygons), dtype=np.int64)
+    gdf = gpd.GeoDataFrame({
+        'id': np.arange(1, len(ids) + 1),
+        'name': [f"{name_prefix}_{i}" for i in range(1, len(ids) + 1)],
+        'pixel_count': props['pixel_count'][ids],
+    }, geometry=[polygons[i] for i in ids], crs=crs)
+
+    bounds = gdf.geometry.bounds
+    gdf[['minx', 'miny', 'maxx', 'maxy']] = bounds[['minx', 'miny', 'maxx', 'maxy']].to_numpy()
+    if not georeferenced:
+        gdf['area_km2'] = np.nan
+    elif gdf.crs is not None and gdf.crs.is_geographic:
+        gdf['area_km2'] = gdf.geometry.to_crs(EQUAL_AREA_CRS).area / 1e6 if len(gdf) else []
+    else:
+        pixel_area = abs(transform.a * transform.e - transform.b * transform.d)
+        gdf['area_km2'] = gdf['pixel_count'] * pixel_area / 1e6
+    return gdf
+
+
+def write_vectors(gdf, path):
+    """Write components as GeoJSON (.geojson/.json) or GeoParquet (.parquet)"""
+    if path.endswith('.parquet'):
+        gdf.to_parquet(path)
+    else:
+        gdf.to_file(path, driver='GeoJSON')
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vectorise a change mask (.npy) into polygons")
+    parser.add_argument('mask', help="Boolean or 0/1 mask saved with numpy.save")
+    parser.add_argument('output', help="Output .geojson or .parquet path")
+    parser.add_argument('--bounds', nargs=4, type=float, metavar=('WEST', 'SOUTH', 'EAST', 'NORTH'),
+                        help="Geographic bounds of the mask (EPSG:4326); without them polygons are "
+                             "in pixel coordinates")
+    parser.add_argument('--min-pixels', type=int, default=1)
+    parser.add_argument('--four-connected', action='store_true')
+    parser.add_argument('--name-prefix', default='change')
+    args = parser.parse_args()
+
+    mask_array = np.load(args.mask, mmap_mode='r')
+    affine = from_bounds(*args.bounds, mask_array.shape[1], mask_array.shape[0]) if args.bounds else None
+    result = vectorize_mask(mask_array, affine, 'EPSG:4326' if args.bounds else None, min_pixels=args.min_pixels,
+                            eight_connected=not args.four_connected, name_prefix=args.name_prefix)
+    write_vectors(result, args.output)
+    print(f"Wrote {len(result)} polygons to {args.output}")
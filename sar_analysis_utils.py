@@ -252,12 +252,16 @@ class SARAnalyzer:
             water_mask = vv < water_threshold
             water_extent = np.sum(water_mask) / len(water_mask) * 100  # percentage
             
-            # Estimate soil moisture for non-water areas
-            soil_moisture = np.clip((-vv + 10) / 20, 0, 1)  # Normalized
+            # Estimate soil moisture (m³/m³) for non-water areas with the water cloud model
+            from soil_moisture import invert_soil_moisture
+            incidence = sar_data.get('incidence_angle', 35.0)
+            vegetation = sar_data.get('vegetation_water_content', 0.5)  # kg/m²
+            soil_moisture = invert_soil_moisture(vv, incidence, vegetation)
+            dry_land = ~water_mask & ~np.isnan(soil_moisture)
             
             return {
                 'water_extent_percent': water_extent,
-                'avg_soil_moisture': np.mean(soil_moisture[~water_mask]) if not np.all(water_mask) else 0,
+                'avg_soil_moisture': np.mean(soil_moisture[dry_land]) if np.any(dry_land) else 0,
                 'flood_duration_days': np.sum(water_mask) / len(water_mask) * 365
             }
         
@@ -295,6 +299,28 @@ class SARAnalyzer:
                 'trend_r_squared': r_value**2
             }
         
+        elif process_type == 'forest_biomass':
+            # Fit saturating backscatter-biomass curves per stratum (rows) from reference plots
+            from biomass_fitting import fit_saturation_curves, invert_biomass
+            model = sar_data.get('biomass_model', 'exponential')
+            fit = fit_saturation_curves(sar_data['biomass'], vv, model=model)
+            
+            # Biomass at each stratum's mean backscatter, NaN where the curve has saturated
+            mean_vv = np.nanmean(np.atleast_2d(vv), axis=1)
+            biomass = invert_biomass(mean_vv, fit['params'], model)
+            
+            return {
+                'biomass_model': model,
+                'parameter_names': fit['parameter_names'],
+                'curve_parameters': fit['params'],
+                'parameter_std_error': fit['std_error'],
+                'converged': fit['converged'],
+                'converged_fraction': np.mean(fit['converged']),
+                'rms_residual_db': fit['rms_residual'],
+                'estimated_biomass': biomass,
+                'saturated_fraction': np.mean(np.isnan(biomass))
+            }
+        
         else:
             # Generic physical parameters
             return {
@@ -304,6 +330,37 @@ class SARAnalyzer:
                 'temporal_stability': 1 / (1 + np.std(vv))
             }
 
+    def estimate_deformation(self, phase_stack, dates, pairs=None, max_temporal_baseline=48):
+        """Estimate ground deformation from an unwrapped interferogram stack (SBAS)"""
+        from sbas_inversion import SBASInversion, build_sbas_network
+
+        if pairs is None:
+            pairs = build_sbas_network(dates, max_temporal_baseline)
+        inversion = SBASInversion(dates, pairs)
+        result = inversion.invert(phase_stack)
+
+        velocity = result['velocity']
+        return {
+            'dates': result['dates'],
+            'displacement_m': result['displacement'],
+            'velocity_m_per_year': velocity,
+            'residual_rms_m': result['residual_rms'],
+            'max_uplift_rate_mm_per_year': float(np.nanmax(velocity)) * 1000,
+            'network_connected': inversion.is_connected
+        }
+
+    def estimate_ice_motion(self, reference, secondary, dt_days, pixel_spacing=10.0, n_workers=None):
+        """Estimate glacier surface velocity from an image pair by FFT offset tracking"""
+        from offset_tracking import OffsetTracker, classify_ice_motion
+
+        tracker = OffsetTracker(n_workers=n_workers)
+        field = tracker.velocity_field(reference, secondary, dt_days, pixel_spacing)
+        speed = field['speed']
+        field['motion_class'] = classify_ice_motion(speed)
+        field['mean_speed_m_per_day'] = float(np.nanmean(speed)) if np.any(field['valid']) else 0.0
+        field['max_speed_m_per_day'] = float(np.nanmax(speed)) if np.any(field['valid']) else 0.0
+        return field
+
 class HypothesisFramework:
     """Framework for developing and testing scientific hypotheses"""
     
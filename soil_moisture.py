@@ -0,0 +1,110 @@
+"""
+Water Cloud Model Soil-Moisture Inversion for SAR Disaster Lens
+Lookup-table inversion of backscatter for volumetric soil moisture
+
+The forward water cloud model is evaluated once on a regular grid of soil
+moisture, incidence angle and vegetation descriptor, then inverted along the
+moisture axis into a (backscatter, incidence, vegetation) lookup table. Whole
+rasters are inverted with a single vectorised trilinear interpolation pass.
+"""
+
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+
+# Water cloud model coefficients (C-band VV, vegetation water content in kg/m²)
+WCMParameters = namedtuple('WCMParameters', ['A', 'B', 'C', 'D'])
+C_BAND_VV = WCMParameters(A=0.0012, B=0.091, C=-20.0, D=30.0)
+
+MOISTURE_RANGE = (0.02, 0.50)  # m³/m³
+
+
+def wcm_forward(soil_moisture, incidence_deg, vegetation, params=C_BAND_VV):
+    """Total backscatter (dB) from the water cloud model"""
+    cos_t = np.cos(np.radians(incidence_deg))
+    attenuation = np.exp(-2 * params.B * vegetation / cos_t)
+    vegetation_term = params.A * vegetation * cos_t * (1 - attenuation)
+    soil_term = 10 ** ((params.C + params.D * soil_moisture) / 10)
+    return 10 * np.log10(vegetation_term + attenuation * soil_term)
+
+
+class SoilMoistureLUT:
+    """Precomputed inverse water cloud model over (backscatter, incidence, vegetation)"""
+
+    def __init__(self, params=C_BAND_VV, backscatter_range=(-30.0, 0.0), incidence_range=(20.0, 50.0),
+                 vegetation_range=(0.0, 5.0), shape=(301, 31, 26), moisture_samples=256):
+        self.params = params
+        self.axes = (
+            np.linspace(*backscatter_range, shape[0]),
+            np.linspace(*incidence_range, shape[1]),
+            np.linspace(*vegetation_range, shape[2]) if shape[2] > 1 else np.array([vegetation_range[0]])
+        )
+        self.table = self._build(moisture_samples)
+
+    def _build(self, moisture_samples):
+        """Invert the forward model along the moisture axis for every (incidence, vegetation) node"""
+        sigma_axis, theta_axis, veg_axis = self.axes
+        moisture = np.linspace(*MOISTURE_RANGE, moisture_samples)
+        forward = wcm_forward(moisture[:, None, None], theta_axis[None, :, None],
+                              veg_axis[None, None, :], self.params)
+
+        table = np.empty((len(sigma_axis), len(theta_axis), len(veg_axis)), dtype=np.float32)
+        for j in range(len(theta_axis)):
+            for k in range(len(veg_axis)):
+                # Backscatter rises monotonically with moisture; outside the curve there is no solution
+                table[:, j, k] = np.interp(sigma_axis, forward[:, j, k], moisture, left=np.nan, right=np.nan)
+        return table
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def _fractional_index(self, values, axis):
+        """Lower grid index and interpolation weight of values along a uniform axis"""
+        if len(axis) == 1:
+            return np.zeros(np.shape(values), dtype=np.intp), np.zeros(np.shape(values), dtype=np.float32)
+        step = axis[1] - axis[0]
+        position = np.clip((np.asarray(values, dtype=np.float32) - axis[0]) / step, 0, len(axis) - 1)
+        lower = np.minimum(position.astype(np.intp), len(axis) - 2)
+        return lower, (position - lower).astype(np.float32)
+
+    def invert(self, backscatter_db, incidence_deg, vegetation=0.0):
+        """Soil moisture (m³/m³) for whole rasters by trilinear table interpolation"""
+        backscatter_db = np.asarray(backscatter_db, dtype=np.float32)
+        shape = np.broadcast_shapes(backscatter_db.shape, np.shape(incidence_deg), np.shape(vegetation))
+        outside = (backscatter_db < self.axes[0][0]) | (backscatter_db > self.axes[0][-1])
+
+        _, nj, nk = self.table.shape
+        i0, fi = self._fractional_index(backscatter_db, self.axes[0])
+        j0, fj = self._fractional_index(incidence_deg, self.axes[1])
+        k0, fk = self._fractional_index(vegetation, self.axes[2])
+
+        # Gather the 8 surrounding nodes from the flattened table with fixed strides
+        flat = self.table.ravel()
+        base = (i0 * nj + j0) * nk + k0
+        di, dj, dk = nj * nk, nk if nj > 1 else 0, 1 if nk > 1 else 0
+
+        def corner(offset):
+            return flat[base + offset]
+
+        c0 = ((corner(0) * (1 - fi) + corner(di) * fi) * (1 - fj)
+              + (corner(dj) * (1 - fi) + corner(di + dj) * fi) * fj)
+        if dk:
+            c1 = ((corner(dk) * (1 - fi) + corner(di + dk) * fi) * (1 - fj)
+                  + (corner(dj + dk) * (1 - fi) + corner(di + dj + dk) * fi) * fj)
+            moisture = c0 * (1 - fk) + c1 * fk
+        else:
+            moisture = c0
+        moisture = np.broadcast_to(moisture, shape)
+        return np.where(outside, np.nan, moisture)
+
+
+@lru_cache(maxsize=4)
+def get_lut(params=C_BAND_VV):
+    """Shared lookup table per parameter set, built on first use"""
+    return SoilMoistureLUT(params)
+
+
+def invert_soil_moisture(backscatter_db, incidence_deg=35.0, vegetation=0.0, params=C_BAND_VV):
+    """Soil-moisture map from backscatter via the cached water cloud model table"""
+    return get_lut(params).invert(backscatter_db, incidence_deg, vegetation)
@@ -0,0 +1,227 @@
+"""
+Streaming Raster Statistics for SAR Disaster Lens
+Fixed-bin histograms, moments and mergeable quantile sketches for change maps
+
+Statistics are accumulated one tile at a time and partial results from
+parallel workers merge exactly (histograms, moments) or with bounded error
+(quantile sketch), so continent-scale rasters are summarised in one pass
+without ever flattening or copying the full array.
+"""
+
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from raster_tiles import DEFAULT_TILE_SIZE, iter_tiles, window_reader
+
+
+class StreamingHistogram:
+    """Fixed-range histogram accumulated with bincount; values outside the range are counted separately"""
+
+    def __init__(self, value_range, bins=50):
+        self.low, self.high = float(value_range[0]), float(value_range[1])
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @property
+    def edges(self):
+        return np.linspace(self.low, self.high, self.bins + 1)
+
+    def update(self, values):
+        values = values[np.isfinite(values)].astype(np.float64, copy=False)
+        index = np.floor((values - self.low) / (self.high - self.low) * self.bins).astype(np.int64)
+        # The upper edge is inclusive, as in np.histogram
+        index[values == self.high] = self.bins - 1
+        self.underflow += int(np.count_nonzero(index < 0))
+        self.overflow += int(np.count_nonzero(index >= self.bins))
+        inside = index[(index >= 0) & (index < self.bins)]
+        self.counts += np.bincount(inside, minlength=self.bins)
+        return self
+
+    def merge(self, other):
+        if (other.low, other.high, other.bins) != (self.low, self.high, self.bins):
+            raise ValueError("Histograms must share the same range and bin count to merge")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+
+class StreamingMoments:
+    """Count, min, max, mean and variance with Chan's parallel update"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        if count == 0:
+            return self
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+        return self
+
+    def update(self, values):
+        values = values[np.isfinite(values)].astype(np.float64, copy=False)
+        if values.size == 0:
+            return self
+        mean = values.mean()
+        return self._combine(values.size, mean, float(((values - mean) ** 2).sum()),
+                             float(values.min()), float(values.max()))
+
+    def merge(self, other):
+        return self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+
+class KLLSketch:
+    """
+    Mergeable quantile sketch in the style of KLL.
+
+    Level h holds items of weight 2**h. Levels over capacity are compacted by
+    sorting and keeping every other item from a random offset. Whole tiles are
+    bulk-inserted by sorting once and sub-sampling straight into the level
+    whose capacity they fit, which is equivalent to repeated compaction.
+    """
+
+    def __init__(self, capacity=256, seed=None):
+        self.capacity = capacity
+        self.levels = []
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _level(self, height):
+        while len(self.levels) <= height:
+            self.levels.append(np.empty(0, dtype=np.float64))
+        return self.levels[height]
+
+    def _compact(self):
+        height = 0
+        while height < len(self.levels):
+            items = self.levels[height]
+            if items.size > self.capacity:
+                items = np.sort(items)
+                # An odd leftover stays at this level so total weight is preserved
+                leftover, items = items[:items.size % 2], items[items.size % 2:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[height] = leftover
+                self.levels[height + 1] = np.concatenate([self._level(height + 1), promoted])
+            height += 1
+
+    def update(self, values):
+        values = np.sort(values[np.isfinite(values)].astype(np.float64, copy=False))
+        if values.size == 0:
+            return self
+        self.count += values.size
+        height = 0
+        while values.size > self.capacity:
+            values = values[self._rng.integers(2)::2]
+            height += 1
+        self.levels[height] = np.concatenate([self._level(height), values])
+        self._compact()
+        return self
+
+    def merge(self, other):
+        for height, items in enumerate(other.levels):
+            self.levels[height] = np.concatenate([self._level(height), items])
+        self.count += other.count
+        self._compact()
+        return self
+
+    def quantile(self, q):
+        """Approximate quantile(s) for q in [0, 1]"""
+        items = np.concatenate(self.levels) if self.levels else np.empty(0)
+        if items.size == 0:
+            return np.full(np.shape(q), np.nan)
+        weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        target = np.asarray(q) * cumulative[-1]
+        index = np.minimum(np.searchsorted(cumulative, target, side='left'), items.size - 1)
+        return items[order][index]
+
+
+class RasterStatistics:
+    """Histogram, moments and quantile sketch accumulated together"""
+
+    def __init__(self, value_range, bins=50, sketch_capacity=256, seed=None):
+        self.histogram = StreamingHistogram(value_range, bins)
+        self.moments = StreamingMoments()
+        self.sketch = KLLSketch(sketch_capacity, seed)
+
+    def update(self, tile):
+        values = np.asarray(tile).ravel()
+        self.histogram.update(values)
+        self.moments.update(values)
+        self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        self.histogram.merge(other.histogram)
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def percentiles(self, percents=(1, 5, 25, 50, 75, 95, 99)):
+        return dict(zip(percents, self.sketch.quantile(np.asarray(percents) / 100.0)))
+
+    def summary(self):
+        m = self.moments
+        return {
+            'count': m.count,
+            'min': m.min,
+            'max': m.max,
+            'mean': m.mean,
+            'std': m.std,
+            'percentiles': self.percentiles(),
+            'histogram_counts': self.histogram.counts,
+            'histogram_edges': self.histogram.edges,
+            'out_of_range': self.histogram.underflow + self.histogram.overflow
+        }
+
+
+def raster_statistics(source, value_range, bins=50, shape=None, tile_size=DEFAULT_TILE_SIZE,
+                      max_workers=None, sketch_capacity=256):
+    """
+    One-pass statistics over a tiled raster (array, memmap or window reader).
+
+    Each worker accumulates its own partial statistics over an interleaved
+    subset of tiles; partials are merged at the end.
+    """
+    if shape is None:
+        shape = source.shape
+    read = window_reader(source)
+    windows = list(iter_tiles(shape, tile_size))
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(windows)))
+
+    def accumulate(worker):
+        partial = RasterStatistics(value_range, bins, sketch_capacity, seed=worker)
+        for window in windows[worker::workers]:
+            partial.update(read(window))
+        return partial
+
+    if workers == 1:
+        return accumulate(0)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(accumulate, range(workers)))
+    result = partials[0]
+    for partial in partials[1:]:
+        result.merge(partial)
+    return result
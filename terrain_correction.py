@@ -0,0 +1,274 @@
+"""
+Radiometric Terrain Correction for SAR Disaster Lens
+Incidence-angle normalisation and DEM-based gamma-nought terrain flattening
+
+Geometry-dependent grids (ellipsoid incidence, flattening factor, shadow/layover
+mask) only depend on the relative orbit and the DEM, so they are computed once
+per geometry and reused for every acquisition of a multi-date stack.
+"""
+
+import numpy as np
+from collections import OrderedDict, namedtuple
+import hashlib
+import os
+
+from raster_tiles import (DEFAULT_TILE_SIZE, iter_tiles, tile_slices, padded_slices, padded_window,
+                          allocate_output)
+
+# Viewing geometry shared by every acquisition from one relative orbit
+AcquisitionGeometry = namedtuple(
+    'AcquisitionGeometry',
+    ['relative_orbit', 'heading_deg', 'incidence_near_deg', 'incidence_far_deg', 'look_direction']
+)
+AcquisitionGeometry.__new__.__defaults__ = ('right',)
+
+# Sentinel-1 IW defaults
+SENTINEL1_ASCENDING = AcquisitionGeometry(relative_orbit=None, heading_deg=-12.0,
+                                          incidence_near_deg=30.0, incidence_far_deg=46.0)
+SENTINEL1_DESCENDING = AcquisitionGeometry(relative_orbit=None, heading_deg=-168.0,
+                                           incidence_near_deg=30.0, incidence_far_deg=46.0)
+
+MIN_COSINE = 1e-3
+
+
+def db_to_linear(db):
+    """Convert backscatter from dB to linear power"""
+    return np.power(10.0, np.asarray(db) / 10.0)
+
+
+def linear_to_db(linear):
+    """Convert linear power backscatter to dB"""
+    return 10.0 * np.log10(np.maximum(linear, 1e-12))
+
+
+def cosine_normalise(sigma0_db, incidence_deg, reference_deg=35.0, power=2.0):
+    """Normalise backscatter (dB) to a reference incidence angle with the cos^n law"""
+    ratio = np.cos(np.radians(reference_deg)) / np.cos(np.radians(incidence_deg))
+    return np.asarray(sigma0_db) + 10.0 * power * np.log10(ratio)
+
+
+def _range_axis(geometry):
+    """Horizontal unit vector (east, north) pointing from the sensor track to the ground"""
+    look_offset = 90.0 if geometry.look_direction == 'right' else -90.0
+    azimuth = np.radians(geometry.heading_deg + look_offset)
+    return np.sin(azimuth), np.cos(azimuth)
+
+
+def _ground_range_extent(geometry, shape, pixel_spacing):
+    """Min/max ground-range coordinate over the scene corners"""
+    ue, un = _range_axis(geometry)
+    rows, cols = shape
+    east = np.array([0, cols - 1, 0, cols - 1]) * pixel_spacing
+    north = -np.array([0, 0, rows - 1, rows - 1]) * pixel_spacing
+    ground_range = east * ue + north * un
+    return ground_range.min(), ground_range.max()
+
+
+def ellipsoid_incidence(geometry, shape, pixel_spacing, window=None, extent=None):
+    """Ellipsoid incidence angle (deg) for a north-up raster or one of its windows"""
+    if window is None:
+        row0, col0, height, width = 0, 0, shape[0], shape[1]
+    else:
+        row0, col0, height, width = window
+    if extent is None:
+        extent = _ground_range_extent(geometry, shape, pixel_spacing)
+
+    ue, un = _range_axis(geometry)
+    east = (col0 + np.arange(width, dtype=np.float64)) * pixel_spacing
+    north = -(row0 + np.arange(height, dtype=np.float64)) * pixel_spacing
+    ground_range = north[:, None] * un + east[None, :] * ue
+
+    span = max(extent[1] - extent[0], 1e-9)
+    fraction = (ground_range - extent[0]) / span
+    return geometry.incidence_near_deg + fraction * (geometry.incidence_far_deg - geometry.incidence_near_deg)
+
+
+def flattening_factor(incidence_deg, geometry, dem=None, pixel_spacing=10.0):
+    """
+    Gamma-nought flattening factor for sigma0 on the ellipsoid.
+
+    Uses the projection-angle formulation: gamma0_T = beta0 * cos(psi) / cos(theta_local)
+    with beta0 = sigma0 / sin(theta_ellipsoid). Returns (factor, valid) where invalid
+    pixels are radar shadow or layover. Without a DEM this reduces to 1 / cos(theta).
+    """
+    theta = np.radians(incidence_deg)
+    sin_t, cos_t = np.sin(theta), np.cos(theta)
+    if dem is None:
+        return 1.0 / cos_t, np.ones(theta.shape, dtype=bool)
+
+    ue, un = _range_axis(geometry)
+    heading = np.radians(geometry.heading_deg)
+    ae, an = np.sin(heading), np.cos(heading)
+
+    # Surface normal from DEM gradients (rows run south, columns run east)
+    dz_drow, dz_dcol = np.gradient(dem.astype(np.float64), pixel_spacing)
+    nx, ny, nz = -dz_dcol, dz_drow, np.ones_like(dz_dcol)
+    norm = np.sqrt(nx * nx + ny * ny + 1.0)
+
+    # Look vector from ground to sensor
+    lx, ly, lz = -sin_t * ue, -sin_t * un, cos_t
+    cos_local = (nx * lx + ny * ly + nz * lz) / norm
+
+    # Image-plane normal = azimuth x look, oriented upwards
+    px = an * lz
+    py = -ae * lz
+    pz = ae * ly - an * lx
+    sign = np.sign(pz)
+    cos_psi = sign * (nx * px + ny * py + nz * pz) / norm
+
+    valid = (cos_local > MIN_COSINE) & (cos_psi > MIN_COSINE)
+    factor = cos_psi / (np.maximum(sin_t, MIN_COSINE) * np.maximum(cos_local, MIN_COSINE))
+    return factor, valid
+
+
+class TerrainLUT:
+    """Precomputed geometry grids for one relative orbit over one DEM"""
+
+    def __init__(self, geometry, incidence, factor_db, valid):
+        self.geometry = geometry
+        self.incidence = incidence
+        self.factor_db = factor_db
+        self.valid = valid
+
+    @property
+    def shape(self):
+        return self.incidence.shape
+
+    @property
+    def nbytes(self):
+        return self.incidence.nbytes + self.factor_db.nbytes + self.valid.nbytes
+
+
+def build_terrain_lut(geometry, shape, dem=None, pixel_spacing=10.0,
+                      tile_size=DEFAULT_TILE_SIZE, cache_dir=None, cache_tag=''):
+    """Compute a TerrainLUT tile by tile, optionally memory-mapped under cache_dir"""
+    shape = tuple(shape[:2])
+    paths = [None, None, None]
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        stem = f"orbit{geometry.relative_orbit}_{cache_tag}"
+        paths = [os.path.join(cache_dir, f"{stem}_{name}.npy") for name in ('incidence', 'factor_db', 'valid')]
+
+    incidence = allocate_output(shape, np.float32, paths[0])
+    factor_db = allocate_output(shape, np.float32, paths[1])
+    valid = allocate_output(shape, np.bool_, paths[2])
+    extent = _ground_range_extent(geometry, shape, pixel_spacing)
+
+    for window in iter_tiles(shape, tile_size):
+        inner_slices = tile_slices(window)
+        theta = ellipsoid_incidence(geometry, shape, pixel_spacing, window, extent)
+        incidence[inner_slices] = theta
+
+        if dem is None:
+            factor, ok = flattening_factor(theta, geometry)
+        else:
+            # One-pixel halo so DEM gradients are continuous across tile borders
+            outer, inner = padded_slices(window, shape, 1)
+            theta_padded = ellipsoid_incidence(geometry, shape, pixel_spacing,
+                                               padded_window(window, shape, 1), extent)
+            factor, ok = flattening_factor(theta_padded, geometry, dem[outer], pixel_spacing)
+            factor, ok = factor[inner], ok[inner]
+
+        factor_db[inner_slices] = linear_to_db(factor)
+        valid[inner_slices] = ok
+
+    return TerrainLUT(geometry, incidence, factor_db, valid)
+
+
+def _dem_fingerprint(dem, pixel_spacing):
+    """Cheap identity for a DEM based on its shape and a strided sample"""
+    if dem is None:
+        return None
+    step = max(1, max(dem.shape) // 256)
+    digest = hashlib.sha1(np.ascontiguousarray(dem[::step, ::step]).tobytes()).hexdigest()
+    return (dem.shape, float(pixel_spacing), digest)
+
+
+class TerrainLUTCache:
+    """LRU cache of TerrainLUTs keyed by relative orbit, geometry and DEM"""
+
+    def __init__(self, max_entries=8, tile_size=DEFAULT_TILE_SIZE, cache_dir=None):
+        self.max_entries = max_entries
+        self.tile_size = tile_size
+        self.cache_dir = cache_dir
+        self._luts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, geometry, shape, dem=None, pixel_spacing=10.0, dem_key=None):
+        """Return the LUT for a geometry, building it on first use"""
+        if dem is not None:
+            shape = dem.shape
+        if dem_key is None:
+            dem_key = _dem_fingerprint(dem, pixel_spacing)
+        key = (geometry, tuple(shape[:2]), float(pixel_spacing), dem_key)
+
+        if key in self._luts:
+            self.hits += 1
+            self._luts.move_to_end(key)
+            return self._luts[key]
+
+        self.misses += 1
+        cache_tag = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+        lut = build_terrain_lut(geometry, shape, dem, pixel_spacing, self.tile_size,
+                                self.cache_dir, cache_tag)
+        self._luts[key] = lut
+        while len(self._luts) > self.max_entries:
+            self._luts.popitem(last=False)
+        return lut
+
+    def clear(self):
+        self._luts.clear()
+
+
+class RadiometricNormaliser:
+    """Terrain flattening and incidence normalisation for tiled SAR rasters"""
+
+    def __init__(self, dem=None, pixel_spacing=10.0, reference_incidence=35.0, power=2.0,
+                 tile_size=DEFAULT_TILE_SIZE, cache=None):
+        self.dem = dem
+        self.pixel_spacing = pixel_spacing
+        self.reference_incidence = reference_incidence
+        self.power = power
+        self.tile_size = tile_size
+        self.cache = cache if cache is not None else TerrainLUTCache(tile_size=tile_size)
+
+    def lut_for(self, geometry, shape):
+        """Cached geometry grids for an acquisition"""
+        return self.cache.get(geometry, shape, self.dem, self.pixel_spacing)
+
+    def flatten(self, sigma0_db, geometry, out=None):
+        """Convert ellipsoid sigma0 (dB) to terrain-flattened gamma0 (dB)"""
+        lut = self.lut_for(geometry, sigma0_db.shape)
+        if out is None:
+            out = np.empty(sigma0_db.shape, dtype=np.float32)
+        for window in iter_tiles(sigma0_db.shape, self.tile_size):
+            sl = tile_slices(window)
+            out[sl] = np.where(lut.valid[sl], sigma0_db[sl] + lut.factor_db[sl], np.nan)
+        return out
+
+    def normalise_incidence(self, backscatter_db, geometry, out=None):
+        """Normalise backscatter (dB) to the reference incidence angle"""
+        lut = self.lut_for(geometry, backscatter_db.shape)
+        if out is None:
+            out = np.empty(backscatter_db.shape, dtype=np.float32)
+        for window in iter_tiles(backscatter_db.shape, self.tile_size):
+            sl = tile_slices(window)
+            out[sl] = cosine_normalise(backscatter_db[sl], lut.incidence[sl],
+                                       self.reference_incidence, self.power)
+        return out
+
+    def correct(self, sigma0_db, geometry, out=None):
+        """Terrain flattening followed by incidence normalisation"""
+        lut = self.lut_for(geometry, sigma0_db.shape)
+        if out is None:
+            out = np.empty(sigma0_db.shape, dtype=np.float32)
+        for window in iter_tiles(sigma0_db.shape, self.tile_size):
+            sl = tile_slices(window)
+            gamma0 = np.where(lut.valid[sl], sigma0_db[sl] + lut.factor_db[sl], np.nan)
+            out[sl] = cosine_normalise(gamma0, lut.incidence[sl], self.reference_incidence, self.power)
+        return out
+
+    def correct_stack(self, acquisitions):
+        """Correct a multi-date stack of (sigma0_db, geometry) pairs, reusing LUTs per orbit"""
+        return [self.correct(sigma0_db, geometry) for sigma0_db, geometry in acquisitions]
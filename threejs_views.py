@@ -0,0 +1,124 @@
+"""
+Binary Data Transport for the Three.js Views of SAR Disaster Lens
+Static HTML templates fed with base64-encoded typed-array rasters
+
+The Three.js templates under templates/ are plain static files read once and
+cached. Per rerun only a JSON payload changes: rasters are encoded as
+little-endian Float32Array or quantised Uint16Array buffers in base64, at a
+few block-reduced resolutions so the browser can pick the mesh density that
+matches its own width and pixel ratio.
+"""
+
+import base64
+import json
+import numpy as np
+import os
+from functools import lru_cache
+
+from heatmap_pyramid import block_reduce
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+PAYLOAD_PLACEHOLDER = '/*__PAYLOAD__*/null'
+UINT16_MAX = 65535
+
+
+def encode_array(array, dtype='float32', value_range=None):
+    """
+    Encode a 2-D raster for transport.
+
+    float32 is sent as-is; uint16 is linearly quantised over value_range
+    (default: finite min/max) and decoded in the browser as offset + q * scale.
+    Non-finite values are sent as the low end of the range.
+    """
+    array = np.asarray(array, dtype=np.float32)
+    encoded = {'shape': list(array.shape), 'dtype': dtype}
+    if dtype == 'float32':
+        buffer = np.nan_to_num(array, nan=0.0).astype('<f4')
+    elif dtype == 'uint16':
+        finite = array[np.isfinite(array)]
+        low, high = value_range or ((float(finite.min()), float(finite.max())) if finite.size else (0.0, 1.0))
+        scale = (high - low) / UINT16_MAX if high > low else 1.0
+        quantised = np.round((np.nan_to_num(array, nan=low) - low) / scale)
+        buffer = np.clip(quantised, 0, UINT16_MAX).astype('<u2')
+        encoded.update(offset=low, scale=scale)
+    else:
+        raise ValueError(f"Unsupported transport dtype '{dtype}', expected 'float32' or 'uint16'")
+    encoded['data'] = base64.b64encode(buffer.tobytes()).decode('ascii')
+    return encoded
+
+
+def build_levels(grids, max_size=256, min_size=32):
+    """
+    Encode named rasters at power-of-two reductions, finest first.
+
+    grids maps name -> (array, transport dtype). The finest level is reduced
+    until it fits within max_size; coarser levels follow down to min_size.
+    """
+    shape = next(iter(grids.values()))[0].shape
+    factor = 1
+    while max(shape) / factor > max_size:
+        factor *= 2
+    levels = []
+    while True:
+        level = {name: encode_array(block_reduce(np.asarray(array, dtype=np.float32), factor), dtype)
+                 for name, (array, dtype) in grids.items()}
+        level['factor'] = factor
+        levels.append(level)
+        if max(shape) / factor <= min_size:
+            return levels
+        factor *= 2
+
+
+@lru_cache(maxsize=None)
+def load_template(name):
+    """Static HTML template text, read from disk once"""
+    with open(os.path.join(TEMPLATE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def render_template(name, payload):
+    """Template with its payload placeholder replaced by the JSON payload"""
+    # Escape '</' so the payload can never close the surrounding script element
+    data = payload if isinstance(payload, str) else json.dumps(payload, separators=(',', ':'))
+    return load_template(name).replace(PAYLOAD_PLACEHOLDER, data.replace('</', '<\\/'))
+
+
+def comparison_payload(before, after, change, disaster_type, location, dem=None, change_threshold=2.0,
+                       date_label='', max_size=256):
+    """
+    Payload for the terrain comparison and change-surface templates.
+
+    Backscatter is quantised to Uint16; change (and the DEM, when supplied as
+    the height source) stay Float32 so signs and magnitudes are exact.
+    """
+    grids = {
+        'before': (before, 'uint16'),
+        'after': (after, 'uint16'),
+        'change': (change, 'float32')
+    }
+    if dem is not None:
+        grids['dem'] = (dem, 'float32')
+    return json.dumps({
+        'disaster_type': disaster_type,
+        'location': location,
+        'date_label': date_label,
+        'change_threshold': change_threshold,
+        'levels': build_levels(grids, max_size)
+    }, separators=(',', ':'))
+
+
+@lru_cache(maxsize=16)
+def scenario_payload(disaster_type, location, resolution=(100, 100), seed=42, change_threshold=2.0, date_label=''):
+    """Cached payload for a generated change scenario (same rasters as the heatmaps)"""
+    from scenario_generator import generate_sar_change_data
+    before, after, change = generate_sar_change_data(disaster_type, location, resolution[0], resolution[1], seed)
+    return comparison_payload(before, after, change, disaster_type, location,
+                              change_threshold=change_threshold, date_label=date_label)
+
+
+def terrain_comparison_html(payload):
+    return render_template('terrain_comparison.html', payload)
+
+
+def change_surface_html(payload):
+    return render_template('change_surface.html', payload)
@@ -0,0 +1,200 @@
+"""
+Zonal Statistics for SAR Disaster Lens
+Per-polygon summaries of change rasters against the data/*.geojson zones
+
+Polygons are burned once into an int32 zone-label grid (tile by tile, so the
+grid may be memory-mapped) and the grid is cached per (zones, raster
+geometry). Statistics are then a single pass over the raster: per tile,
+np.bincount on the zone labels gives count, sum and changed-pixel totals, and
+per-zone variance is combined across tiles with Chan's parallel update.
+"""
+
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+import shapely
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from rasterio import features
+from rasterio.transform import Affine, array_bounds
+
+from raster_tiles import DEFAULT_TILE_SIZE, iter_tiles, tile_slices, window_reader, allocate_output
+
+MAX_CACHED_GRIDS = 8
+
+
+def _as_affine(transform):
+    return Affine(*tuple(transform)[:6])
+
+
+def rasterize_zones(geometries, shape, transform, tile_size=DEFAULT_TILE_SIZE, all_touched=False, path=None):
+    """
+    Burn geometries into an int32 grid holding 1-based zone ids (0 = outside all zones).
+
+    Where polygons overlap the later one wins, as in rasterio.features.rasterize.
+    """
+    transform = _as_affine(transform)
+    geometries = np.asarray(list(geometries), dtype=object)
+    grid = allocate_output(shape, np.int32, path)
+    tree = shapely.STRtree(geometries)
+    for window in iter_tiles(shape, tile_size):
+        tile_transform = transform * Affine.translation(window.col, window.row)
+        west, south, east, north = array_bounds(window.height, window.width, tile_transform)
+        candidates = np.sort(tree.query(shapely.box(west, south, east, north)))
+        if candidates.size == 0:
+            grid[tile_slices(window)] = 0
+            continue
+        grid[tile_slices(window)] = features.rasterize(
+            zip(geometries[candidates], candidates + 1), out_shape=(window.height, window.width),
+            transform=tile_transform, fill=0, all_touched=all_touched, dtype='int32')
+    return grid
+
+
+def _zones_key(geometries, shape, transform, all_touched):
+    digest = hashlib.sha1()
+    for wkb in shapely.to_wkb(np.asarray(list(geometries), dtype=object)):
+        digest.update(wkb)
+    return (digest.hexdigest(), tuple(shape), tuple(_as_affine(transform))[:6], all_touched)
+
+
+class ZoneGridCache:
+    """LRU cache of zone-label grids keyed by zone geometries and raster geometry"""
+
+    def __init__(self, max_entries=MAX_CACHED_GRIDS):
+        self.max_entries = max_entries
+        self._grids = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, geometries, shape, transform, tile_size=DEFAULT_TILE_SIZE, all_touched=False):
+        geometries = list(geometries)
+        key = _zones_key(geometries, shape, transform, all_touched)
+        if key in self._grids:
+            self.hits += 1
+            self._grids.move_to_end(key)
+            return self._grids[key]
+        self.misses += 1
+        grid = rasterize_zones(geometries, shape, transform, tile_size, all_touched)
+        self._grids[key] = grid
+        while len(self._grids) > self.max_entries:
+            self._grids.popitem(last=False)
+        return grid
+
+
+_default_cache = ZoneGridCache()
+
+
+class ZonalAccumulator:
+    """Per-zone count, mean, variance, min, max and changed-pixel count"""
+
+    def __init__(self, n_zones):
+        size = n_zones + 1  # slot 0 collects pixels outside every zone
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        self.changed = np.zeros(size, dtype=np.int64)
+
+    def _combine(self, count, mean, m2, minimum, maximum, changed):
+        total = self.count + count
+        safe_total = np.maximum(total, 1)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / safe_total
+        self.m2 = self.m2 + m2 + delta * delta * self.count * count / safe_total
+        self.count = total
+        self.min = np.minimum(self.min, minimum)
+        self.max = np.maximum(self.max, maximum)
+        self.changed += changed
+        return self
+
+    def update(self, labels, values, changed=None):
+        labels = np.asarray(labels).ravel()
+        values = np.asarray(values, dtype=np.float64).ravel()
+        valid = np.isfinite(values)
+        if not valid.all():
+            labels, values = labels[valid], values[valid]
+            changed = None if changed is None else np.asarray(changed).ravel()[valid]
+        size = self.count.size
+
+        count = np.bincount(labels, minlength=size)
+        mean = np.bincount(labels, values, minlength=size) / np.maximum(count, 1)
+        m2 = np.bincount(labels, (values - mean[labels]) ** 2, minlength=size)
+        minimum = np.full(size, np.inf)
+        maximum = np.full(size, -np.inf)
+        np.minimum.at(minimum, labels, values)
+        np.maximum.at(maximum, labels, values)
+        if changed is None:
+            changed_count = np.zeros(size, dtype=np.int64)
+        else:
+            changed_count = np.bincount(labels, weights=np.asarray(changed).ravel().astype(bool),
+                                        minlength=size).astype(np.int64)
+        return self._combine(count, mean, m2, minimum, maximum, changed_count)
+
+    def merge(self, other):
+        return self._combine(other.count, other.mean, other.m2, other.min, other.max, other.changed)
+
+    def to_frame(self):
+        """Statistics for zones 1..n as a DataFrame (NaN where a zone has no valid pixels)"""
+        count = self.count[1:]
+        empty = count == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame = pd.DataFrame({
+                'pixel_count': count,
+                'mean': np.where(empty, np.nan, self.mean[1:]),
+                'min': np.where(empty, np.nan, self.min[1:]),
+                'max': np.where(empty, np.nan, self.max[1:]),
+                'std': np.where(empty, np.nan, np.sqrt(self.m2[1:] / np.maximum(count, 1))),
+                'percent_changed': np.where(empty, np.nan, 100.0 * self.changed[1:] / np.maximum(count, 1))
+            })
+        return frame
+
+
+def zonal_statistics(zones, values, transform, shape=None, changed=None, change_threshold=None,
+                     tile_size=DEFAULT_TILE_SIZE, max_workers=None, all_touched=False, cache=None):
+    """
+    Per-zone statistics of a raster (array, memmap or window reader).
+
+    zones is a GeoDataFrame (or sequence of geometries) in the raster CRS.
+    Changed pixels come from a boolean/class raster (non-zero = changed) or,
+    failing that, from |value| > change_threshold. Returns the zones with
+    pixel_count, mean, min, max, std and percent_changed columns added.
+    """
+    if shape is None:
+        shape = values.shape
+    shape = tuple(shape[:2])
+    geometries = list(zones.geometry) if hasattr(zones, 'geometry') else list(zones)
+    grid = (cache or _default_cache).get(geometries, shape, transform, tile_size, all_touched)
+
+    read_values = window_reader(values)
+    read_changed = None if changed is None else window_reader(changed)
+    windows = list(iter_tiles(shape, tile_size))
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(windows)))
+
+    def accumulate(worker):
+        partial = ZonalAccumulator(len(geometries))
+        for window in windows[worker::workers]:
+            tile = read_values(window)
+            if read_changed is not None:
+                tile_changed = read_changed(window)
+            elif change_threshold is not None:
+                tile_changed = np.abs(tile) > change_threshold
+            else:
+                tile_changed = None
+            partial.update(grid[tile_slices(window)], tile, tile_changed)
+        return partial
+
+    if workers == 1:
+        result = accumulate(0)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(accumulate, range(workers)))
+        result = partials[0]
+        for partial in partials[1:]:
+            result.merge(partial)
+
+    stats = result.to_frame()
+    if hasattr(zones, 'geometry'):
+        return pd.concat([zones.reset_index(drop=True), stats], axis=1)
+    return stats